@@ -0,0 +1,104 @@
+"""
+Checkpoint compression benchmark: writes growing conversations (one checkpoint and its pending
+writes per turn) into a fresh database with each compression setting, then reads every thread's
+latest checkpoint back, and reports payload bytes written, database file size and latencies.
+
+    python backend/benchmarks/checkpoint_compression.py --threads 50 --turns 20 --codecs none,zlib:1,zlib:6,zstd:3
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, SRC_DIR)
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.base import create_checkpoint, empty_checkpoint
+
+from checkpoint_store import percentile
+from utils.checkpoint_serde import CHECKPOINT_SERIALIZED_BYTES, CompressedSerializer
+from utils.checkpointer import PooledSqliteSaver
+
+WORDS = ("plan pricing support hours order delivery refund account invoice appointment image voice "
+         "message team week today please thanks available monday friday open closed number email").split()
+
+
+def sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def reply(rng: random.Random) -> str:
+    return " ".join(sentence(rng, rng.randint(8, 20)) for _ in range(rng.randint(3, 10)))
+
+
+def parse_codec(spec: str):
+    codec, _, level = spec.partition(":")
+    return (None if codec == "none" else codec), int(level or 3)
+
+
+async def run(spec: str, args) -> dict:
+    codec, level = parse_codec(spec)
+    serde = CompressedSerializer(codec=codec, level=level, min_bytes=args.min_bytes)
+    rng = random.Random(7)
+    raw_before = CHECKPOINT_SERIALIZED_BYTES.value(stage="raw")
+    stored_before = CHECKPOINT_SERIALIZED_BYTES.value(stage="stored")
+    writes, reads = [], []
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "cp.sqlite")
+        saver = await PooledSqliteSaver.open(path, readers=args.readers, serde=serde)
+        try:
+            for thread in range(args.threads):
+                config = {"configurable": {"thread_id": f"thread-{thread}", "checkpoint_ns": ""}}
+                messages, checkpoint = [], empty_checkpoint()
+                for turn in range(args.turns):
+                    messages = messages + [HumanMessage(content=sentence(rng, 12)), AIMessage(content=reply(rng))]
+                    checkpoint = create_checkpoint(checkpoint, None, turn)
+                    checkpoint["channel_values"] = {"messages": messages}
+                    start = time.perf_counter()
+                    config = await saver.aput(config, checkpoint, {"step": turn}, {})
+                    await saver.aput_writes(config, [("messages", messages[-2:])], f"task-{turn}")
+                    writes.append(time.perf_counter() - start)
+
+            for _ in range(args.reads):
+                for thread in range(args.threads):
+                    start = time.perf_counter()
+                    await saver.aget_tuple({"configurable": {"thread_id": f"thread-{thread}", "checkpoint_ns": ""}})
+                    reads.append(time.perf_counter() - start)
+
+            await saver.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            file_bytes = os.path.getsize(path)
+        finally:
+            await saver.aclose()
+    return {
+        "raw_mb": (CHECKPOINT_SERIALIZED_BYTES.value(stage="raw") - raw_before) / 1e6,
+        "written_mb": (CHECKPOINT_SERIALIZED_BYTES.value(stage="stored") - stored_before) / 1e6,
+        "file_mb": file_bytes / 1e6,
+        "write_p50_ms": percentile(writes, 50) * 1000,
+        "read_p50_ms": percentile(reads, 50) * 1000,
+        "read_p99_ms": percentile(reads, 99) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=50, help="Conversations")
+    parser.add_argument("--turns", type=int, default=20, help="Turns per conversation")
+    parser.add_argument("--reads", type=int, default=5, help="Reads of every thread's latest checkpoint")
+    parser.add_argument("--readers", type=int, default=4, help="Read connections of the pooled store")
+    parser.add_argument("--min-bytes", type=int, default=1024, help="Compression threshold")
+    parser.add_argument("--codecs", default="none,zlib:1,zlib:6,zstd:3", help="Comma separated codec[:level] list")
+    args = parser.parse_args()
+
+    print(f"{'codec':<10}{'raw':>10}{'written':>10}{'file':>10}{'write p50':>11}{'read p50':>10}{'read p99':>10}")
+    for spec in args.codecs.split(","):
+        r = asyncio.run(run(spec, args))
+        print(f"{spec:<10}{r['raw_mb']:>8.1f}MB{r['written_mb']:>8.1f}MB{r['file_mb']:>8.1f}MB"
+              f"{r['write_p50_ms']:>9.2f}ms{r['read_p50_ms']:>8.2f}ms{r['read_p99_ms']:>8.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
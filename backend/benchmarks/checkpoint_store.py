@@ -0,0 +1,111 @@
+"""
+Checkpoint store benchmark: concurrent conversations each load their thread, write a checkpoint
+and its pending writes, the way one agent turn does, against a fresh database.
+
+Compares a plain single-connection AsyncSqliteSaver, the pooled WAL store, the pooled store with
+the hot-thread cache, and the store sharded over several files, and reports turns per second and
+per-operation latency percentiles.
+
+    python backend/benchmarks/checkpoint_store.py --threads 50 --turns 20 --messages 40
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, SRC_DIR)
+
+import aiosqlite
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.base import create_checkpoint, empty_checkpoint
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+from utils.checkpoint_cache import ThreadStateCache
+from utils.checkpoint_shards import ShardedSqliteSaver
+from utils.checkpointer import PooledSqliteSaver
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))] if ordered else 0.0
+
+
+def make_messages(count: int):
+    text = "Thanks for reaching out! Here is a detailed answer about plans, pricing and support hours. " * 3
+    return [HumanMessage(content=f"question {i}") if i % 2 == 0 else AIMessage(content=text) for i in range(count)]
+
+
+async def open_store(kind: str, path: str, readers: int, shards: int):
+    if kind == "sharded":
+        return await ShardedSqliteSaver.open(path, shards, readers=max(1, readers // shards))
+    if kind == "pooled":
+        return await PooledSqliteSaver.open(path, readers=readers)
+    if kind == "cached":
+        return await PooledSqliteSaver.open(path, readers=readers, cache=ThreadStateCache())
+    conn = await aiosqlite.connect(path)
+    saver = AsyncSqliteSaver(conn)
+    await saver.setup()
+    return saver
+
+
+async def close_store(saver):
+    if isinstance(saver, (PooledSqliteSaver, ShardedSqliteSaver)):
+        await saver.aclose()
+    else:
+        await saver.conn.close()
+
+
+async def conversation(saver, thread: int, turns: int, messages, timings):
+    config = {"configurable": {"thread_id": f"thread-{thread}", "checkpoint_ns": ""}}
+    for turn in range(turns):
+        start = time.perf_counter()
+        latest = await saver.aget_tuple(config)
+        timings["read"].append(time.perf_counter() - start)
+
+        base = latest.checkpoint if latest else empty_checkpoint()
+        checkpoint = create_checkpoint(base, None, turn)
+        checkpoint["channel_values"] = {"messages": messages}
+        parent = latest.config if latest else config
+        start = time.perf_counter()
+        saved = await saver.aput(parent, checkpoint, {"step": turn}, {})
+        await saver.aput_writes(saved, [("messages", messages[-2:])], f"task-{turn}")
+        timings["write"].append(time.perf_counter() - start)
+        config = {"configurable": {"thread_id": f"thread-{thread}", "checkpoint_ns": ""}}
+
+
+async def run(kind: str, args) -> dict:
+    messages = make_messages(args.messages)
+    timings = {"read": [], "write": []}
+    with tempfile.TemporaryDirectory() as directory:
+        saver = await open_store(kind, os.path.join(directory, "cp.sqlite"), args.readers, args.shards)
+        try:
+            start = time.perf_counter()
+            await asyncio.gather(*(conversation(saver, t, args.turns, messages, timings) for t in range(args.threads)))
+            elapsed = time.perf_counter() - start
+        finally:
+            await close_store(saver)
+    return {"turns_per_s": args.threads * args.turns / elapsed, **{
+        f"{op}_p{q}_ms": percentile(values, q) * 1000 for op, values in timings.items() for q in (50, 99)}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=50, help="Concurrent conversations")
+    parser.add_argument("--turns", type=int, default=20, help="Turns per conversation")
+    parser.add_argument("--messages", type=int, default=40, help="Messages held in each checkpoint")
+    parser.add_argument("--readers", type=int, default=4, help="Read connections of the pooled store")
+    parser.add_argument("--shards", type=int, default=4, help="Database files of the sharded store")
+    args = parser.parse_args()
+
+    print(f"{'store':<10}{'turns/s':>10}{'read p50':>10}{'read p99':>10}{'write p50':>11}{'write p99':>11}")
+    for kind in ("single", "pooled", "cached", "sharded"):
+        r = asyncio.run(run(kind, args))
+        print(f"{kind:<10}{r['turns_per_s']:>10.0f}{r['read_p50_ms']:>9.1f}ms{r['read_p99_ms']:>9.1f}ms"
+              f"{r['write_p50_ms']:>10.1f}ms{r['write_p99_ms']:>10.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
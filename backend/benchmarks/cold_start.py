@@ -0,0 +1,71 @@
+"""
+Cold-start benchmark: how long a fresh process takes until /health can be served (importing
+the API) and until /ready (ChatBot created, MCP server and checkpoint database initialized).
+
+Each run uses a new interpreter, like a container restart. Azure credentials default to dummy
+values; nothing is sent to Azure during startup.
+
+    python backend/benchmarks/cold_start.py --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+
+PROBE = r"""
+import asyncio, json, sys, time
+t0 = time.perf_counter()
+import api
+import app_state
+t_import = time.perf_counter() - t0
+heavy_loaded = "langgraph" in sys.modules
+
+async def main():
+    t1 = time.perf_counter()
+    app_state.start()
+    ok = await app_state.wait_until_ready()
+    await app_state._startup_task
+    t_ready = time.perf_counter() - t1
+    await app_state.shutdown()
+    return ok, t_ready
+
+ok, t_ready = asyncio.run(main())
+print(json.dumps({"import_s": t_import, "startup_s": t_ready, "ready_s": t_import + t_ready,
+                  "ready": ok and app_state.startup_error is None, "heavy_modules_at_import": heavy_loaded}))
+"""
+
+
+def run_once(env):
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=SRC_DIR, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    env = os.environ.copy()
+    env.setdefault("AZURE_OPENAI_ENDPOINT", "https://example.openai.azure.com/")
+    env.setdefault("AZURE_OPENAI_API_KEY", "benchmark")
+    env.setdefault("AZURE_OPENAI_DEPLOYMENT_NAME", "gpt-4o")
+
+    results = [run_once(env) for _ in range(args.runs)]
+    if not all(r["ready"] for r in results):
+        print("warning: startup did not reach ready in every run", file=sys.stderr)
+
+    print(f"{'phase':<28}{'median':>10}{'min':>10}{'max':>10}")
+    for key, label in (("import_s", "import api (/health up)"), ("startup_s", "startup phase"), ("ready_s", "process start -> /ready")):
+        values = [r[key] for r in results]
+        print(f"{label:<28}{statistics.median(values):>9.3f}s{min(values):>9.3f}s{max(values):>9.3f}s")
+    print(f"model stack imported before startup: {any(r['heavy_modules_at_import'] for r in results)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+"""
+Local stand-ins for the external services the backend calls, for load tests:
+Azure OpenAI chat completions (plain and streamed, optionally with tool calls), Whisper,
+FLUX image generation, the WhatsApp Graph API and the Twilio REST API.
+
+Every endpoint answers after a delay drawn from a configurable latency distribution and
+fails with the configured error rate. Outbound WhatsApp / Twilio messages are recorded per
+recipient so a load generator can measure when a reply was delivered.
+
+Run standalone and point the app at it:
+
+    python backend/benchmarks/fake_services.py --port 9100 --latency chat=lognormal:0.8,0.4
+
+    AZURE_OPENAI_ENDPOINT=http://127.0.0.1:9100 GRAPH_API_BASE_URL=http://127.0.0.1:9100/graph \\
+    TWILIO_API_BASE_URL=http://127.0.0.1:9100/twilio ...
+"""
+import argparse
+import asyncio
+import base64
+import io
+import json
+import math
+import random
+import time
+import uuid
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+SERVICES = ("chat", "whisper", "flux", "graph", "twilio")
+
+REPLY_WORDS = (
+    "Sure, here is what I found. Nviv AI can help with that: the answer depends on a few details, "
+    "but in most cases the simplest option works best. Let me know if you need anything else."
+).split()
+
+
+class Distribution:
+    """
+    Latency distribution in seconds, parsed from a spec:
+    fixed:S, uniform:A,B, normal:MEAN,STD, lognormal:MEDIAN,SIGMA or exp:MEAN
+    """
+
+    def __init__(self, spec: str):
+        self.spec = spec
+        kind, _, params = spec.partition(":")
+        self.kind = kind.strip().lower()
+        self.params = [float(p) for p in params.split(",") if p.strip()]
+        expected = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2, "exp": 1}
+        if expected.get(self.kind) != len(self.params):
+            raise ValueError(f"Invalid latency spec: {spec!r}")
+
+    def sample(self, rng: random.Random) -> float:
+        p = self.params
+        if self.kind == "fixed":
+            return p[0]
+        if self.kind == "uniform":
+            return rng.uniform(p[0], p[1])
+        if self.kind == "normal":
+            return max(rng.gauss(p[0], p[1]), 0.0)
+        if self.kind == "lognormal":
+            return p[0] * math.exp(rng.gauss(0, p[1]))
+        return rng.expovariate(1 / p[0]) if p[0] > 0 else 0.0
+
+
+def parse_service_options(items: List[str], parse) -> Dict[str, object]:
+    """Parses repeated 'service=value' options, e.g. ['chat=fixed:0.5', 'flux=uniform:2,5']"""
+    values = {}
+    for item in items or []:
+        service, _, value = item.partition("=")
+        if service not in SERVICES:
+            raise ValueError(f"Unknown service {service!r}, expected one of {', '.join(SERVICES)}")
+        values[service] = parse(value)
+    return values
+
+
+def _tiny_png() -> str:
+    """Base64 PNG returned by the fake FLUX endpoint, so the real decode/transcode path runs"""
+    try:
+        from PIL import Image
+    except ImportError:
+        return ""
+    buffer = io.BytesIO()
+    Image.new("RGB", (256, 256), (90, 140, 200)).save(buffer, "PNG")
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+class FakeServices:
+    """
+    State and behaviour shared by the fake endpoints.
+
+    `latency` and `error_rate` are per service (see SERVICES). For chat completions the latency
+    is the time to the first token; streamed replies then emit one token every `token_interval`
+    seconds. `tool_call_rate` is the share of first model calls in a turn that answer with a
+    `generate_image` tool call, which exercises the MCP tool server and the FLUX stand-in.
+    """
+
+    def __init__(self, latency: Optional[Dict[str, Distribution]] = None, error_rate: Optional[Dict[str, float]] = None,
+                 token_interval: float = 0.02, reply_tokens: int = 40, tool_call_rate: float = 0.0, seed: int = 0):
+        self.latency = {s: Distribution("fixed:0") for s in SERVICES}
+        self.latency.update(latency or {})
+        self.error_rate = {s: 0.0 for s in SERVICES}
+        self.error_rate.update(error_rate or {})
+        self.token_interval = token_interval
+        self.reply_tokens = reply_tokens
+        self.tool_call_rate = tool_call_rate
+        self.rng = random.Random(seed)
+        self.calls = Counter()
+        self.errors = Counter()
+        # recipient -> [(perf_counter timestamp, payload)] of messages sent through Twilio / Graph
+        self.deliveries: Dict[str, list] = defaultdict(list)
+        self._waiters: Dict[str, List[asyncio.Future]] = defaultdict(list)
+        self.image_b64 = _tiny_png()
+
+    async def delay(self, service: str) -> Optional[Response]:
+        """Waits the sampled latency; returns an error response when this call should fail"""
+        self.calls[service] += 1
+        await asyncio.sleep(self.latency[service].sample(self.rng))
+        if self.rng.random() < self.error_rate[service]:
+            self.errors[service] += 1
+            status = self.rng.choice((429, 500, 503))
+            return JSONResponse({"error": {"code": str(status), "message": "Injected failure"}}, status_code=status)
+        return None
+
+    def record_delivery(self, recipient: str, payload):
+        self.deliveries[recipient].append((time.perf_counter(), payload))
+        for waiter in self._waiters.pop(recipient, []):
+            if not waiter.done():
+                waiter.set_result(None)
+
+    async def wait_for_delivery(self, recipient: str, timeout: float) -> Optional[float]:
+        """perf_counter time of the first message delivered to `recipient`, or None on timeout"""
+        if not self.deliveries.get(recipient):
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters[recipient].append(waiter)
+            try:
+                await asyncio.wait_for(waiter, timeout)
+            except asyncio.TimeoutError:
+                return None
+        return self.deliveries[recipient][0][0]
+
+    def _reply_text(self) -> List[str]:
+        start = self.rng.randrange(len(REPLY_WORDS))
+        return [REPLY_WORDS[(start + i) % len(REPLY_WORDS)] + " " for i in range(self.reply_tokens)]
+
+    def _wants_tool_call(self, body: dict) -> bool:
+        """Only the first model call of a turn may ask for a tool, and only when image generation is offered"""
+        tools = {t.get("function", {}).get("name") for t in body.get("tools") or []}
+        messages = body.get("messages") or []
+        answering_tool_result = bool(messages) and messages[-1].get("role") == "tool"
+        return "generate_image" in tools and not answering_tool_result and self.rng.random() < self.tool_call_rate
+
+    async def chat_completion(self, body: dict, deployment: str):
+        prompt_tokens = sum(len(str(m.get("content") or "")) for m in body.get("messages") or []) // 4
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+        tool_call = None
+        if self._wants_tool_call(body):
+            tool_call = {
+                "id": f"call_{uuid.uuid4().hex[:12]}",
+                "type": "function",
+                "function": {"name": "generate_image", "arguments": json.dumps({"prompt": "a load test picture"})},
+            }
+        tokens = [] if tool_call else self._reply_text()
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(tokens) or 12,
+                 "total_tokens": prompt_tokens + (len(tokens) or 12)}
+
+        if not body.get("stream"):
+            # Non-streamed replies arrive once the whole completion is generated
+            await asyncio.sleep(len(tokens) * self.token_interval)
+            message = {"role": "assistant", "content": None if tool_call else "".join(tokens)}
+            if tool_call:
+                message["tool_calls"] = [tool_call]
+            return JSONResponse({
+                "id": completion_id, "object": "chat.completion", "created": created, "model": deployment,
+                "choices": [{"index": 0, "message": message, "finish_reason": "tool_calls" if tool_call else "stop"}],
+                "usage": usage,
+            })
+
+        include_usage = (body.get("stream_options") or {}).get("include_usage")
+
+        async def events():
+            def chunk(delta, finish_reason=None, **extra):
+                data = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": deployment,
+                        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}], **extra}
+                return f"data: {json.dumps(data)}\n\n"
+
+            yield chunk({"role": "assistant", "content": ""})
+            if tool_call:
+                yield chunk({"tool_calls": [{"index": 0, **tool_call}]})
+            for token in tokens:
+                await asyncio.sleep(self.token_interval)
+                yield chunk({"content": token})
+            yield chunk({}, "tool_calls" if tool_call else "stop")
+            if include_usage:
+                data = {"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                        "model": deployment, "choices": [], "usage": usage}
+                yield f"data: {json.dumps(data)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+
+def create_app(services: FakeServices) -> FastAPI:
+    app = FastAPI(title="Fake external services")
+    app.state.services = services
+
+    @app.post("/openai/deployments/{deployment}/chat/completions")
+    async def chat_completions(deployment: str, request: Request):
+        body = await request.json()
+        failure = await services.delay("chat")
+        if failure:
+            return failure
+        return await services.chat_completion(body, deployment)
+
+    @app.post("/openai/deployments/{deployment}/audio/transcriptions")
+    async def transcriptions(deployment: str, request: Request):
+        await request.body()
+        failure = await services.delay("whisper")
+        return failure or {"text": "What are your opening hours?"}
+
+    @app.post("/providers/blackforestlabs/v1/{deployment}")
+    async def flux(deployment: str):
+        failure = await services.delay("flux")
+        return failure or {"data": [{"b64_json": services.image_b64}]}
+
+    @app.get("/media/{name}")
+    async def media(name: str):
+        # Voice notes referenced by Twilio MediaUrl0 and Graph media lookups
+        return Response(b"OggS" + bytes(2048), media_type="audio/ogg")
+
+    @app.get("/graph/{media_id}")
+    async def graph_media(media_id: str, request: Request):
+        failure = await services.delay("graph")
+        return failure or {"id": media_id, "url": f"{request.base_url}media/{media_id}.ogg"}
+
+    @app.post("/graph/{phone_number_id}/messages")
+    async def graph_messages(phone_number_id: str, request: Request):
+        payload = await request.json()
+        failure = await services.delay("graph")
+        if failure:
+            return failure
+        services.record_delivery(payload.get("to"), payload)
+        return {"messaging_product": "whatsapp", "messages": [{"id": f"wamid.{uuid.uuid4().hex}"}]}
+
+    @app.post("/twilio/2010-04-01/Accounts/{account_sid}/Messages.json")
+    async def twilio_messages(account_sid: str, request: Request):
+        form = dict(await request.form())
+        failure = await services.delay("twilio")
+        if failure:
+            return failure
+        services.record_delivery(form.get("To"), form)
+        return JSONResponse({
+            "sid": f"SM{uuid.uuid4().hex}", "account_sid": account_sid, "status": "queued",
+            "to": form.get("To"), "from": form.get("From"), "body": form.get("Body"),
+        }, status_code=201)
+
+    @app.get("/stats")
+    async def stats():
+        return {"calls": dict(services.calls), "errors": dict(services.errors),
+                "deliveries": sum(len(v) for v in services.deliveries.values())}
+
+    return app
+
+
+def add_service_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--latency", action="append", default=[], metavar="SERVICE=SPEC",
+                        help="Latency distribution per service, e.g. chat=lognormal:0.8,0.4 or flux=uniform:3,6")
+    parser.add_argument("--error-rate", action="append", default=[], metavar="SERVICE=RATE",
+                        help="Share of calls that fail with 429/500/503, e.g. chat=0.02")
+    parser.add_argument("--token-interval", type=float, default=0.02, help="Seconds between streamed tokens")
+    parser.add_argument("--reply-tokens", type=int, default=40, help="Tokens per model reply")
+    parser.add_argument("--tool-call-rate", type=float, default=0.0, help="Share of turns answered with a generate_image tool call")
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def services_from_args(args) -> FakeServices:
+    return FakeServices(
+        latency=parse_service_options(args.latency, Distribution),
+        error_rate=parse_service_options(args.error_rate, float),
+        token_interval=args.token_interval,
+        reply_tokens=args.reply_tokens,
+        tool_call_rate=args.tool_call_rate,
+        seed=args.seed,
+    )
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    add_service_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(create_app(services_from_args(args)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
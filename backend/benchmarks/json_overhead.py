@@ -0,0 +1,96 @@
+"""
+JSON overhead benchmark: CPU time per turn spent parsing the WhatsApp webhook body and encoding
+streamed chat events, with the json module and with orjson (FAST_JSON=true). For reference it
+also times what does not change with FAST_JSON: the /chat response (serialized by Pydantic) and
+the checkpoint payloads (msgpack, via LangGraph's serializer) and metadata (json module) of a turn.
+
+    python backend/benchmarks/json_overhead.py --history 20 --tokens 80 --repeat 2000
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, SRC_DIR)
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.base import empty_checkpoint
+from pydantic import BaseModel
+
+from utils import fast_json
+from utils.checkpoint_serde import checkpoint_serializer
+
+# Checkpoints written by a tool-using turn with the default durability
+CHECKPOINTS_PER_TURN = 4
+
+
+class ChatResponse(BaseModel):
+    message: str
+
+
+def meta_payload(text: str) -> bytes:
+    message = {"from": "15550001234", "id": "wamid.HBgLMTU1NTAwMDEyMzQVAgASGBQzQTdCRkQ2", "timestamp": "1760000000",
+               "type": "text", "text": {"body": text}}
+    value = {"messaging_product": "whatsapp", "metadata": {"display_phone_number": "15550009999", "phone_number_id": "1234567890"},
+             "contacts": [{"profile": {"name": "Customer"}, "wa_id": "15550001234"}], "messages": [message]}
+    return json.dumps({"object": "whatsapp_business_account",
+                       "entry": [{"id": "987654321", "changes": [{"value": value, "field": "messages"}]}]}).encode()
+
+
+def turn_checkpoint(history: int):
+    checkpoint = empty_checkpoint()
+    messages = []
+    for i in range(history):
+        messages.append(HumanMessage(content=f"Question {i}: what are your opening hours on public holidays?"))
+        messages.append(AIMessage(content="We are open from 9am to 5pm on public holidays, except Christmas Day. " * 3))
+    checkpoint["channel_values"] = {"messages": messages}
+    metadata = {"source": "loop", "step": 3, "parents": {}, "thread_id": "whatsapp:+15550001234"}
+    return checkpoint, metadata
+
+
+def per_call_us(fn, repeat: int) -> float:
+    return min(timeit.repeat(fn, number=repeat, repeat=3)) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--history", type=int, default=20, help="Turns of history in the checkpoint")
+    parser.add_argument("--tokens", type=int, default=80, help="Streamed token events per reply")
+    parser.add_argument("--repeat", type=int, default=2000, help="Calls per timing")
+    args = parser.parse_args()
+    if fast_json.orjson is None:
+        sys.exit("orjson is not installed")
+
+    body = meta_payload("Hello, can I book a table for four tomorrow at 7pm?")
+    events = [{"type": "token", "content": " word"}] * args.tokens + [
+        {"type": "done", "message": "We have a table for four at 7pm tomorrow. " * 4}]
+    reply = ChatResponse(message=events[-1]["message"])
+    serde = checkpoint_serializer("none")
+    checkpoint, metadata = turn_checkpoint(args.history)
+
+    print(f"{'per turn':<34}{'json':>12}{'orjson':>12}{'saved':>12}")
+    saved = 0.0
+    for name, fn in (
+        ("webhook body parse", lambda fast: fast_json.loads(body, fast=fast)),
+        (f"stream events x{len(events)}", lambda fast: [fast_json.dumps(e, fast=fast) for e in events]),
+    ):
+        slow, fast = (per_call_us(lambda: fn(flag), args.repeat) for flag in (False, True))
+        saved += slow - fast
+        print(f"{name:<34}{slow:>10.1f}us{fast:>10.1f}us{slow - fast:>10.1f}us")
+    print(f"{'total saved with FAST_JSON':<34}{'':>24}{saved:>10.1f}us")
+
+    print(f"\n{'unchanged by FAST_JSON, per turn':<34}{'':>12}{'time':>12}")
+    for name, fn in (
+        ("/chat response (Pydantic)", lambda: reply.model_dump_json()),
+        (f"checkpoint dumps x{CHECKPOINTS_PER_TURN} (msgpack)",
+         lambda: [serde.dumps_typed(checkpoint) for _ in range(CHECKPOINTS_PER_TURN)]),
+        (f"checkpoint metadata x{CHECKPOINTS_PER_TURN} (json)",
+         lambda: [json.dumps(metadata, ensure_ascii=False) for _ in range(CHECKPOINTS_PER_TURN)]),
+    ):
+        print(f"{name:<34}{'':>12}{per_call_us(fn, max(1, args.repeat // 10)):>10.1f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+"""
+End-to-end load test of the API against local stand-ins for Azure OpenAI, Whisper, FLUX,
+the WhatsApp Graph API and Twilio (see fake_services.py).
+
+The real app is started with `uvicorn api:app` in a subprocess, with only the external base
+URLs swapped, so every turn goes through the production routes, ChatBot, ChatbotAgent, MCP
+tool server and checkpoint store. The load generator then drives `/chat`, `/twilio/whatsapp`
+and `/meta/whatsapp` at a fixed concurrency and reports throughput, ack latency, end-to-end
+reply latency (for webhooks: until the reply reaches the fake Twilio / Graph API) and the CPU
+and memory used by the app and its MCP server.
+
+    python backend/benchmarks/load_test.py --requests 300 --concurrency 30 \\
+        --channels web,twilio,meta --latency chat=lognormal:0.8,0.4 --tool-call-rate 0.1
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import httpx
+import uvicorn
+
+from fake_services import add_service_arguments, create_app, services_from_args
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+CHANNELS = ("web", "twilio", "meta")
+
+PROMPTS = (
+    "Hi, what can you help me with?",
+    "What are your opening hours on weekends?",
+    "Can you explain how the subscription plans differ?",
+    "I forgot my password, what should I do?",
+    "Tell me a bit more about your company.",
+    "Draw a picture of a lighthouse at sunset",
+)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered) + 0.5)) - 1))]
+
+
+class ResourceSampler:
+    """CPU time and resident memory of a process and its descendants, read from /proc (Linux only)"""
+
+    def __init__(self, pid: int, interval: float = 0.5):
+        self.pid = pid
+        self.interval = interval
+        self.available = os.path.exists(f"/proc/{pid}/stat")
+        self.ticks = os.sysconf("SC_CLK_TCK") if self.available else 100
+        self.page_size = os.sysconf("SC_PAGE_SIZE") if self.available else 4096
+        self.peak_rss = 0
+        self.peak_processes = 0
+        self.start_cpu = self.end_cpu = 0.0
+
+    def _pids(self) -> List[int]:
+        pids, stack = [], [self.pid]
+        while stack:
+            pid = stack.pop()
+            pids.append(pid)
+            try:
+                for task in os.listdir(f"/proc/{pid}/task"):
+                    with open(f"/proc/{pid}/task/{task}/children") as f:
+                        stack.extend(int(c) for c in f.read().split())
+            except OSError:
+                continue
+        return pids
+
+    def sample(self):
+        cpu, rss, pids = 0.0, 0, self._pids()
+        for pid in pids:
+            try:
+                with open(f"/proc/{pid}/stat") as f:
+                    fields = f.read().rsplit(")", 1)[1].split()
+                with open(f"/proc/{pid}/statm") as f:
+                    rss += int(f.read().split()[1]) * self.page_size
+            except (OSError, IndexError):
+                continue
+            # utime and stime are fields 14 and 15 of /proc/<pid>/stat
+            cpu += (int(fields[11]) + int(fields[12])) / self.ticks
+        self.peak_rss = max(self.peak_rss, rss)
+        self.peak_processes = max(self.peak_processes, len(pids))
+        return cpu
+
+    async def run(self, stop: asyncio.Event):
+        if not self.available:
+            return
+        self.start_cpu = self.end_cpu = self.sample()
+        while not stop.is_set():
+            try:
+                await asyncio.wait_for(stop.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self.end_cpu = self.sample()
+
+
+class LoadTest:
+    def __init__(self, args, services):
+        self.args = args
+        self.services = services
+        self.rng = random.Random(args.seed)
+        self.results: Dict[str, List[dict]] = defaultdict(list)
+        self.fake_url = ""
+        self.app_url = ""
+
+    def app_env(self, data_dir: str) -> dict:
+        fake = self.fake_url
+        env = os.environ.copy()
+        env.update({
+            "AZURE_OPENAI_ENDPOINT": fake,
+            "AZURE_OPENAI_API_KEY": "load-test",
+            "AZURE_OPENAI_DEPLOYMENT_NAME": "gpt-4o",
+            "AZURE_OPENAI_WHISPER_DEPLOYMENT": "whisper",
+            "AZURE_OPENAI_FLUX_DEPLOYMENT": "flux",
+            "AZURE_OPENAI_FLUX_URL": f"{fake}/providers/blackforestlabs/v1/flux",
+            "GRAPH_API_BASE_URL": f"{fake}/graph",
+            "TWILIO_API_BASE_URL": f"{fake}/twilio",
+            "TWILIO_ACCOUNT_SID": "ACloadtest",
+            "TWILIO_AUTH_TOKEN": "load-test",
+            "TWILIO_FROM_NUMBER": "whatsapp:+15550000000",
+            "WHATSAPP_ACCESS_TOKEN": "load-test",
+            "WHATSAPP_PHONE_NUMBER_ID": "100000000",
+            "DATA_DIR": data_dir,
+            # Prompts repeat across requests; the answer cache would hide the model path
+            "ANSWER_CACHE_ENABLED": "false",
+            # The proxy settings of the host must not capture calls to the local stand-ins
+            "NO_PROXY": "127.0.0.1,localhost",
+        })
+        env.pop("OPENAI_API_KEY", None)
+        for item in self.args.env:
+            key, _, value = item.partition("=")
+            env[key] = value
+        return env
+
+    def next_prompt(self, i: int) -> str:
+        return f"{self.rng.choice(PROMPTS)} (request {i})"
+
+    async def send(self, client: httpx.AsyncClient, i: int, channel: str):
+        sender = f"+1555{i:07d}"
+        voice = channel != "web" and self.rng.random() < self.args.voice_rate
+        text = self.next_prompt(i)
+        start = time.perf_counter()
+        result = {"ok": False, "voice": voice}
+        try:
+            if channel == "web":
+                response = await client.post("/chat", json={"message": text, "session_id": sender})
+            elif channel == "twilio":
+                recipient = f"whatsapp:{sender}"
+                form = {"From": recipient}
+                if voice:
+                    form.update(MediaUrl0=f"{self.fake_url}/media/{i}.ogg", MediaContentType0="audio/ogg")
+                else:
+                    form["Body"] = text
+                response = await client.post("/twilio/whatsapp", data=form)
+            else:
+                recipient = sender
+                message = {"from": sender, "type": "audio", "audio": {"id": f"media-{i}"}} if voice else \
+                    {"from": sender, "type": "text", "text": {"body": text}}
+                payload = {"object": "whatsapp_business_account", "entry": [{"changes": [{"value": {"messages": [message]}}]}]}
+                response = await client.post("/meta/whatsapp", json=payload)
+            result["ack"] = time.perf_counter() - start
+            result["status"] = response.status_code
+            if response.status_code != 200:
+                return result
+            if channel == "web":
+                result["ok"], result["e2e"] = True, result["ack"]
+            else:
+                delivered = await self.services.wait_for_delivery(recipient, self.args.reply_timeout)
+                if delivered is not None:
+                    result["ok"], result["e2e"] = True, delivered - start
+        except httpx.HTTPError as e:
+            result["error"] = type(e).__name__
+        finally:
+            self.results[channel].append(result)
+
+    async def drive(self):
+        channels = self.args.channels
+        semaphore = asyncio.Semaphore(self.args.concurrency)
+        timeout = httpx.Timeout(self.args.reply_timeout, connect=10)
+        limits = httpx.Limits(max_connections=self.args.concurrency * 2)
+        async with httpx.AsyncClient(base_url=self.app_url, timeout=timeout, limits=limits, trust_env=False) as client:
+            async def one(i):
+                async with semaphore:
+                    await self.send(client, i, channels[i % len(channels)])
+            await asyncio.gather(*(one(i) for i in range(self.args.requests)))
+
+    async def wait_ready(self, process: subprocess.Popen, timeout: float = 120):
+        async with httpx.AsyncClient(base_url=self.app_url, trust_env=False) as client:
+            deadline = time.monotonic() + timeout
+            while time.monotonic() < deadline:
+                if process.poll() is not None:
+                    raise RuntimeError("The app exited during startup, see its log")
+                try:
+                    response = await client.get("/ready")
+                    if response.status_code == 200:
+                        return
+                    if response.json().get("status") == "failed":
+                        raise RuntimeError(f"App startup failed: {response.json().get('error')}")
+                except httpx.TransportError:
+                    pass
+                await asyncio.sleep(0.2)
+        raise RuntimeError("The app did not become ready in time")
+
+    async def scrape_metrics(self) -> str:
+        async with httpx.AsyncClient(base_url=self.app_url, trust_env=False) as client:
+            return (await client.get("/metrics")).text
+
+    async def run(self) -> dict:
+        fake_port, app_port = free_port(), free_port()
+        self.fake_url = f"http://127.0.0.1:{fake_port}"
+        self.app_url = f"http://127.0.0.1:{app_port}"
+        fake_server = uvicorn.Server(uvicorn.Config(create_app(self.services), host="127.0.0.1", port=fake_port,
+                                                    log_level="warning", access_log=False))
+        fake_task = asyncio.create_task(fake_server.serve())
+
+        workdir = tempfile.mkdtemp(prefix="nviv-load-")
+        log_path = os.path.join(workdir, "app.log")
+        command = [sys.executable, "-m", "uvicorn", "api:app", "--app-dir", SRC_DIR, "--host", "127.0.0.1",
+                   "--port", str(app_port), "--log-level", "warning", "--no-access-log"]
+        with open(log_path, "w") as log:
+            process = subprocess.Popen(command, env=self.app_env(os.path.join(workdir, "data")), stdout=log, stderr=subprocess.STDOUT)
+        try:
+            await self.wait_ready(process)
+            sampler = ResourceSampler(process.pid)
+            stop = asyncio.Event()
+            sampler_task = asyncio.create_task(sampler.run(stop))
+            start = time.perf_counter()
+            await self.drive()
+            elapsed = time.perf_counter() - start
+            stop.set()
+            await sampler_task
+            metrics = await self.scrape_metrics()
+            return self.report(elapsed, sampler, metrics, log_path)
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                process.kill()
+            fake_server.should_exit = True
+            await fake_task
+            if not self.args.keep:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+    def report(self, elapsed: float, sampler: ResourceSampler, metrics: str, log_path: str) -> dict:
+        def summary(values):
+            return {f"p{q}": percentile(values, q) for q in (50, 90, 99)} | {"max": max(values) if values else None}
+
+        report = {"requests": self.args.requests, "concurrency": self.args.concurrency,
+                  "elapsed_s": elapsed, "throughput_rps": self.args.requests / elapsed, "channels": {}}
+        for channel, results in sorted(self.results.items()):
+            ok = [r for r in results if r["ok"]]
+            report["channels"][channel] = {
+                "requests": len(results),
+                "ok": len(ok),
+                "failed": len(results) - len(ok),
+                "throughput_rps": len(ok) / elapsed,
+                "ack_s": summary([r["ack"] for r in results if "ack" in r]),
+                "e2e_s": summary([r["e2e"] for r in ok]),
+            }
+        cpu = sampler.end_cpu - sampler.start_cpu
+        report["resources"] = {
+            "cpu_s": cpu,
+            "cpu_percent": 100 * cpu / elapsed,
+            "peak_rss_mb": sampler.peak_rss / 2 ** 20,
+            "processes": sampler.peak_processes,
+        } if sampler.available else None
+        report["fake_services"] = {"calls": dict(self.services.calls), "errors": dict(self.services.errors)}
+        report["model_calls"] = sum(int(float(line.rsplit(" ", 1)[1])) for line in metrics.splitlines()
+                                    if line.startswith("model_call_duration_seconds_count"))
+        if self.args.keep:
+            report["app_log"] = log_path
+        return report
+
+
+def print_report(report: dict):
+    def fmt(value):
+        return "-" if value is None else f"{value * 1000:.0f}ms"
+
+    print(f"{report['requests']} requests, concurrency {report['concurrency']}, "
+          f"{report['elapsed_s']:.1f}s, {report['throughput_rps']:.1f} req/s")
+    print(f"{'channel':<8}{'ok':>6}{'fail':>6}{'req/s':>8}  {'ack p50/p99':>17}  {'reply p50/p90/p99':>24}")
+    for channel, c in report["channels"].items():
+        ack, e2e = c["ack_s"], c["e2e_s"]
+        print(f"{channel:<8}{c['ok']:>6}{c['failed']:>6}{c['throughput_rps']:>8.1f}  "
+              f"{fmt(ack['p50']):>8}/{fmt(ack['p99']):<8}  "
+              f"{fmt(e2e['p50']):>8}/{fmt(e2e['p90'])}/{fmt(e2e['p99'])}")
+    resources = report["resources"]
+    if resources:
+        print(f"app + MCP server: {resources['cpu_s']:.1f}s CPU ({resources['cpu_percent']:.0f}%), "
+              f"peak RSS {resources['peak_rss_mb']:.0f} MB across {resources['processes']} processes")
+    print(f"model calls: {report['model_calls']}, fake service calls: {report['fake_services']['calls']}, "
+          f"injected errors: {report['fake_services']['errors']}")
+    if report.get("app_log"):
+        print(f"app log: {report['app_log']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--channels", default="web,twilio,meta", help="Comma separated channels, used round robin")
+    parser.add_argument("--voice-rate", type=float, default=0.0, help="Share of webhook messages sent as voice notes (Whisper path)")
+    parser.add_argument("--reply-timeout", type=float, default=120, help="Seconds to wait for a reply")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="Extra environment for the app, e.g. TURN_COALESCE_SECONDS=0")
+    parser.add_argument("--json", help="Also write the report to this file")
+    parser.add_argument("--keep", action="store_true", help="Keep the app log and database")
+    add_service_arguments(parser)
+    args = parser.parse_args()
+    args.channels = [c.strip() for c in args.channels.split(",") if c.strip()]
+    unknown = set(args.channels) - set(CHANNELS)
+    if unknown:
+        parser.error(f"unknown channels: {', '.join(sorted(unknown))}")
+
+    report = asyncio.run(LoadTest(args, services_from_args(args)).run())
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
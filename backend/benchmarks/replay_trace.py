@@ -0,0 +1,181 @@
+"""
+Runs a conversation trace through the real ChatBot and webhook handlers, turn by turn, while
+recording or replaying all outbound HTTP (see utils/http_cassette.py), and reports wall time,
+CPU time and (optionally) memory allocations per turn.
+
+Record once against real (or fake) services, then replay the same trace offline on every build
+and compare the results:
+
+    python backend/benchmarks/replay_trace.py backend/benchmarks/traces/sample.json --mode record --cassette /tmp/cassette
+    python backend/benchmarks/replay_trace.py backend/benchmarks/traces/sample.json --mode replay --cassette /tmp/cassette \\
+        --timing none --out base.json
+    python backend/benchmarks/replay_trace.py backend/benchmarks/traces/sample.json --mode replay --cassette /tmp/cassette \\
+        --timing none --compare base.json
+
+A trace is a JSON list of turns: {"channel": "web" | "twilio" | "meta", "thread": "...", "text": "..."}.
+Twilio and Meta turns may carry "audio_url" / "audio_id" instead of text to exercise Whisper.
+`--timing` is "original", "none" or a factor for the recorded latencies. CPU time covers this
+process only (not the MCP tool server), and measuring allocations slows the run down.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+HOST_URL = "http://localhost:8000"
+
+# Settings that shape outbound URLs and payloads; saved when recording and restored on replay
+SESSION_ENV = (
+    "AZURE_OPENAI_ENDPOINT", "AZURE_OPENAI_DEPLOYMENT_NAME", "AZURE_OPENAI_FAST_DEPLOYMENT_NAME",
+    "AZURE_OPENAI_WHISPER_DEPLOYMENT", "AZURE_OPENAI_FLUX_DEPLOYMENT", "AZURE_OPENAI_FLUX_URL",
+    "AZURE_OPENAI_API_VERSION", "TWILIO_ACCOUNT_SID", "TWILIO_FROM_NUMBER", "WHATSAPP_PHONE_NUMBER_ID",
+    "GRAPH_API_BASE_URL", "TWILIO_API_BASE_URL",
+)
+# Credentials are never saved; replay only needs them to be present
+SECRET_ENV = ("AZURE_OPENAI_API_KEY", "TWILIO_AUTH_TOKEN", "WHATSAPP_ACCESS_TOKEN")
+
+
+def prepare_env(args, data_dir: str):
+    from dotenv import load_dotenv
+
+    session_path = os.path.join(args.cassette, "session.json")
+    if args.mode == "replay":
+        with open(session_path) as f:
+            os.environ.update(json.load(f))
+        for key in SECRET_ENV:
+            os.environ.setdefault(key, "replay")
+    load_dotenv()
+    if args.mode == "record":
+        os.makedirs(args.cassette, exist_ok=True)
+        with open(session_path, "w") as f:
+            json.dump({k: os.environ[k] for k in SESSION_ENV if os.environ.get(k)}, f, indent=2)
+
+    os.environ.update({
+        "HTTP_CASSETTE_MODE": args.mode,
+        "HTTP_CASSETTE_DIR": os.path.abspath(args.cassette),
+        "HTTP_CASSETTE_TIMING": args.timing,
+        # Every run starts from empty threads, so the same requests go out each time
+        "DATA_DIR": data_dir,
+        "ANSWER_CACHE_ENABLED": os.environ.get("ANSWER_CACHE_ENABLED", "false"),
+        # Turns are sent one after another; waiting for follow-up messages only adds idle time
+        "TURN_COALESCE_SECONDS": os.environ.get("TURN_COALESCE_SECONDS", "0"),
+    })
+
+
+async def run_turn(turn: dict, index: int):
+    import app_state
+    from routes.meta_routes import process_meta_whatsapp_background
+    from routes.twilio_routes import process_twilio_whatsapp_background
+
+    channel, thread, text = turn["channel"], turn["thread"], turn.get("text", "")
+    if channel == "web":
+        await app_state.chatbot.chat(text, thread_id=thread, channel="web")
+    elif channel == "twilio":
+        media_url = turn.get("audio_url")
+        await process_twilio_whatsapp_background(text, thread, media_url, "audio/ogg" if media_url else None, HOST_URL)
+    elif channel == "meta":
+        message = {"from": thread, "type": "audio", "audio": {"id": turn["audio_id"]}} if turn.get("audio_id") else \
+            {"from": thread, "type": "text", "text": {"body": text}}
+        body = {"object": "whatsapp_business_account", "entry": [{"changes": [{"value": {"messages": [message]}}]}]}
+        await process_meta_whatsapp_background(body, HOST_URL)
+    else:
+        raise ValueError(f"Turn {index}: unknown channel {channel!r}")
+
+
+async def run_trace(turns, allocations: bool) -> dict:
+    sys.path.insert(0, SRC_DIR)
+    import app_state
+    from chatbot import ChatBot
+    from utils import http_cassette, http_pool
+
+    cassette = http_cassette.install("app")
+    app_state.chatbot = ChatBot()
+    await app_state.chatbot.initialize()
+
+    results = []
+    if allocations:
+        tracemalloc.start()
+    try:
+        for index, turn in enumerate(turns):
+            if allocations:
+                tracemalloc.reset_peak()
+                before, _ = tracemalloc.get_traced_memory()
+            wall, cpu = time.perf_counter(), time.process_time()
+            await run_turn(turn, index)
+            result = {
+                "turn": index,
+                "channel": turn["channel"],
+                "wall_ms": (time.perf_counter() - wall) * 1000,
+                "cpu_ms": (time.process_time() - cpu) * 1000,
+            }
+            if allocations:
+                current, peak = tracemalloc.get_traced_memory()
+                result["alloc_peak_kb"] = (peak - before) / 1024
+                result["retained_kb"] = (current - before) / 1024
+            results.append(result)
+    finally:
+        if allocations:
+            tracemalloc.stop()
+        await app_state.chatbot.agent.cleanup()
+        await http_pool.aclose()
+
+    totals = {key: sum(r[key] for r in results) for key in ("wall_ms", "cpu_ms", "alloc_peak_kb") if results and key in results[0]}
+    return {"turns": results, "totals": totals, "cassette": dict(cassette.stats) if cassette else None}
+
+
+def print_results(report: dict, baseline: dict = None):
+    keys = [k for k in ("wall_ms", "cpu_ms", "alloc_peak_kb") if k in report["totals"]]
+    base_turns = {t["turn"]: t for t in (baseline or {}).get("turns", [])}
+
+    def cell(value, base):
+        if base is None:
+            return f"{value:>10.1f}"
+        change = (value - base) / base * 100 if base else 0.0
+        return f"{value:>10.1f} ({change:+5.1f}%)"
+
+    width = 20 if baseline else 11
+    print(f"{'turn':<6}{'channel':<9}" + "".join(f"{k:>{width}}" for k in keys))
+    for turn in report["turns"]:
+        base = base_turns.get(turn["turn"], {})
+        print(f"{turn['turn']:<6}{turn['channel']:<9}" + "".join(f"{cell(turn[k], base.get(k)):>{width}}" for k in keys))
+    base_totals = (baseline or {}).get("totals", {})
+    print(f"{'total':<15}" + "".join(f"{cell(report['totals'][k], base_totals.get(k)):>{width}}" for k in keys))
+    stats = report["cassette"]
+    if stats and stats["misses"]:
+        print(f"warning: {stats['misses']} outbound requests had no recorded response; the trace diverged from the recording")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("trace", help="JSON list of turns")
+    parser.add_argument("--mode", choices=("record", "replay"), default="replay")
+    parser.add_argument("--cassette", required=True, help="Directory holding the recorded interactions")
+    parser.add_argument("--timing", default="original", help='"original", "none" or a latency factor (replay only)')
+    parser.add_argument("--allocations", action="store_true", help="Measure allocations per turn with tracemalloc")
+    parser.add_argument("--out", help="Write the per-turn results to this JSON file")
+    parser.add_argument("--compare", help="Results JSON of an earlier run to compare against")
+    args = parser.parse_args()
+
+    with open(args.trace) as f:
+        turns = json.load(f)
+    with tempfile.TemporaryDirectory(prefix="nviv-replay-") as data_dir:
+        prepare_env(args, data_dir)
+        report = asyncio.run(run_trace(turns, args.allocations))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_results(report, baseline)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
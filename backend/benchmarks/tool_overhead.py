@@ -0,0 +1,96 @@
+"""
+Tool call overhead benchmark: latency of a tool call through the MCP server processes (JSON-RPC
+over stdio) and with TOOL_EXECUTION=inprocess (a worker thread in the same process). The call is
+send_twilio_sms without Twilio credentials, which returns at once, so what is measured is the
+cost of getting a call to the tool and its result back. Calls run one at a time, then
+--concurrency at a time.
+
+    python backend/benchmarks/tool_overhead.py --calls 500 --concurrency 16
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, SRC_DIR)
+
+from utils.inprocess_tools import InProcessTools
+from utils.mcp_client import MCPClient
+
+TOOL = "send_twilio_sms"
+ARGUMENTS = {"to_number": "+15550001234", "message_body": "Your table for four is booked for 7pm."}
+
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def measure(tool, calls: int, concurrency: int) -> dict:
+    for _ in range(min(calls, 20)):
+        await tool.ainvoke(ARGUMENTS)
+    latencies = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        await tool.ainvoke(ARGUMENTS)
+        latencies.append(time.perf_counter() - start)
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            await tool.ainvoke(ARGUMENTS)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(calls)))
+    elapsed = time.perf_counter() - start
+    return {
+        "p50_us": statistics.median(latencies) * 1e6,
+        "p99_us": percentile(latencies, 0.99) * 1e6,
+        "calls_per_s": calls / elapsed,
+    }
+
+
+async def run(mode: str, args) -> dict:
+    if mode == "inprocess":
+        client = InProcessTools(threads=args.threads)
+    else:
+        client = MCPClient(
+            command=sys.executable,
+            args=[os.path.join(SRC_DIR, "utils", "mcp_server.py")],
+            env=os.environ.copy(),
+            processes=args.processes,
+            max_in_flight=args.threads,
+            health_interval=0,
+        )
+    try:
+        await client.initialize()
+        tool = next(t for t in await client.get_tools() if t.name == TOOL)
+        return await measure(tool, args.calls, args.concurrency)
+    finally:
+        await client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=500, help="Calls per measurement")
+    parser.add_argument("--concurrency", type=int, default=16, help="Calls in flight for the throughput run")
+    parser.add_argument("--threads", type=int, default=8, help="Worker threads (TOOL_SERVER_THREADS)")
+    parser.add_argument("--processes", type=int, default=2, help="MCP server processes (MCP_SERVER_PROCESSES)")
+    args = parser.parse_args()
+    for name in ("TWILIO_ACCOUNT_SID", "TWILIO_AUTH_TOKEN", "TWILIO_FROM_NUMBER", "HTTP_CASSETTE_MODE"):
+        os.environ.pop(name, None)
+
+    results = {mode: asyncio.run(run(mode, args)) for mode in ("mcp", "inprocess")}
+    print(f"{'mode':<12}{'p50':>12}{'p99':>12}{'calls/s':>12}")
+    for mode, r in results.items():
+        print(f"{mode:<12}{r['p50_us']:>10.0f}us{r['p99_us']:>10.0f}us{r['calls_per_s']:>12.0f}")
+    saved = results["mcp"]["p50_us"] - results["inprocess"]["p50_us"]
+    print(f"\nin-process saves {saved:.0f}us per call (p50)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Turn durability benchmark: runs tool-using turns (agent -> tools -> agent, the agent's graph shape)
+concurrently over the checkpoint store under each CHECKPOINT_DURABILITY mode, and reports
+checkpoint commits per turn and turn latency. The model is scripted with a fixed delay, so the
+difference between modes is the checkpointing alone.
+
+    python backend/benchmarks/turn_durability.py --threads 20 --turns 10 --model-ms 20 --synchronous FULL
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from typing import Annotated, Sequence, TypedDict
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, SRC_DIR)
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langchain_core.tools import tool
+from langgraph.graph import END, StateGraph
+from langgraph.graph.message import add_messages
+from langgraph.prebuilt import ToolNode
+
+from checkpoint_store import percentile
+from utils.checkpointer import PooledSqliteSaver
+from utils.metrics import CHECKPOINT_SECONDS
+
+MODES = ("sync", "async", "exit")
+
+
+class State(TypedDict):
+    messages: Annotated[Sequence[BaseMessage], add_messages]
+
+
+@tool
+def lookup_hours(day: str) -> str:
+    """Opening hours for a day"""
+    return f"{day}: 9am to 5pm"
+
+
+def build_graph(saver, model_seconds: float):
+    async def agent(state):
+        await asyncio.sleep(model_seconds)
+        if isinstance(state["messages"][-1], HumanMessage):
+            call = {"name": "lookup_hours", "args": {"day": "monday"}, "id": f"call-{len(state['messages'])}"}
+            return {"messages": [AIMessage(content="", tool_calls=[call])]}
+        return {"messages": [AIMessage(content="We are open 9am to 5pm on Monday. " * 5)]}
+
+    workflow = StateGraph(State)
+    workflow.add_node("agent", agent)
+    workflow.add_node("tools", ToolNode([lookup_hours]))
+    workflow.set_entry_point("agent")
+    workflow.add_conditional_edges("agent", lambda s: "continue" if s["messages"][-1].tool_calls else "end",
+                                   {"continue": "tools", "end": END})
+    workflow.add_edge("tools", "agent")
+    return workflow.compile(checkpointer=saver)
+
+
+def commits() -> int:
+    return sum(CHECKPOINT_SECONDS.count(operation=op) for op in ("write", "write_pending"))
+
+
+async def run(mode: str, args) -> dict:
+    latencies = []
+    with tempfile.TemporaryDirectory() as directory:
+        saver = await PooledSqliteSaver.open(os.path.join(directory, "cp.sqlite"), synchronous=args.synchronous)
+        try:
+            app = build_graph(saver, args.model_ms / 1000)
+
+            async def conversation(thread: int):
+                config = {"configurable": {"thread_id": f"thread-{thread}"}}
+                for turn in range(args.turns):
+                    start = time.perf_counter()
+                    await app.ainvoke({"messages": [HumanMessage(content=f"hours? {turn}")]}, config, durability=mode)
+                    latencies.append(time.perf_counter() - start)
+
+            before = commits()
+            start = time.perf_counter()
+            await asyncio.gather(*(conversation(t) for t in range(args.threads)))
+            elapsed = time.perf_counter() - start
+            total_commits = commits() - before
+        finally:
+            await saver.aclose()
+    turns = args.threads * args.turns
+    return {
+        "commits_per_turn": total_commits / turns,
+        "turns_per_s": turns / elapsed,
+        "turn_p50_ms": percentile(latencies, 50) * 1000,
+        "turn_p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=20, help="Concurrent conversations")
+    parser.add_argument("--turns", type=int, default=10, help="Turns per conversation")
+    parser.add_argument("--model-ms", type=float, default=20, help="Scripted model latency per call")
+    parser.add_argument("--synchronous", default="NORMAL", help="SQLite synchronous mode (FULL fsyncs every commit)")
+    args = parser.parse_args()
+
+    print(f"{'mode':<8}{'commits/turn':>14}{'turns/s':>10}{'turn p50':>11}{'turn p99':>11}")
+    for mode in MODES:
+        r = asyncio.run(run(mode, args))
+        print(f"{mode:<8}{r['commits_per_turn']:>14.1f}{r['turns_per_s']:>10.0f}"
+              f"{r['turn_p50_ms']:>9.1f}ms{r['turn_p99_ms']:>9.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Splits the checkpoint database into CHECKPOINT_SHARDS files, or rebalances existing shards to a
+new count (including back to one file). Run it with the app stopped, then start the app with
+the new CHECKPOINT_SHARDS:
+
+    python backend/scripts/reshard_checkpoints.py --shards 4
+    python backend/scripts/reshard_checkpoints.py --shards 8 --from 4 --remove-source
+
+Rows are copied as stored and the source files are kept unless --remove-source is given.
+Re-running after an interruption is safe.
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, SRC_DIR)
+
+import aiosqlite
+
+from utils.checkpoint_shards import existing_layouts, reshard, shard_paths
+
+
+def default_data_dir() -> str:
+    # Same choice as ChatbotAgent
+    if os.environ.get("DATA_DIR"):
+        return os.environ["DATA_DIR"]
+    if os.environ.get("WEBSITE_SITE_NAME"):
+        return "/home/data"
+    return os.path.join(SRC_DIR, "..", "data")
+
+
+async def count_rows(paths) -> dict:
+    totals = {"checkpoints": 0, "writes": 0}
+    for path in paths:
+        async with aiosqlite.connect(path) as conn:
+            for table in totals:
+                async with conn.execute(f"SELECT COUNT(*) FROM {table}") as cur:
+                    totals[table] += (await cur.fetchone())[0]
+    return totals
+
+
+async def main_async(args) -> int:
+    db_path = os.path.join(args.data_dir, "chat_history.sqlite")
+    layouts = existing_layouts(db_path)
+    sources = {n: paths for n, paths in layouts.items() if n != args.shards}
+    if args.source is not None:
+        sources = {n: paths for n, paths in sources.items() if n == args.source}
+    if not sources:
+        print(f"No checkpoint database to reshard in {args.data_dir} (found layouts: {sorted(layouts) or 'none'})")
+        return 1
+    if len(sources) > 1:
+        print(f"Several layouts found ({sorted(sources)} shards); choose one with --from")
+        return 1
+    (source_shards, source_paths), = sources.items()
+    target_paths = shard_paths(db_path, args.shards)
+
+    print(f"Resharding {source_shards} -> {args.shards} shard(s)")
+    copied = await reshard(source_paths, target_paths)
+    expected, found = await count_rows(source_paths), await count_rows(target_paths)
+    print(f"Copied {copied['checkpoints']} checkpoints and {copied['writes']} writes")
+    if any(found[table] < expected[table] for table in expected):
+        print(f"Target holds fewer rows than the source ({found} < {expected}); source files kept")
+        return 1
+
+    if args.remove_source:
+        for path in source_paths:
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+        print(f"Removed {len(source_paths)} source file(s)")
+    print(f"Done; start the app with CHECKPOINT_SHARDS={args.shards}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shards", type=int, required=True, help="Target number of shards (1 merges into one file)")
+    parser.add_argument("--from", dest="source", type=int, help="Source shard count, when several layouts exist")
+    parser.add_argument("--data-dir", default=default_data_dir(), help="Directory holding chat_history.sqlite")
+    parser.add_argument("--remove-source", action="store_true", help="Delete the source files after a verified copy")
+    sys.exit(asyncio.run(main_async(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Switches checkpoint databases created before retention existed to incremental auto-vacuum, so
+the retention sweep can return the space of deleted checkpoints to the filesystem in small
+steps. This takes one full VACUUM per file, which rewrites it and blocks writers while it runs,
+so run it with the app stopped:
+
+    python backend/scripts/vacuum_checkpoints.py
+
+Files that already use incremental auto-vacuum are left alone.
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, SRC_DIR)
+
+from utils.checkpoint_retention import enable_incremental_vacuum
+from utils.checkpoint_shards import existing_layouts
+
+
+def default_data_dir() -> str:
+    # Same choice as ChatbotAgent
+    if os.environ.get("DATA_DIR"):
+        return os.environ["DATA_DIR"]
+    if os.environ.get("WEBSITE_SITE_NAME"):
+        return "/home/data"
+    return os.path.join(SRC_DIR, "..", "data")
+
+
+async def main_async(args) -> int:
+    db_path = os.path.join(args.data_dir, "chat_history.sqlite")
+    paths = sorted({path for layout in existing_layouts(db_path).values() for path in layout})
+    if not paths:
+        print(f"No checkpoint database in {args.data_dir}")
+        return 1
+    for path in paths:
+        before = os.path.getsize(path)
+        if await enable_incremental_vacuum(path):
+            print(f"{os.path.basename(path)}: switched to incremental auto-vacuum, "
+                  f"{before / 1e6:.1f} MB -> {os.path.getsize(path) / 1e6:.1f} MB")
+        else:
+            print(f"{os.path.basename(path)}: already incremental")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", default=default_data_dir(), help="Directory holding chat_history.sqlite")
+    sys.exit(asyncio.run(main_async(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
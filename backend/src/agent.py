@@ -1,92 +1,227 @@
 import os
 import sys
+import asyncio
+import time
+import weakref
 from typing import TypedDict, Annotated, Sequence
-import operator
-from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage, AIMessage
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage, AIMessage, RemoveMessage, ToolMessage
 from langchain_openai import AzureChatOpenAI, ChatOpenAI
 from langgraph.graph import StateGraph, END
+from langgraph.graph.message import add_messages, REMOVE_ALL_MESSAGES
 from langgraph.prebuilt import ToolNode
-from config import APP_NAME
-try:
-    from backend.src.utils.mcp_client import MCPClient
-except ImportError:
-    from utils.mcp_client import MCPClient
-
-# Add local path for imports if run directly
-sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from config import (
+    APP_NAME, CONTEXT_MAX_TOKENS, CONTEXT_MAX_TURNS, COMPACT_THRESHOLD_MESSAGES, COMPACT_KEEP_TURNS,
+    ANSWER_CACHE_ENABLED, ANSWER_CACHE_SIMILARITY,
+    KNOWLEDGE_BASE_PATH, KB_TOP_K, TOOL_MAX_CONCURRENCY, MODEL_ROUTING, MODEL_ROUTING_MAX_FAST_CHARS,
+    TURN_DEADLINES, TURN_DEADLINE_SECONDS, TOOL_MAX_ITERATIONS, MCP_TOOL_TIMEOUT_SECONDS,
+    TOOL_SERVER_THREADS, MCP_SERVER_PROCESSES, MCP_HEALTH_INTERVAL_SECONDS, HTTP_CASSETTE_MODE,
+    TOOL_EXECUTION,
+    CHECKPOINT_KEEP_PER_THREAD, CHECKPOINT_PRUNE_INTERVAL_SECONDS, CHECKPOINT_PRUNE_BATCH_THREADS,
+    CHECKPOINT_CACHE_MAX_THREADS, CHECKPOINT_CACHE_MAX_MB, CHECKPOINT_SHARDS, CHECKPOINT_DB_READERS,
+    CHECKPOINT_DURABILITY, CHECKPOINT_LOCAL_DIR, CHECKPOINT_SNAPSHOT_INTERVAL_SECONDS,
+    CHECKPOINT_PURGE_INTERVAL_SECONDS, CHECKPOINT_PURGE_BATCH_ROWS
+)
+from utils.http_pool import get_async_client, get_sync_client
+from utils.metrics import CONTEXT_DROPPED_TOKENS, MODEL_CALL_SECONDS, MODEL_TOKENS, TOOL_CALL_SECONDS, TURNS_IN_FLIGHT
+from utils.checkpointer import PooledSqliteSaver
+from utils.checkpoint_retention import CheckpointPruner, ThreadPurger
+from utils.checkpoint_cache import ThreadStateCache
+from utils.checkpoint_serde import checkpoint_serializer
+from utils.checkpoint_shards import ShardedSqliteSaver, existing_layouts
+from utils.checkpoint_snapshot import CheckpointSnapshotter
+from utils.thread_aliases import ThreadAliases
+from utils.mcp_client import MCPClient
+from utils.inprocess_tools import InProcessTools
+from utils.context_window import ContextWindow, SUMMARY_MESSAGE_NAME, split_turns
+from utils.answer_cache import AnswerCache
+from utils.kb_index import KnowledgeBaseIndex, format_section, list_kb_files
+from utils.model_router import ModelRouter, RouteDecision, parse_channel_policies, FAST, LARGE
+from utils.turn_budget import TurnBudget, BUDGET_MESSAGE_NAME, parse_channel_seconds, retry_hint, tool_iterations
 
 class AgentState(TypedDict):
-    messages: Annotated[Sequence[BaseMessage], operator.add]
+    messages: Annotated[Sequence[BaseMessage], add_messages]
+
+SUMMARY_PROMPT = (
+    "Summarize the conversation below for your own future reference. Keep names, numbers, "
+    "requests, decisions and any open questions; drop pleasantries. Write at most a few short "
+    "paragraphs. If a previous summary is included, merge it into the new one."
+)
 
-from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
-import aiosqlite
 import uuid
 
 # ... imports ...
 
 class ChatbotAgent:
     def __init__(self):
-        self.mcp_client = MCPClient(
-            command=sys.executable,
-            args=[os.path.join(os.path.dirname(__file__), "utils/mcp_server.py")],
-            env=os.environ.copy()
-        )
+        # Runs the tools: MCP server processes, or the API process itself with TOOL_EXECUTION=inprocess
+        if TOOL_EXECUTION == "inprocess":
+            self.mcp_client = InProcessTools(threads=TOOL_SERVER_THREADS)
+        else:
+            self.mcp_client = MCPClient(
+                command=sys.executable,
+                args=[os.path.join(os.path.dirname(__file__), "utils/mcp_server.py")],
+                env=os.environ.copy(),
+                tool_timeout=MCP_TOOL_TIMEOUT_SECONDS,
+                # Recorded runs keep one server: the tool server cassette is a single file
+                processes=MCP_SERVER_PROCESSES if HTTP_CASSETTE_MODE == "off" else 1,
+                max_in_flight=TOOL_SERVER_THREADS,
+                health_interval=MCP_HEALTH_INTERVAL_SECONDS
+            )
         self.tools = []
         self.model = None
+        self.base_model = None
+        self.fast_model = None
         self.workflow = None
         self.app = None
+        self._init_lock = asyncio.Lock()
+        self._memory_lock = asyncio.Lock()
         # Database setup: Use /home/data on Azure App Service for persistence across deployments
-        if os.environ.get("WEBSITE_SITE_NAME"):
+        if os.environ.get("DATA_DIR"):
+            self.data_dir = os.environ["DATA_DIR"]
+        elif os.environ.get("WEBSITE_SITE_NAME"):
             self.data_dir = "/home/data"
         else:
             self.data_dir = os.path.join(os.path.dirname(__file__), "..", "data")
             
         os.makedirs(self.data_dir, exist_ok=True)
-        self.db_path = os.path.join(self.data_dir, "chat_history.sqlite")
+        # Optionally keep the live database on local disk, snapshotted to data_dir
+        self.snapshotter = CheckpointSnapshotter(
+            self.data_dir, CHECKPOINT_LOCAL_DIR, interval=CHECKPOINT_SNAPSHOT_INTERVAL_SECONDS
+        ) if CHECKPOINT_LOCAL_DIR else None
+        self.db_path = os.path.join(CHECKPOINT_LOCAL_DIR or self.data_dir, "chat_history.sqlite")
+        # Session id -> checkpoint thread of its current conversation, set up with the store
+        self.aliases = None
         
+        self.kb_index = KnowledgeBaseIndex([KNOWLEDGE_BASE_PATH]) if KB_TOP_K > 0 else None
         self.system_message = self._load_system_message()
+        self.answer_cache = AnswerCache(
+            [KNOWLEDGE_BASE_PATH],
+            similarity_threshold=ANSWER_CACHE_SIMILARITY
+        ) if ANSWER_CACHE_ENABLED else None
+        self.context_window = ContextWindow(max_tokens=CONTEXT_MAX_TOKENS, max_turns=CONTEXT_MAX_TURNS)
+        self.model_router = ModelRouter(parse_channel_policies(MODEL_ROUTING), max_fast_chars=MODEL_ROUTING_MAX_FAST_CHARS)
+        self.turn_budget = TurnBudget(
+            parse_channel_seconds(TURN_DEADLINES),
+            default_seconds=TURN_DEADLINE_SECONDS,
+            max_tool_iterations=TOOL_MAX_ITERATIONS,
+            tool_timeout=MCP_TOOL_TIMEOUT_SECONDS
+        )
+        # One lock per live thread: turns and background compaction never overlap on a thread
+        self._thread_locks = weakref.WeakValueDictionary()
+        self._tool_semaphores = weakref.WeakValueDictionary()
+        self._compaction_tasks = {}
 
     async def _init_memory(self):
-        """Initialize async sqlite saver if not exists"""
-        if not hasattr(self, 'conn') or self.conn is None:
-            self.conn = await aiosqlite.connect(self.db_path)
-            self.memory = AsyncSqliteSaver(self.conn)
-            # aiosqlite requires initialization
-            await self.memory.setup()
+        """
+        Initialize async sqlite saver if not exists. Single-flight: a reset arriving while startup
+        is still opening the store waits for it instead of opening a second one.
+        """
+        async with self._memory_lock:
+            if not hasattr(self, 'conn') or self.conn is None:
+                # Writer connection plus a pool of readers; the tables are created on open
+                cache = ThreadStateCache(
+                    max_threads=CHECKPOINT_CACHE_MAX_THREADS,
+                    max_bytes=int(CHECKPOINT_CACHE_MAX_MB * 1024 * 1024)
+                ) if CHECKPOINT_CACHE_MAX_THREADS > 0 else None
+                if self.snapshotter is not None:
+                    restored = await asyncio.to_thread(self.snapshotter.restore)
+                    if restored:
+                        print(f"Restored {len(restored)} checkpoint database(s) from {self.data_dir}")
+                layouts = existing_layouts(self.db_path)
+                if layouts and CHECKPOINT_SHARDS not in layouts:
+                    print(f"Checkpoints are stored in {sorted(layouts)} shard(s), not {CHECKPOINT_SHARDS}; "
+                          f"earlier conversations are not visible until scripts/reshard_checkpoints.py is run")
+                if CHECKPOINT_SHARDS > 1:
+                    self.memory = await ShardedSqliteSaver.open(
+                        self.db_path, CHECKPOINT_SHARDS, cache=cache, serde=checkpoint_serializer(),
+                        readers=max(1, CHECKPOINT_DB_READERS // CHECKPOINT_SHARDS)
+                    )
+                else:
+                    self.memory = await PooledSqliteSaver.open(self.db_path, cache=cache, serde=checkpoint_serializer())
+                self.conn = self.memory.conn
+                self.aliases = ThreadAliases(self.memory)
+                await self.aliases.setup()
+                self.purger = ThreadPurger(
+                    self.memory, self.aliases,
+                    batch_rows=CHECKPOINT_PURGE_BATCH_ROWS,
+                    interval=CHECKPOINT_PURGE_INTERVAL_SECONDS
+                )
+                self.purger.start()
+                if self.snapshotter is not None:
+                    self.snapshotter.watch(getattr(self.memory, "paths", [self.db_path]))
+                    self.snapshotter.start()
+                if CHECKPOINT_KEEP_PER_THREAD > 0:
+                    self.pruner = CheckpointPruner(
+                        self.memory,
+                        keep_per_thread=CHECKPOINT_KEEP_PER_THREAD,
+                        batch_threads=CHECKPOINT_PRUNE_BATCH_THREADS,
+                        interval=CHECKPOINT_PRUNE_INTERVAL_SECONDS
+                    )
+                    self.pruner.start()
 
 
     def _load_system_message(self) -> str:
-        try:
-            kb_path = os.path.join(os.path.dirname(__file__), "..", "training", "knowledge_base.md")
-            if os.path.exists(kb_path):
-                with open(kb_path, "r") as f:
-                    return f"You are {APP_NAME}, a helpful AI assistant.\n\n{f.read()}\n\nUse this knowledge to answer questions accurately.\n\nIMPORTANT: When you generate an image using the `generate_image` tool, the tool will return a markdown link (e.g. `![Generated Image](...)`). You MUST include this EXACT markdown link in your final response to the user. Do not just describe the image; show it by including the link."
-        except Exception:
-            pass
-        return f"You are {APP_NAME}, a helpful AI assistant.\n\nIMPORTANT: When you generate an image using the `generate_image` tool, the tool will return a markdown link (e.g. `![Generated Image](...)`). You MUST include this EXACT markdown link in your final response to the user. Do not just describe the image; show it by including the link."
-        
+        """Base system prompt; the whole knowledge base is only inlined when retrieval is disabled"""
+        if self.kb_index is None:
+            try:
+                knowledge = []
+                for path in list_kb_files([KNOWLEDGE_BASE_PATH]):
+                    with open(path, "r") as f:
+                        knowledge.append(f.read())
+                if knowledge:
+                    return self._system_prompt("\n\n".join(knowledge))
+            except Exception:
+                pass
+        return self._system_prompt()
+
+    def _system_prompt(self, knowledge: str = "") -> str:
+        knowledge_block = f"\n\n{knowledge}\n\nUse this knowledge to answer questions accurately." if knowledge else ""
+        return f"You are {APP_NAME}, a helpful AI assistant.{knowledge_block}\n\nIMPORTANT: When you generate an image using the `generate_image` tool, the tool will return a markdown link (e.g. `![Generated Image](...)`). You MUST include this EXACT markdown link in your final response to the user. Do not just describe the image; show it by including the link."
+
+    def _system_prompt_for(self, history) -> str:
+        """System prompt with the knowledge base sections relevant to the latest user messages"""
+        if self.kb_index is None:
+            return self.system_message
+        recent_questions = [m.content for m in history if isinstance(m, HumanMessage) and isinstance(m.content, str)][-2:]
+        sections = self.kb_index.search(" ".join(recent_questions), k=KB_TOP_K) if recent_questions else []
+        if not sections:
+            return self.system_message
+        return self._system_prompt("\n\n".join(format_section(section) for section in sections))
+
     async def initialize(self):
-        # 1. Initialize MCP Connection
-        await self.mcp_client.initialize()
+        """Single-flight: concurrent first turns share one initialization (and one MCP server)"""
+        if self.app:
+            return
+        async with self._init_lock:
+            if self.app:
+                return
+            await self._initialize()
+
+    async def _initialize(self):
+        # 1. Initialize MCP Connection and the checkpoint database concurrently
+        await asyncio.gather(self.mcp_client.initialize(), self._init_memory())
         self.tools = await self.mcp_client.get_tools()
         
         # 2. Setup Model
         if os.getenv("AZURE_OPENAI_API_KEY"):
-            self.model = AzureChatOpenAI(
-                azure_deployment=os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME"),
-                api_version=os.getenv("AZURE_OPENAI_API_VERSION", "2024-02-15-preview")
-            )
+            self.model = self._azure_model(os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME"))
+            fast_deployment = os.getenv("AZURE_OPENAI_FAST_DEPLOYMENT_NAME")
+            self.fast_model = self._azure_model(fast_deployment) if fast_deployment else None
         else:
-            self.model = ChatOpenAI(model="gpt-4o")
+            self.model = ChatOpenAI(model="gpt-4o", http_async_client=get_async_client(), http_client=get_sync_client())
+            fast_model = os.getenv("OPENAI_FAST_MODEL")
+            self.fast_model = ChatOpenAI(model=fast_model, http_async_client=get_async_client(), http_client=get_sync_client()) if fast_model else None
             
+        self.base_model = self.model
         self.model = self.model.bind_tools(self.tools)
+        if self.fast_model is not None:
+            self.fast_model = self.fast_model.bind_tools(self.tools)
         
         # 3. Define Graph
-        await self._init_memory()
-        
         workflow = StateGraph(AgentState)
         workflow.add_node("agent", self.call_model)
-        workflow.add_node("tools", ToolNode(self.tools))
+        # ToolNode runs all tool calls of one message concurrently and returns results in call order
+        workflow.add_node("tools", ToolNode(self.tools, awrap_tool_call=self._limit_tool_concurrency))
         
         workflow.set_entry_point("agent")
         workflow.add_conditional_edges(
@@ -99,15 +234,106 @@ class ChatbotAgent:
         self.app = workflow.compile(checkpointer=self.memory)
         print("Agent Initialized with Tools:", [t.name for t in self.tools])
 
-    async def call_model(self, state):
-        messages = state['messages']
+    def _azure_model(self, deployment: str):
+        return AzureChatOpenAI(
+            azure_deployment=deployment,
+            api_version=os.getenv("AZURE_OPENAI_API_VERSION", "2024-02-15-preview"),
+            http_async_client=get_async_client(),
+            http_client=get_sync_client()
+        )
+
+    async def call_model(self, state, config=None):
+        messages = stored = list(state['messages'])
         # Ensure system message is first if not present
-        if not messages or not isinstance(messages[0], SystemMessage):
-            messages = [SystemMessage(content=self.system_message)] + list(messages)
-            
-        response = await self.model.ainvoke(messages)
+        if messages and isinstance(messages[0], SystemMessage) and messages[0].name == SUMMARY_MESSAGE_NAME:
+            # Compacted thread: fold the stored summary into the system prompt
+            history = messages[1:]
+            system_message = SystemMessage(content=f"{self._system_prompt_for(history)}\n\nSummary of the earlier conversation:\n{messages[0].content}")
+        elif messages and isinstance(messages[0], SystemMessage):
+            system_message, history = messages[0], messages[1:]
+        else:
+            history = messages
+            system_message = SystemMessage(content=self._system_prompt_for(history))
+
+        # Trim old turns to the configured token/turn budget
+        messages, dropped_tokens = self.context_window.apply(system_message, history)
+        CONTEXT_DROPPED_TOKENS.observe(dropped_tokens)
+
+        configurable = (config or {}).get("configurable", {})
+        channel = configurable.get("channel", "web")
+        if tool_iterations(history) >= self.turn_budget.max_tool_iterations:
+            return {"messages": [self.turn_budget.exhausted(history, "iteration_limit")]}
+        remaining = self.turn_budget.remaining(configurable)
+        if remaining is not None and remaining <= 0:
+            return {"messages": [self.turn_budget.exhausted(history, "deadline")]}
+
+        if self.fast_model is not None:
+            # The stored messages: a compacted thread still starts with its summary here
+            decision = self.model_router.classify(stored, channel)
+        else:
+            decision = RouteDecision(LARGE, "no_fast_model")
+
+        start = time.perf_counter()
+        try:
+            response, escalated = await asyncio.wait_for(self._invoke_routed(decision, messages), remaining)
+        except asyncio.TimeoutError:
+            return {"messages": [self.turn_budget.exhausted(history, "deadline")]}
+        elapsed = time.perf_counter() - start
+        self.model_router.record(configurable.get("thread_id", ""), channel, decision, elapsed * 1000, escalated)
         return {"messages": [response]}
 
+    async def _invoke_routed(self, decision: RouteDecision, messages):
+        if decision.tier == FAST:
+            response = await self._invoke(self.fast_model, FAST, messages)
+            if response.tool_calls:
+                # The fast model wants a tool: let the large model handle the tool call instead
+                return await self._invoke(self.model, LARGE, messages), True
+            return response, False
+        return await self._invoke(self.model, LARGE, messages), False
+
+    async def _invoke(self, model, tier: str, messages):
+        """One model call, with its latency and token usage recorded under its own tier"""
+        start = time.perf_counter()
+        response = await model.ainvoke(messages)
+        MODEL_CALL_SECONDS.observe(time.perf_counter() - start, tier=tier)
+        usage = getattr(response, "usage_metadata", None)
+        if isinstance(usage, dict):
+            MODEL_TOKENS.inc(usage.get("input_tokens", 0), tier=tier, kind="prompt")
+            MODEL_TOKENS.inc(usage.get("output_tokens", 0), tier=tier, kind="completion")
+        return response
+
+    async def _limit_tool_concurrency(self, request, execute):
+        """
+        Caps how many tool calls of a turn run at once (turns on a thread never overlap),
+        and bounds each call by the tool timeout and the time left in the turn.
+        """
+        configurable = request.runtime.config.get("configurable", {})
+        thread_id = configurable.get("thread_id", "")
+        semaphore = self._tool_semaphores.get(thread_id)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(TOOL_MAX_CONCURRENCY)
+            self._tool_semaphores[thread_id] = semaphore
+        async with semaphore:
+            tool_call = request.tool_call
+            start = time.perf_counter()
+            status = "ok"
+            try:
+                return await asyncio.wait_for(execute(request), self.turn_budget.tool_timeout_for(configurable))
+            except asyncio.TimeoutError:
+                status = "timeout"
+                self.turn_budget.stats["tool_timeouts"] += 1
+                return ToolMessage(
+                    content=f"Error: {tool_call['name']} timed out",
+                    tool_call_id=tool_call["id"],
+                    name=tool_call["name"],
+                    status="error"
+                )
+            except Exception:
+                status = "error"
+                raise
+            finally:
+                TOOL_CALL_SECONDS.observe(time.perf_counter() - start, tool=tool_call.get("name", "unknown"), status=status)
+
     def should_continue(self, state):
         messages = state['messages']
         last_message = messages[-1]
@@ -115,34 +341,216 @@ class ChatbotAgent:
             return "continue"
         return "end"
 
-    async def chat(self, message: str, thread_id: str):
+    async def chat(self, message: str, thread_id: str, channel: str = "web"):
         if not self.app:
             await self.initialize()
+        thread_id = self._thread_for(thread_id)
             
-        config = {"configurable": {"thread_id": thread_id}}
-        inputs = {"messages": [HumanMessage(content=message)]}
+        config = {"configurable": {"thread_id": thread_id, "channel": channel}}
+        inputs = {"messages": [HumanMessage(content=message, id=str(uuid.uuid4()))]}
         
         try:
+            cached = await self._answer_from_cache(message, thread_id)
+            if cached is not None:
+                return cached
+
             # Invoke gets the final state of the graph
-            final_state = await self.app.ainvoke(inputs, config=config)
-            return final_state["messages"][-1].content
+            async with self._thread_lock(thread_id):
+                # The budget starts once earlier turns on the thread are done, not while queued behind them
+                config["configurable"]["deadline"] = self.turn_budget.deadline_for(channel)
+                TURNS_IN_FLIGHT.inc()
+                try:
+                    final_state = await self.app.ainvoke(inputs, config=config, durability=CHECKPOINT_DURABILITY)
+                finally:
+                    TURNS_IN_FLIGHT.dec()
+            final_message = final_state["messages"][-1]
+            self._after_turn(thread_id, len(final_state["messages"]))
+            return final_message.content
         except Exception as e:
             return f"I encountered an error: {str(e)}"
 
+    async def chat_stream(self, message: str, thread_id: str, channel: str = "web"):
+        """
+        Streams a turn as it runs instead of waiting for the final state.
+        Yields event dicts: `token` chunks from the agent node, `tool_start`/`tool_end`
+        around each tool call, and a closing `done` (or `error`) event with the full reply.
+        The checkpointer persists the turn exactly as `chat()` does.
+        """
+        if not self.app:
+            await self.initialize()
+        thread_id = self._thread_for(thread_id)
+
+        config = {"configurable": {"thread_id": thread_id, "channel": channel}}
+        inputs = {"messages": [HumanMessage(content=message, id=str(uuid.uuid4()))]}
+        final_message = ""
+        message_count = 0
+        streamed = False
+
+        try:
+            cached = await self._answer_from_cache(message, thread_id)
+            if cached is not None:
+                yield {"type": "done", "message": cached}
+                return
+
+            async with self._thread_lock(thread_id):
+                config["configurable"]["deadline"] = self.turn_budget.deadline_for(channel)
+                TURNS_IN_FLIGHT.inc()
+                try:
+                    async for event in self.app.astream_events(inputs, config=config, version="v2", durability=CHECKPOINT_DURABILITY):
+                        kind = event["event"]
+                        if kind == "on_chat_model_stream":
+                            if event.get("metadata", {}).get("langgraph_node") != "agent":
+                                continue
+                            content = event["data"]["chunk"].content
+                            if isinstance(content, str) and content:
+                                streamed = True
+                                yield {"type": "token", "content": content}
+                        elif kind == "on_chat_model_end":
+                            output = event["data"].get("output")
+                            if output is not None and not getattr(output, "tool_calls", None):
+                                final_message = output.content
+                        elif kind == "on_tool_start":
+                            yield {"type": "tool_start", "name": event["name"]}
+                        elif kind == "on_tool_end":
+                            output = event["data"].get("output")
+                            yield {"type": "tool_end", "name": event["name"], "output": str(getattr(output, "content", output))}
+                        elif kind == "on_chain_end" and not event.get("parent_ids"):
+                            # Root graph finished: its output is the final thread state
+                            output = event["data"].get("output")
+                            if isinstance(output, dict) and "messages" in output:
+                                message_count = len(output["messages"])
+                                last = output["messages"][-1] if output["messages"] else None
+                                if getattr(last, "name", None) == BUDGET_MESSAGE_NAME:
+                                    # Ended by the turn budget rather than by a model reply. The partial
+                                    # answer was streamed already, so only the hint is new; done has it all
+                                    final_message = last.content
+                                    hint = retry_hint(last)
+                                    yield {"type": "token", "content": "\n\n" + hint if streamed else hint}
+                finally:
+                    TURNS_IN_FLIGHT.dec()
+            self._after_turn(thread_id, message_count)
+            yield {"type": "done", "message": final_message}
+        except Exception as e:
+            yield {"type": "error", "message": f"I encountered an error: {str(e)}"}
+
+    async def _answer_from_cache(self, message: str, thread_id: str):
+        """
+        Serves a knowledge base FAQ answer on the first turn of a thread and records the exchange
+        in the thread as if the model had replied. Later turns go to the model: their questions
+        ("what are the pricing plans for that?") depend on the conversation.
+        """
+        if self.answer_cache is None:
+            return None
+        match = self.answer_cache.match(message)
+        if match is None:
+            self.answer_cache.record(None)
+            return None
+        answer = match[0]
+        config = {"configurable": {"thread_id": thread_id}}
+        exchange = [HumanMessage(content=message, id=str(uuid.uuid4())), AIMessage(content=answer, id=str(uuid.uuid4()))]
+        async with self._thread_lock(thread_id):
+            state = await self.app.aget_state(config)
+            if state.values.get("messages"):
+                # Goes to the model after all: a miss, so the hit rate only counts answers served
+                self.answer_cache.record(None)
+                return None
+            await self.app.aupdate_state(config, {"messages": exchange}, as_node="agent")
+        self.answer_cache.record(match)
+        return answer
+
+    def _after_turn(self, thread_id: str, message_count: int):
+        self._maybe_schedule_compaction(thread_id, message_count)
+
+    def _thread_for(self, session_id: str) -> str:
+        """Checkpoint thread of the session's current conversation (a new one after every reset)"""
+        return self.aliases.resolve(session_id) if self.aliases is not None else session_id
+
+    def _thread_lock(self, thread_id: str) -> asyncio.Lock:
+        lock = self._thread_locks.get(thread_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._thread_locks[thread_id] = lock
+        return lock
+
+    def _maybe_schedule_compaction(self, thread_id: str, message_count: int):
+        """Starts a background compaction once a thread grows past the threshold"""
+        if not COMPACT_THRESHOLD_MESSAGES or message_count <= COMPACT_THRESHOLD_MESSAGES:
+            return
+        if thread_id in self._compaction_tasks or self.base_model is None:
+            return
+        task = asyncio.create_task(self.compact_thread(thread_id))
+        self._compaction_tasks[thread_id] = task
+        task.add_done_callback(lambda _: self._compaction_tasks.pop(thread_id, None))
+
+    async def compact_thread(self, thread_id: str) -> bool:
+        """
+        Replaces all but the last COMPACT_KEEP_TURNS turns of a thread with a single summary message.
+        The summary is generated without holding the thread lock; the rewrite happens under the lock
+        and only if the summarized messages are still the head of the thread.
+        """
+        config = {"configurable": {"thread_id": thread_id}}
+        try:
+            snapshot = await self.app.aget_state(config)
+            messages = list(snapshot.values.get("messages", []))
+            turns = split_turns(messages)
+            if len(turns) <= COMPACT_KEEP_TURNS + 1:
+                return False
+            old_messages = [m for turn in turns[:-COMPACT_KEEP_TURNS] for m in turn]
+
+            transcript = "\n".join(
+                f"{'Previous summary' if m.name == SUMMARY_MESSAGE_NAME else m.type}: {m.content}"
+                for m in old_messages if m.content
+            )
+            summary = await self.base_model.ainvoke([SystemMessage(content=SUMMARY_PROMPT), HumanMessage(content=transcript)])
+
+            async with self._thread_lock(thread_id):
+                current = list((await self.app.aget_state(config)).values.get("messages", []))
+                if [m.id for m in current[:len(old_messages)]] != [m.id for m in old_messages]:
+                    # The thread was reset or rewritten while summarizing; try again after a later turn
+                    return False
+                remaining = current[len(old_messages):]
+                summary_message = SystemMessage(content=summary.content, name=SUMMARY_MESSAGE_NAME, id=str(uuid.uuid4()))
+                await self.app.aupdate_state(
+                    config,
+                    {"messages": [RemoveMessage(id=REMOVE_ALL_MESSAGES), summary_message] + remaining},
+                    as_node="agent"
+                )
+            print(f"Compacted thread {thread_id}: {len(old_messages)} messages summarized")
+            return True
+        except Exception as e:
+            print(f"Failed to compact thread {thread_id}: {e}")
+            return False
+
     async def reset_history(self, thread_id: str):
-        # We could delete the rows manually, or just let users generate a new thread.
-        # But if we must clear a specific thread ID's state:
         await self._init_memory()
         if self.conn:
             try:
-                # Remove checkpoints associated with this thread to 'reset' it
-                await self.conn.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,))
-                await self.conn.execute("DELETE FROM writes WHERE thread_id = ?", (thread_id,))
-                await self.conn.commit()
+                if self.aliases is not None:
+                    # Points the session at a new thread in one small write; the old thread's rows
+                    # are deleted later by the purger, so a reset never holds the writer for long
+                    await self.aliases.reset(thread_id)
+                else:
+                    await self.memory.adelete_thread(thread_id)
             except Exception as e:
                 print(f"Failed to reset history for {thread_id}: {e}")
 
     async def cleanup(self):
+        for task in list(self._compaction_tasks.values()):
+            task.cancel()
         await self.mcp_client.close()
-        if hasattr(self, 'conn') and self.conn:
+        if getattr(self, 'pruner', None) is not None:
+            await self.pruner.stop()
+        if getattr(self, 'purger', None) is not None:
+            await self.purger.stop()
+        if getattr(self, 'snapshotter', None) is not None:
+            await self.snapshotter.stop()
+        if getattr(self, 'memory', None) is not None:
+            await self.memory.aclose()
+        elif hasattr(self, 'conn') and self.conn:
             await self.conn.close()
+        if getattr(self, 'snapshotter', None) is not None and self.snapshotter.paths:
+            # Last snapshot once the connections are closed and the WAL is checkpointed
+            try:
+                await asyncio.to_thread(self.snapshotter.snapshot)
+            except Exception as e:
+                print(f"Final checkpoint snapshot failed: {e}")
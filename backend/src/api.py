@@ -1,5 +1,6 @@
 import os
 import sys
+import time
 import asyncio
 import uvicorn
 from fastapi import FastAPI, HTTPException, Response, Request
@@ -7,16 +8,25 @@ from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from pathlib import Path
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 
-# Add the current directory to sys.path
-sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+# Make backend/src importable when started as `backend.src.api:app`. Modules are always
+# imported by their top-level name (app_state, utils.x), never as backend.src.*, so each
+# singleton exists once. Preferred: `uvicorn api:app --app-dir backend/src`.
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
 
 import app_state
 from config import APP_NAME
 from utils.image_utils import save_base64_image
+from utils import fast_json, http_cassette, http_pool
+from utils.metrics import HTTP_REQUEST_SECONDS, HTTP_REQUESTS_IN_FLIGHT
 from routes import twilio_routes, meta_routes, system_routes
 
+# Records or replays outbound HTTP when HTTP_CASSETTE_MODE is set (before any client is created)
+http_cassette.install("app")
+
 from contextlib import asynccontextmanager
 
 cleanup_task_ref = None
@@ -36,17 +46,16 @@ async def background_cleanup_task():
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     global cleanup_task_ref
-    # Startup: Initialize Chatbot Agent
-    if app_state.chatbot:
-        await app_state.chatbot.initialize()
+    # Startup: create and initialize the ChatBot in the background; /ready reports when it is done
+    app_state.start()
         
     cleanup_task_ref = asyncio.create_task(background_cleanup_task())
     yield
     # Shutdown: Cleanup
     if cleanup_task_ref:
         cleanup_task_ref.cancel()
-    if app_state.chatbot and hasattr(app_state.chatbot, 'agent'):
-        await app_state.chatbot.agent.cleanup()
+    await app_state.shutdown()
+    await http_pool.aclose()
 
 app = FastAPI(title=APP_NAME, description=f"Enterprise API for {APP_NAME} Chatbot", lifespan=lifespan)
 
@@ -59,6 +68,26 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    # Webhook routes only acknowledge and queue work, so their latency is the ack latency
+    HTTP_REQUESTS_IN_FLIGHT.inc()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        HTTP_REQUESTS_IN_FLIGHT.dec()
+        route = request.scope.get("route")
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            path=getattr(route, "path", "unmatched"),
+            status=status
+        )
+
 # Include Routers
 app.include_router(system_routes.router, tags=["System"])
 app.include_router(twilio_routes.router, tags=["Twilio"])
@@ -75,6 +104,7 @@ class ChatResponse(BaseModel):
     message: str
 
 
+# With a response model FastAPI serializes straight to JSON bytes with Pydantic, without json.dumps
 @app.post("/chat", response_model=ChatResponse)
 async def chat_endpoint(request: ChatRequest):
     if app_state.chatbot is None: raise HTTPException(status_code=503, detail="Service unavailable")
@@ -83,6 +113,19 @@ async def chat_endpoint(request: ChatRequest):
     return ChatResponse(message=response)
 
 
+@app.post("/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest):
+    """Streams the reply as NDJSON events (token, tool_start, tool_end, done/error)"""
+    if app_state.chatbot is None: raise HTTPException(status_code=503, detail="Service unavailable")
+    if request.reset: await app_state.chatbot.reset_history(request.session_id)
+
+    async def event_lines():
+        async for event in app_state.chatbot.chat_stream(request.message, thread_id=request.session_id):
+            yield fast_json.dumps(event) + "\n"
+
+    return StreamingResponse(event_lines(), media_type="application/x-ndjson")
+
+
 @app.get("/static/generated_images/{filename}")
 async def get_image(filename: str, request: Request):
     """Serve images with explicit headers and diagnostic logging"""
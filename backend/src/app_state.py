@@ -1,14 +1,9 @@
+import asyncio
 import logging
+import time
 from collections import deque
 from datetime import datetime
 from pathlib import Path
-import os
-import sys
-
-# Add the current directory to sys.path
-sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-
-from chatbot import ChatBot
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -40,13 +35,72 @@ class DiagnosticLogger:
 
 diag_logger = DiagnosticLogger()
 
-# Initialize ChatBot
-try:
-    chatbot = ChatBot()
-    diag_logger.info("ChatBot initialized successfully via AppState.")
-except Exception as e:
-    diag_logger.error(f"Failed to initialize ChatBot: {e}")
-    chatbot = None
+# --- ChatBot lifecycle ---
+# The ChatBot (and with it langchain, langgraph and the OpenAI SDK) is created during startup,
+# not at import, so the server answers /health while the model stack is still loading.
+chatbot = None
+startup_seconds = None
+startup_error = None
+_startup_task = None
+
+def create_chatbot():
+    """Builds the ChatBot, importing the model stack on first use. Returns None on failure."""
+    from chatbot import ChatBot
+    try:
+        bot = ChatBot()
+        diag_logger.info("ChatBot initialized successfully via AppState.")
+        return bot
+    except Exception as e:
+        diag_logger.error(f"Failed to initialize ChatBot: {e}")
+        return None
+
+async def _startup():
+    global chatbot, startup_seconds, startup_error
+    start = time.perf_counter()
+    try:
+        if chatbot is None:
+            # Heavy imports run in a worker thread so the event loop keeps serving /health
+            chatbot = await asyncio.to_thread(create_chatbot)
+        if chatbot is not None:
+            await chatbot.initialize()
+    except Exception as e:
+        startup_error = str(e)
+        diag_logger.error(f"Startup failed: {e}")
+        raise
+    startup_seconds = time.perf_counter() - start
+    diag_logger.info(f"Startup finished in {startup_seconds:.2f}s")
+
+def start():
+    """Starts the startup phase once; later calls return the same task"""
+    global _startup_task
+    if _startup_task is None:
+        _startup_task = asyncio.create_task(_startup())
+    return _startup_task
+
+def is_ready() -> bool:
+    task = _startup_task
+    return (chatbot is not None and task is not None and task.done()
+            and not task.cancelled() and task.exception() is None)
+
+async def wait_until_ready(timeout: float = None) -> bool:
+    """Waits for a running startup phase to finish; True when a chatbot is available"""
+    if chatbot is not None or _startup_task is None:
+        return chatbot is not None
+    try:
+        await asyncio.wait_for(asyncio.shield(_startup_task), timeout)
+    except Exception:
+        pass
+    return chatbot is not None
+
+async def shutdown():
+    global _startup_task
+    if _startup_task is not None and not _startup_task.done():
+        _startup_task.cancel()
+    _startup_task = None
+    if chatbot and hasattr(chatbot, 'turn_queue'):
+        chatbot.turn_queue.close()
+    if chatbot and hasattr(chatbot, 'agent'):
+        await chatbot.agent.cleanup()
 
 # Shared Directories
 STATIC_DIR = Path(__file__).parent.parent / "static"
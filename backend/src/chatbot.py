@@ -1,11 +1,12 @@
 import os
-import requests
 import logging
 from openai import AzureOpenAI
 from dotenv import load_dotenv
-from config import APP_NAME
+from config import APP_NAME, TURN_COALESCE_SECONDS, TURN_COALESCE_MAX_WAIT_SECONDS
 
 from agent import ChatbotAgent
+from utils.turn_queue import TurnQueue
+from utils.http_pool import get_sync_client, pooled_post
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -25,11 +26,13 @@ class ChatBot:
         
         # Initialize Agent
         self.agent = ChatbotAgent()
+        self.turn_queue = TurnQueue(self._run_turn, window=TURN_COALESCE_SECONDS, max_wait=TURN_COALESCE_MAX_WAIT_SECONDS)
 
         self.client = AzureOpenAI(
             azure_endpoint=self.endpoint,
             api_key=self.api_key,
-            api_version=self.api_version
+            api_version=self.api_version,
+            http_client=get_sync_client()
         )
         
     async def initialize(self):
@@ -95,7 +98,7 @@ class ChatBot:
 
         try:
             logger.info(f"Targeting Image API: {flux_url}")
-            response = requests.post(flux_url, headers=headers, json=payload)
+            response = pooled_post(flux_url, headers=headers, json=payload)
             
             if response.status_code != 200:
                 logger.error(f"Image generation failed. Status: {response.status_code}, Body: {response.text}")
@@ -122,8 +125,26 @@ class ChatBot:
         if not all([self.endpoint, self.api_key, self.deployment_name]):
             raise ValueError("Missing required environment variables: AZURE_OPENAI_ENDPOINT, AZURE_OPENAI_API_KEY, AZURE_OPENAI_DEPLOYMENT_NAME")
 
-    async def chat(self, user_input: str, thread_id: str = "default_thread") -> str:
-        return await self.agent.chat(user_input, thread_id=thread_id)
+    async def chat(self, user_input: str, thread_id: str = "default_thread", coalesce: bool = False,
+                   instruction: str = None, channel: str = "web"):
+        """
+        With coalesce=True the message goes through the per-thread turn queue: a burst of messages
+        is answered by a single turn, and only the call for the last message receives the reply
+        (the others return None). Turns on a thread are always serialized by the agent.
+        `channel` (web, twilio, meta) selects the model routing policy for the turn.
+        """
+        if coalesce:
+            return await self.turn_queue.submit(thread_id, user_input, instruction=instruction, channel=channel)
+        return await self._run_turn(user_input, thread_id, instruction=instruction, channel=channel)
+
+    async def _run_turn(self, user_input: str, thread_id: str, instruction: str = None, channel: str = "web") -> str:
+        if instruction:
+            user_input = f"{user_input}\n\n[Instruction: {instruction}]"
+        return await self.agent.chat(user_input, thread_id=thread_id, channel=channel)
+
+    async def chat_stream(self, user_input: str, thread_id: str = "default_thread", channel: str = "web"):
+        async for event in self.agent.chat_stream(user_input, thread_id=thread_id, channel=channel):
+            yield event
 
     async def reset_history(self, thread_id: str = "default_thread"):
         await self.agent.reset_history(thread_id)
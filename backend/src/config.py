@@ -3,3 +3,138 @@ import os
 # Global Configuration
 APP_NAME = "Nviv AI"
 IMAGE_RETENTION_HOURS = int(os.getenv("IMAGE_RETENTION_HOURS", 1))
+
+# Context window applied before every model call (0 disables the limit)
+CONTEXT_MAX_TOKENS = int(os.getenv("CONTEXT_MAX_TOKENS", 8000))
+CONTEXT_MAX_TURNS = int(os.getenv("CONTEXT_MAX_TURNS", 30))
+
+# Background compaction of long threads into a summary message
+COMPACT_THRESHOLD_MESSAGES = int(os.getenv("COMPACT_THRESHOLD_MESSAGES", 60))
+COMPACT_KEEP_TURNS = int(os.getenv("COMPACT_KEEP_TURNS", 6))
+
+# WhatsApp messages from the same sender that arrive while their previous turn is running are answered
+# as one turn, started once no message arrived for this many seconds (a lone message is answered at once)
+TURN_COALESCE_SECONDS = float(os.getenv("TURN_COALESCE_SECONDS", 1.5))
+TURN_COALESCE_MAX_WAIT_SECONDS = float(os.getenv("TURN_COALESCE_MAX_WAIT_SECONDS", 5))
+
+# Answer cache that serves knowledge base FAQ answers to the first question of a thread without a model call
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", 0.65))
+
+# Knowledge base: a markdown file or a directory of them. Only the KB_TOP_K most relevant
+# sections are added to each prompt; KB_TOP_K=0 inlines the whole knowledge base instead.
+KNOWLEDGE_BASE_PATH = os.getenv("KNOWLEDGE_BASE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "training"))
+KB_TOP_K = int(os.getenv("KB_TOP_K", 4))
+
+# Tool calls from one model message run concurrently, up to this many at a time per turn
+TOOL_MAX_CONCURRENCY = int(os.getenv("TOOL_MAX_CONCURRENCY", 4))
+# Worker threads the MCP tool server uses for its blocking tools
+TOOL_SERVER_THREADS = int(os.getenv("TOOL_SERVER_THREADS", 8))
+# MCP tool server processes: a call goes to the least busy one and waits while every process is
+# running TOOL_SERVER_THREADS calls. Each is pinged every MCP_HEALTH_INTERVAL_SECONDS (0 disables)
+# and restarted when it does not answer or its connection breaks.
+MCP_SERVER_PROCESSES = int(os.getenv("MCP_SERVER_PROCESSES", 2))
+MCP_HEALTH_INTERVAL_SECONDS = float(os.getenv("MCP_HEALTH_INTERVAL_SECONDS", 30))
+# Where the agent runs its tools: "mcp" calls them on the MCP tool server processes over stdio;
+# "inprocess" runs the same functions in the API process on TOOL_SERVER_THREADS worker threads,
+# without the JSON-RPC round trip. The MCP server stays available to other clients either way.
+TOOL_EXECUTION = os.getenv("TOOL_EXECUTION", "mcp").lower()
+if TOOL_EXECUTION not in ("mcp", "inprocess"):
+    TOOL_EXECUTION = "mcp"
+
+# Shared HTTP connection pool used for Azure OpenAI (chat, Whisper) and image generation
+HTTP_POOL_MAX_CONNECTIONS = int(os.getenv("HTTP_POOL_MAX_CONNECTIONS", 100))
+HTTP_POOL_MAX_KEEPALIVE = int(os.getenv("HTTP_POOL_MAX_KEEPALIVE", 20))
+HTTP_POOL_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_POOL_KEEPALIVE_EXPIRY", 30))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 5))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", 120))
+# HTTP/2 is used when enabled here and the `h2` package (httpx[http2]) is installed
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "true").lower() == "true"
+
+# Fast JSON: with FAST_JSON=true webhook bodies are parsed and streamed chat events encoded with
+# orjson (when installed) instead of the json module. Checkpoints are msgpack-encoded by LangGraph
+# and /chat responses serialized by Pydantic either way.
+FAST_JSON = os.getenv("FAST_JSON", "false").lower() == "true"
+
+# Model routing per channel: "auto" sends simple turns to the fast deployment
+# (AZURE_OPENAI_FAST_DEPLOYMENT_NAME / OPENAI_FAST_MODEL) and the rest to the main one;
+# "fast" or "large" pins a channel to one tier. Routing is off when no fast deployment is set.
+MODEL_ROUTING = os.getenv("MODEL_ROUTING", "web:auto,twilio:auto,meta:auto")
+MODEL_ROUTING_MAX_FAST_CHARS = int(os.getenv("MODEL_ROUTING_MAX_FAST_CHARS", 280))
+
+# Time budget per turn in seconds, per channel (0 disables). When it runs out, or after
+# TOOL_MAX_ITERATIONS tool rounds, the turn ends with a partial answer and a retry hint.
+TURN_DEADLINES = os.getenv("TURN_DEADLINES", "web:60,twilio:40,meta:40")
+TURN_DEADLINE_SECONDS = float(os.getenv("TURN_DEADLINE_SECONDS", 60))
+TOOL_MAX_ITERATIONS = int(os.getenv("TOOL_MAX_ITERATIONS", 5))
+# Upper bound for a single MCP tool call (also capped by the time left in the turn)
+MCP_TOOL_TIMEOUT_SECONDS = float(os.getenv("MCP_TOOL_TIMEOUT_SECONDS", 30))
+
+# How long a webhook message waits for startup to finish before it is dropped
+STARTUP_WAIT_SECONDS = float(os.getenv("STARTUP_WAIT_SECONDS", 60))
+
+# Base URLs of the WhatsApp Graph API and Twilio REST API (the Twilio SDK default when empty).
+# Load tests point these, and AZURE_OPENAI_ENDPOINT, at local stand-ins.
+GRAPH_API_BASE_URL = os.getenv("GRAPH_API_BASE_URL", "https://graph.facebook.com/v18.0").rstrip("/")
+TWILIO_API_BASE_URL = os.getenv("TWILIO_API_BASE_URL", "").rstrip("/")
+
+# Record / replay of outbound HTTP for deterministic performance runs: "record" saves every
+# outbound call to HTTP_CASSETTE_DIR, "replay" answers from there without network access.
+# HTTP_CASSETTE_TIMING is "original", "none" or a factor applied to the recorded latencies.
+HTTP_CASSETTE_MODE = os.getenv("HTTP_CASSETTE_MODE", "off").lower()
+HTTP_CASSETTE_DIR = os.getenv("HTTP_CASSETTE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cassettes"))
+HTTP_CASSETTE_TIMING = os.getenv("HTTP_CASSETTE_TIMING", "original")
+
+# Checkpoint database: SQLite in WAL mode with one writer connection and a pool of read-only
+# connections. synchronous=NORMAL is crash-safe under WAL; FULL also survives power loss.
+CHECKPOINT_DB_READERS = int(os.getenv("CHECKPOINT_DB_READERS", 4))
+CHECKPOINT_DB_SYNCHRONOUS = os.getenv("CHECKPOINT_DB_SYNCHRONOUS", "NORMAL").upper()
+CHECKPOINT_DB_CACHE_KB = int(os.getenv("CHECKPOINT_DB_CACHE_KB", 16384))
+CHECKPOINT_DB_MMAP_BYTES = int(os.getenv("CHECKPOINT_DB_MMAP_BYTES", 256 * 1024 * 1024))
+CHECKPOINT_DB_BUSY_TIMEOUT_MS = int(os.getenv("CHECKPOINT_DB_BUSY_TIMEOUT_MS", 5000))
+
+# Checkpoint shards: with CHECKPOINT_SHARDS > 1 threads are spread over that many database files
+# (chat_history.0-of-N.sqlite, ...) by a stable hash of the thread id, each with its own writer.
+# CHECKPOINT_DB_READERS is split between them. Changing N needs scripts/reshard_checkpoints.py.
+CHECKPOINT_SHARDS = int(os.getenv("CHECKPOINT_SHARDS", 1))
+
+# Local-disk checkpoints: with CHECKPOINT_LOCAL_DIR set (e.g. /tmp/nviv-data on App Service, where
+# /home is a network share) the live database is kept there and snapshotted to the data directory
+# every CHECKPOINT_SNAPSHOT_INTERVAL_SECONDS, which bounds the state lost when the instance goes
+# away. Snapshots are restored on boot. Only for a single instance writing to the data directory.
+CHECKPOINT_LOCAL_DIR = os.getenv("CHECKPOINT_LOCAL_DIR", "")
+CHECKPOINT_SNAPSHOT_INTERVAL_SECONDS = float(os.getenv("CHECKPOINT_SNAPSHOT_INTERVAL_SECONDS", 30))
+
+# When a turn's state is committed: "sync" after every graph step, before the next one runs;
+# "async" after every step, in the background while the next one runs (LangGraph's default);
+# "exit" once, with the final state of the turn. "exit" saves most commits, but a turn
+# interrupted by a crash is lost instead of resumable.
+CHECKPOINT_DURABILITY = os.getenv("CHECKPOINT_DURABILITY", "async").lower()
+if CHECKPOINT_DURABILITY not in ("sync", "async", "exit"):
+    CHECKPOINT_DURABILITY = "async"
+
+# Checkpoint retention: keep the latest CHECKPOINT_KEEP_PER_THREAD checkpoints of each thread
+# (0 keeps everything). Every CHECKPOINT_PRUNE_INTERVAL_SECONDS older ones are deleted in batches
+# of CHECKPOINT_PRUNE_BATCH_THREADS threads, then the file is vacuumed incrementally and analyzed.
+CHECKPOINT_KEEP_PER_THREAD = int(os.getenv("CHECKPOINT_KEEP_PER_THREAD", 20))
+CHECKPOINT_PRUNE_INTERVAL_SECONDS = float(os.getenv("CHECKPOINT_PRUNE_INTERVAL_SECONDS", 600))
+CHECKPOINT_PRUNE_BATCH_THREADS = int(os.getenv("CHECKPOINT_PRUNE_BATCH_THREADS", 50))
+
+# Conversation resets point the session at a new checkpoint thread right away; the old thread's
+# rows are deleted in the background every CHECKPOINT_PURGE_INTERVAL_SECONDS, at most
+# CHECKPOINT_PURGE_BATCH_ROWS rows per transaction.
+CHECKPOINT_PURGE_INTERVAL_SECONDS = float(os.getenv("CHECKPOINT_PURGE_INTERVAL_SECONDS", 60))
+CHECKPOINT_PURGE_BATCH_ROWS = int(os.getenv("CHECKPOINT_PURGE_BATCH_ROWS", 500))
+
+# Hot-thread cache: the latest state of up to CHECKPOINT_CACHE_MAX_THREADS recently active threads
+# (and at most CHECKPOINT_CACHE_MAX_MB of it) is kept in memory in front of the checkpoint database.
+# 0 threads disables it.
+CHECKPOINT_CACHE_MAX_THREADS = int(os.getenv("CHECKPOINT_CACHE_MAX_THREADS", 1000))
+CHECKPOINT_CACHE_MAX_MB = float(os.getenv("CHECKPOINT_CACHE_MAX_MB", 64))
+
+# Checkpoint payload compression: "none", "zlib" or "zstd" (needs the zstandard package). Payloads
+# under CHECKPOINT_COMPRESSION_MIN_BYTES are stored as they are. Compressed rows stay readable with
+# compression turned off again.
+CHECKPOINT_COMPRESSION = os.getenv("CHECKPOINT_COMPRESSION", "none").lower()
+CHECKPOINT_COMPRESSION_LEVEL = int(os.getenv("CHECKPOINT_COMPRESSION_LEVEL", 3))
+CHECKPOINT_COMPRESSION_MIN_BYTES = int(os.getenv("CHECKPOINT_COMPRESSION_MIN_BYTES", 1024))
@@ -4,14 +4,21 @@ import re
 import requests
 from fastapi import APIRouter, Request, BackgroundTasks, Response
 import app_state
+from config import GRAPH_API_BASE_URL, STARTUP_WAIT_SECONDS
+from utils import fast_json
 from utils.image_utils import save_base64_image
+from utils.metrics import track_background_task
 
 router = APIRouter()
 
+@track_background_task("meta_whatsapp")
 async def process_meta_whatsapp_background(body: dict, host_url: str):
     app_state.diag_logger.info("Meta background task starting...")
     try:
         if body.get("object") != "whatsapp_business_account": return
+        if not await app_state.wait_until_ready(STARTUP_WAIT_SECONDS):
+            app_state.diag_logger.error("ChatBot unavailable, dropping Meta webhook")
+            return
         for entry in body.get("entry", []):
             for change in entry.get("changes", []):
                 value = change.get("value", {})
@@ -34,9 +41,15 @@ async def process_meta_whatsapp_background(body: dict, host_url: str):
                             send_meta_whatsapp_image(from_number, image_url)
                         else:
                             ai_response = await app_state.chatbot.chat(
-                                f"{user_text}\n\n[Instruction: Keep your response under 1500 characters.]",
-                                thread_id=from_number
+                                user_text,
+                                thread_id=from_number,
+                                coalesce=True,
+                                instruction="Keep your response under 1500 characters.",
+                                channel="meta"
                             )
+                            if ai_response is None:
+                                # Merged into the turn of a later message from the same sender, which sends the reply
+                                continue
                             
                             # Check if the AI generated an image (markdown format: ![alt](url))
                             image_match = re.search(r'!\[.*?\]\((.*?)\)', ai_response)
@@ -71,7 +84,7 @@ async def meta_whatsapp_webhook(request: Request, background_tasks: BackgroundTa
     Receives all live WhatsApp messages from users. 
     Acknowledges receipt immediately and processes the message in the background.
     """
-    try: body = await request.json()
+    try: body = fast_json.loads(await request.body())
     except: return {"status": "error"}
     host_url = f"{request.url.scheme}://{request.url.netloc}"
     if "azurewebsites.net" in host_url: host_url = host_url.replace("http://", "https://")
@@ -81,15 +94,15 @@ async def meta_whatsapp_webhook(request: Request, background_tasks: BackgroundTa
 def get_meta_media_url(media_id):
     token = os.getenv("WHATSAPP_ACCESS_TOKEN")
     if not token: return None
-    resp = requests.get(f"https://graph.facebook.com/v18.0/{media_id}", headers={"Authorization": f"Bearer {token}"})
+    resp = requests.get(f"{GRAPH_API_BASE_URL}/{media_id}", headers={"Authorization": f"Bearer {token}"})
     return resp.json().get("url") if resp.status_code == 200 else None
 
 def send_meta_whatsapp_message(to_number, text):
     token = os.getenv("WHATSAPP_ACCESS_TOKEN")
     pid = os.getenv("WHATSAPP_PHONE_NUMBER_ID")
-    if token and pid: requests.post(f"https://graph.facebook.com/v18.0/{pid}/messages", headers={"Authorization": f"Bearer {token}", "Content-Type": "application/json"}, json={"messaging_product": "whatsapp", "to": to_number, "type": "text", "text": {"body": text}})
+    if token and pid: requests.post(f"{GRAPH_API_BASE_URL}/{pid}/messages", headers={"Authorization": f"Bearer {token}", "Content-Type": "application/json"}, json={"messaging_product": "whatsapp", "to": to_number, "type": "text", "text": {"body": text}})
 
 def send_meta_whatsapp_image(to_number, url):
     token = os.getenv("WHATSAPP_ACCESS_TOKEN")
     pid = os.getenv("WHATSAPP_PHONE_NUMBER_ID")
-    if token and pid: requests.post(f"https://graph.facebook.com/v18.0/{pid}/messages", headers={"Authorization": f"Bearer {token}", "Content-Type": "application/json"}, json={"messaging_product": "whatsapp", "to": to_number, "type": "image", "image": {"link": url}})
+    if token and pid: requests.post(f"{GRAPH_API_BASE_URL}/{pid}/messages", headers={"Authorization": f"Bearer {token}", "Content-Type": "application/json"}, json={"messaging_product": "whatsapp", "to": to_number, "type": "image", "image": {"link": url}})
@@ -1,11 +1,104 @@
+import os
 from fastapi import APIRouter, Response
 from app_state import LOG_BUFFER, APP_NAME
+import app_state
+from utils import http_pool
+from utils.metrics import REGISTRY, gauge
 
 router = APIRouter()
 
 @router.get("/health")
 async def health_check():
-    """Basic health check endpoint"""
+    """Liveness: the process is up and serving requests"""
     return {"status": "ok"}
 
+@router.get("/ready")
+async def readiness_check(response: Response):
+    """Readiness: startup finished and the chatbot can take turns"""
+    if app_state.is_ready():
+        return {"status": "ready", "startup_seconds": app_state.startup_seconds}
+    response.status_code = 503
+    if app_state.startup_error:
+        return {"status": "failed", "error": app_state.startup_error}
+    return {"status": "starting"}
 
+@router.get("/metrics")
+async def metrics():
+    """Prometheus text exposition of request, model, tool, image and checkpoint metrics"""
+    return Response(content=REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@router.get("/http/stats")
+async def http_pool_stats():
+    """Settings and open/idle connections of the shared HTTP pool; request counters are in /metrics"""
+    return http_pool.pool_stats()
+
+@router.get("/tools/stats")
+async def tool_server_stats():
+    """Mode and per-process health of the MCP tool servers; call counts and restarts are in /metrics"""
+    client = getattr(_agent(), "mcp_client", None)
+    if client is None:
+        return {"enabled": False}
+    return {"enabled": True, **client.stats()}
+
+@router.get("/routing/stats")
+async def model_routing_stats():
+    """Channel policies and the most recent routing decisions; per-tier turn counts are in /metrics"""
+    agent = _agent()
+    router_ = getattr(agent, "model_router", None)
+    if router_ is None:
+        return {"enabled": False}
+    return {
+        "enabled": agent.fast_model is not None,
+        "policies": router_.channel_policies,
+        "recent": list(router_.recent),
+    }
+
+@router.get("/checkpoints/stats")
+async def checkpoint_stats():
+    """Checkpoint store settings: database files, retention, hot-thread cache and snapshot target"""
+    agent = _agent()
+    memory = getattr(agent, "memory", None)
+    if memory is None:
+        return {"enabled": False}
+    pruner = getattr(agent, "pruner", None)
+    purger = getattr(agent, "purger", None)
+    cache = getattr(memory, "cache", None)
+    snapshotter = getattr(agent, "snapshotter", None)
+    return {
+        "enabled": True,
+        "files": _checkpoint_paths(agent),
+        "retention": {"keep_per_thread": pruner.keep_per_thread, "interval_seconds": pruner.interval} if pruner else None,
+        "reset_purge": {"interval_seconds": purger.interval, "batch_rows": purger.batch_rows} if purger else None,
+        "cache": {"max_threads": cache.max_threads, "max_bytes": cache.max_bytes} if cache is not None else None,
+        "snapshot": {
+            "target_dir": snapshotter.persist_dir,
+            "interval_seconds": snapshotter.interval,
+            "last_snapshot_at": snapshotter.stats["last_snapshot_at"],
+        } if snapshotter else None,
+    }
+
+def _agent():
+    return getattr(app_state.chatbot, "agent", None)
+
+def _checkpoint_paths(agent):
+    memory = getattr(agent, "memory", None)
+    if memory is None:
+        return []
+    # Imported here: the checkpoint modules load LangGraph, which startup defers
+    from utils.checkpoint_shards import ShardedSqliteSaver
+    return memory.paths if isinstance(memory, ShardedSqliteSaver) else [agent.db_path]
+
+def _checkpoint_bytes():
+    files = [f for path in _checkpoint_paths(_agent()) for f in (path, path + "-wal")]
+    return {(): sum(os.path.getsize(f) for f in files if os.path.exists(f))} if files else {}
+
+def _checkpoint_readers():
+    memory = getattr(_agent(), "memory", None)
+    if memory is None:
+        return {}
+    pool = memory.pool_stats()
+    return {("idle",): pool["idle_readers"], ("busy",): pool["readers"] - pool["idle_readers"]}
+
+# Read from the running agent at scrape time
+gauge("checkpoint_database_bytes", "Size of the checkpoint databases and their WAL files on disk", callback=_checkpoint_bytes)
+gauge("checkpoint_reader_connections", "Connections of the checkpoint reader pool", ("state",), callback=_checkpoint_readers)
@@ -6,13 +6,19 @@ from fastapi import APIRouter, Request, Form, Response, BackgroundTasks
 from twilio.twiml.messaging_response import MessagingResponse
 from twilio.rest import Client as TwilioClient
 import app_state
+from config import STARTUP_WAIT_SECONDS, TWILIO_API_BASE_URL
 from utils.image_utils import save_base64_image
+from utils.metrics import track_background_task
 
 router = APIRouter()
 
+@track_background_task("twilio_whatsapp")
 async def process_twilio_whatsapp_background(body: str, from_number: str, media_url: str, media_type: str, host_url: str):
     app_state.diag_logger.info(f"Starting Twilio background task for {from_number}")
     try:
+        if not await app_state.wait_until_ready(STARTUP_WAIT_SECONDS):
+            app_state.diag_logger.error(f"ChatBot unavailable, dropping message from {from_number}")
+            return
         user_text = body or ""
         if media_url and "audio" in media_type:
             audio_response = requests.get(media_url)
@@ -29,9 +35,15 @@ async def process_twilio_whatsapp_background(body: str, from_number: str, media_
                 send_twilio_reply(from_number, "", image_url)
                 return
         ai_response = await app_state.chatbot.chat(
-            f"{user_text}\n\n[Instruction: Keep your response under 1500 characters.]",
-            thread_id=from_number
+            user_text,
+            thread_id=from_number,
+            coalesce=True,
+            instruction="Keep your response under 1500 characters.",
+            channel="twilio"
         )
+        if ai_response is None:
+            # Merged into the turn of a later message from the same sender, which sends the reply
+            return
         
         # Check if the AI generated an image (markdown format: ![alt](url))
         image_match = re.search(r'!\[.*?\]\((.*?)\)', ai_response)
@@ -54,6 +66,8 @@ def send_twilio_reply(to_number: str, message_text: str, image_url: str = None):
         return
     try:
         client = TwilioClient(account_sid, auth_token)
+        if TWILIO_API_BASE_URL:
+            client.api.base_url = TWILIO_API_BASE_URL
         params = {"from_": from_number, "to": to_number}
         if message_text:
             params["body"] = message_text
@@ -0,0 +1,159 @@
+import os
+import re
+import time
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+
+from utils import metrics
+from utils.kb_index import INSTRUCTION_PATTERN, STOPWORDS, list_kb_files
+
+ANSWER_CACHE_LOOKUPS = metrics.counter("answer_cache_lookups_total", "First questions answered from the FAQ cache, or missed", ("result",))
+ANSWER_CACHE_INVALIDATIONS = metrics.counter("answer_cache_invalidations_total", "FAQ cache reloads after the knowledge base changed")
+ANSWER_CACHE_ENTRIES = metrics.gauge("answer_cache_entries", "FAQ answers held in the answer cache")
+
+FAQ_PATTERN = re.compile(r"^###\s*Q:\s*(.+?)\s*\n+A:\s*(.+?)\s*(?=^#|\Z)", re.MULTILINE | re.DOTALL)
+
+
+def normalize_question(text: str) -> str:
+    text = INSTRUCTION_PATTERN.sub(" ", text).lower()
+    text = re.sub(r"[^\w\s]", " ", text)
+    return " ".join(text.split())
+
+
+def question_tokens(normalized: str) -> FrozenSet[str]:
+    return frozenset(w for w in normalized.split() if w not in STOPWORDS)
+
+
+def parse_faq(markdown: str) -> List[Tuple[str, str]]:
+    """Extracts (question, answer) pairs from '### Q: ...' / 'A: ...' sections"""
+    return [(q.strip(), a.strip()) for q, a in FAQ_PATTERN.findall(markdown)]
+
+
+class AnswerCache:
+    """
+    In-process cache of the FAQ answers in the knowledge base, keyed by normalized question.
+    Only these pinned answers are served: model replies are never stored, since they can depend
+    on who asked. Lookups match exactly first, then by word-overlap (Jaccard) similarity, where
+    every key term of the FAQ question must be in the question asked and every other key term
+    of the question asked must appear somewhere in the knowledge base ("pricing plans of OpenAI"
+    is not the FAQ on our pricing plans). The whole cache is rebuilt when a knowledge base file
+    is added, removed or changed on disk.
+    """
+
+    def __init__(self, kb_paths: List[str], similarity_threshold: float = 0.65, check_interval: float = 5.0):
+        self.kb_paths = kb_paths
+        self.similarity_threshold = similarity_threshold
+        self.check_interval = check_interval
+        # key -> (answer, tokens)
+        self._entries: Dict[str, Tuple[str, FrozenSet[str]]] = {}
+        self._index: Dict[str, Set[str]] = {}
+        # Key terms of the whole knowledge base
+        self._vocabulary: Set[str] = set()
+        self._kb_signature = None
+        self._next_check = 0.0
+        self.stats = {"hits": 0, "exact_hits": 0, "similar_hits": 0, "misses": 0, "stores": 0, "invalidations": 0}
+        self._refresh_if_changed(force=True)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def lookup(self, question: str) -> Optional[str]:
+        """Finds the FAQ answer for a question and counts it as served (or as a miss)"""
+        match = self.match(question)
+        self.record(match)
+        return match[0] if match else None
+
+    def match(self, question: str) -> Optional[Tuple[str, str]]:
+        """(answer, "exact" or "similar") for a question, without counting it"""
+        self._refresh_if_changed()
+        key = normalize_question(question)
+        if not key:
+            return None
+        entry = self._entries.get(key)
+        if entry:
+            return entry[0], "exact"
+        similar = self._best_similar(question_tokens(key))
+        if similar:
+            return self._entries[similar][0], "similar"
+        return None
+
+    def record(self, match: Optional[Tuple[str, str]]):
+        """Counts a match that was served as a hit and anything else as a miss"""
+        if match is None:
+            self.stats["misses"] += 1
+            ANSWER_CACHE_LOOKUPS.inc(result="miss")
+            return
+        self.stats["hits"] += 1
+        self.stats[f"{match[1]}_hits"] += 1
+        ANSWER_CACHE_LOOKUPS.inc(result=f"{match[1]}_hit")
+
+    def store(self, question: str, answer: str):
+        """Adds a knowledge base FAQ answer"""
+        key = normalize_question(question)
+        tokens = question_tokens(key)
+        if not key or not tokens or not answer:
+            return
+        self._remove(key)
+        self._entries[key] = (answer, tokens)
+        for token in tokens:
+            self._index.setdefault(token, set()).add(key)
+        self._vocabulary.update(tokens)
+        self._vocabulary.update(question_tokens(normalize_question(answer)))
+        self.stats["stores"] += 1
+        ANSWER_CACHE_ENTRIES.set(len(self._entries))
+
+    def clear(self):
+        self._entries.clear()
+        self._index.clear()
+        self._vocabulary.clear()
+        ANSWER_CACHE_ENTRIES.set(0)
+
+    def _best_similar(self, tokens: FrozenSet[str]) -> Optional[str]:
+        if not tokens or not tokens <= self._vocabulary:
+            # The question is about something the knowledge base does not mention
+            return None
+        candidates = set().union(*(self._index.get(t, ()) for t in tokens))
+        best_key, best_score = None, 0.0
+        for key in candidates:
+            faq_tokens = self._entries[key][1]
+            if not faq_tokens <= tokens:
+                continue
+            score = len(tokens & faq_tokens) / len(tokens | faq_tokens)
+            if score > best_score:
+                best_key, best_score = key, score
+        return best_key if best_score >= self.similarity_threshold else None
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry:
+            for token in entry[1]:
+                keys = self._index.get(token)
+                if keys:
+                    keys.discard(key)
+                    if not keys:
+                        del self._index[token]
+
+    def _refresh_if_changed(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now < self._next_check:
+            return
+        self._next_check = now + self.check_interval
+
+        files = list_kb_files(self.kb_paths)
+        signature = tuple((path, os.stat(path).st_mtime_ns) for path in files)
+        if signature == self._kb_signature:
+            return
+        if self._kb_signature is not None:
+            self.stats["invalidations"] += 1
+            ANSWER_CACHE_INVALIDATIONS.inc()
+        self._kb_signature = signature
+
+        self.clear()
+        for path in files:
+            try:
+                with open(path, "r") as f:
+                    text = f.read()
+            except Exception:
+                continue
+            self._vocabulary.update(question_tokens(normalize_question(text)))
+            for question, answer in parse_faq(text):
+                self.store(question, answer)
@@ -0,0 +1,239 @@
+import json
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP, CheckpointTuple, get_checkpoint_id, get_checkpoint_metadata, writes_sort_key
+)
+
+from utils import metrics
+
+CHECKPOINT_CACHE_LOOKUPS = metrics.counter("checkpoint_cache_lookups_total", "Checkpoint reads served by the hot-thread cache", ("result",))
+CHECKPOINT_CACHE_EVICTIONS = metrics.counter("checkpoint_cache_evictions_total", "Threads evicted from the hot-thread cache")
+CHECKPOINT_CACHE_ENTRIES = metrics.gauge("checkpoint_cache_entries", "Threads held in the hot-thread cache")
+CHECKPOINT_CACHE_BYTES = metrics.gauge("checkpoint_cache_bytes", "Approximate size of the states held in the hot-thread cache")
+
+# Bytes counted for values approximate_size does not look into
+SCALAR_SIZE = 16
+
+
+def approximate_size(value) -> int:
+    """Rough in-memory size of a checkpoint: string and byte lengths plus a constant per other value"""
+    total, stack, seen = 0, [value], set()
+    while stack:
+        item = stack.pop()
+        if isinstance(item, (str, bytes, bytearray)):
+            total += len(item)
+            continue
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+        elif hasattr(item, "__dict__"):
+            # Messages and other pydantic models
+            stack.extend(vars(item).values())
+        total += SCALAR_SIZE
+    return total
+
+
+def copy_checkpoint(checkpoint) -> dict:
+    """Copies the parts of a checkpoint LangGraph updates in place; unlike langgraph's
+    copy_checkpoint, adds no keys the stored checkpoint does not have"""
+    copy = dict(checkpoint)
+    copy["channel_values"] = dict(checkpoint["channel_values"])
+    copy["channel_versions"] = dict(checkpoint["channel_versions"])
+    copy["versions_seen"] = {k: dict(v) for k, v in checkpoint["versions_seen"].items()}
+    for key in ("pending_sends", "updated_channels"):
+        if isinstance(copy.get(key), list):
+            copy[key] = list(copy[key])
+    return copy
+
+
+class _Entry:
+    __slots__ = ("config", "checkpoint", "metadata", "parent_config", "writes", "size")
+
+    def __init__(self, config, checkpoint, metadata, parent_config, size):
+        self.config = config
+        self.checkpoint = checkpoint
+        self.metadata = metadata
+        self.parent_config = parent_config
+        # (task_id, idx) -> (task_path, task_id, idx, channel, value)
+        self.writes: Dict[Tuple[str, int], tuple] = {}
+        self.size = size
+
+    @property
+    def checkpoint_id(self) -> str:
+        return self.config["configurable"]["checkpoint_id"]
+
+
+class ThreadStateCache:
+    """
+    LRU cache of the latest checkpoint (with its pending writes) of recently active threads,
+    kept in front of the checkpoint saver. The saver updates it after every successful write,
+    so a hit returns exactly what a database read would, without the query or deserialization.
+
+    Entries are evicted least-recently-used beyond `max_threads` threads or `max_bytes` of
+    (approximately measured) state. Every hit returns a copy of the checkpoint's structure, since
+    LangGraph updates the loaded checkpoint in place; the channel values themselves are shared.
+    """
+
+    def __init__(self, max_threads: int = 1000, max_bytes: int = 64 * 1024 * 1024):
+        self.max_threads = max_threads
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, str], _Entry]" = OrderedDict()
+        # Bumped whenever a thread changes outside the cache, so reads and writes that started
+        # earlier do not store stale state; the table is reset (with a new epoch) when it grows
+        self._generations: Dict[Tuple[str, str], int] = {}
+        self._epoch = 0
+        self._bytes = 0
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "invalidations": 0}
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def bytes(self) -> int:
+        return self._bytes
+
+    @staticmethod
+    def key(config) -> Tuple[str, str]:
+        configurable = config["configurable"]
+        return str(configurable["thread_id"]), configurable.get("checkpoint_ns", "")
+
+    def generation(self, config) -> Tuple[int, int]:
+        """Token to pass to `fill` / `put`, taken before the database operation starts"""
+        return self._epoch, self._generations.get(self.key(config), 0)
+
+    def get(self, config) -> Optional[CheckpointTuple]:
+        key = self.key(config)
+        entry = self._entries.get(key)
+        checkpoint_id = get_checkpoint_id(config)
+        if entry is None or (checkpoint_id and checkpoint_id != entry.checkpoint_id):
+            self.stats["misses"] += 1
+            CHECKPOINT_CACHE_LOOKUPS.inc(result="miss")
+            return None
+        self._entries.move_to_end(key)
+        self.stats["hits"] += 1
+        CHECKPOINT_CACHE_LOOKUPS.inc(result="hit")
+        writes = [(task_id, channel, value) for _, task_id, _, channel, value in
+                  sorted(entry.writes.values(), key=lambda w: writes_sort_key(*w[:3]))]
+        return CheckpointTuple(
+            {"configurable": dict(entry.config["configurable"])},
+            copy_checkpoint(entry.checkpoint),
+            dict(entry.metadata),
+            entry.parent_config,
+            writes,
+        )
+
+    def fill(self, saved: CheckpointTuple, generation: Tuple[int, int]):
+        """Caches a latest checkpoint read from the database, unless the thread changed since the read began"""
+        key = self.key(saved.config)
+        if generation != self.generation(saved.config):
+            return
+        current = self._entries.get(key)
+        if current is not None and current.checkpoint_id >= saved.config["configurable"]["checkpoint_id"]:
+            return
+        if saved.pending_writes:
+            # Rare for a latest checkpoint (an interrupted run); the loaded writes lack the
+            # task paths needed to order later writes among them
+            return
+        self._store(key, _Entry(saved.config, copy_checkpoint(saved.checkpoint), saved.metadata,
+                                saved.parent_config, approximate_size(saved.checkpoint)))
+
+    def put(self, config, saved_config, checkpoint, metadata, generation: Tuple[int, int]):
+        """Records a checkpoint just written with `saver.aput(config, checkpoint, metadata, ...)`"""
+        key = self.key(saved_config)
+        if generation != self.generation(saved_config):
+            return
+        current = self._entries.get(key)
+        if current is not None and current.checkpoint_id > checkpoint["id"]:
+            return
+        configurable = saved_config["configurable"]
+        parent_id = config["configurable"].get("checkpoint_id")
+        parent_config = {"configurable": {"thread_id": str(configurable["thread_id"]),
+                                          "checkpoint_ns": configurable["checkpoint_ns"],
+                                          "checkpoint_id": parent_id}} if parent_id else None
+        # Same round trip as the saver, which stores metadata as JSON
+        stored_metadata = json.loads(json.dumps(get_checkpoint_metadata(config, metadata), ensure_ascii=False))
+        entry = _Entry({"configurable": {**configurable, "thread_id": str(configurable["thread_id"])}},
+                       copy_checkpoint(checkpoint), stored_metadata, parent_config, approximate_size(checkpoint))
+        self._store(key, entry)
+
+    def put_writes(self, config, writes, task_id: str, task_path: str = ""):
+        """Records pending writes just stored with `saver.aput_writes`"""
+        key = self.key(config)
+        entry = self._entries.get(key)
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        if entry is not None and checkpoint_id < entry.checkpoint_id:
+            # Writes for an older checkpoint do not change the latest state
+            return
+        if entry is None or checkpoint_id != entry.checkpoint_id:
+            # Writes for a checkpoint whose aput may still be in flight: that aput must not
+            # cache it without them, so the next read goes to the database
+            if entry is not None:
+                self._remove(key)
+                self.stats["invalidations"] += 1
+            self._bump(key)
+            return
+        replace = all(channel in WRITES_IDX_MAP for channel, _ in writes)
+        for index, (channel, value) in enumerate(writes):
+            idx = WRITES_IDX_MAP.get(channel, index)
+            old = entry.writes.get((task_id, idx))
+            if old is not None:
+                if not replace:
+                    continue
+                entry.size -= approximate_size(old[4])
+                self._bytes -= approximate_size(old[4])
+            entry.writes[(task_id, idx)] = (task_path, task_id, idx, channel, value)
+            added = approximate_size(value)
+            entry.size += added
+            self._bytes += added
+        self._evict()
+
+    def invalidate(self, thread_id, checkpoint_ns: Optional[str] = None):
+        """Drops a thread (all namespaces unless `checkpoint_ns` is given)"""
+        thread_id = str(thread_id)
+        keys = [k for k in self._entries if k[0] == thread_id and checkpoint_ns in (None, k[1])]
+        for key in keys:
+            self._remove(key)
+        for key in set(keys) | {(thread_id, checkpoint_ns or "")}:
+            self._bump(key)
+        self.stats["invalidations"] += 1
+
+    def clear(self):
+        for key in list(self._entries):
+            self._remove(key)
+
+    def _bump(self, key):
+        if len(self._generations) >= 4 * max(self.max_threads, 256):
+            self._generations.clear()
+            self._epoch += 1
+        self._generations[key] = self._generations.get(key, 0) + 1
+
+    def _store(self, key, entry: _Entry):
+        self._remove(key)
+        self._entries[key] = entry
+        self._bytes += entry.size
+        self.stats["stores"] += 1
+        self._evict()
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+        self._update_gauges()
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_threads or self._bytes > self.max_bytes):
+            self._remove(next(iter(self._entries)))
+            self.stats["evictions"] += 1
+            CHECKPOINT_CACHE_EVICTIONS.inc()
+        self._update_gauges()
+
+    def _update_gauges(self):
+        CHECKPOINT_CACHE_ENTRIES.set(len(self._entries))
+        CHECKPOINT_CACHE_BYTES.set(self._bytes)
@@ -0,0 +1,260 @@
+import asyncio
+import time
+from typing import Optional
+
+import aiosqlite
+
+from utils import metrics
+from utils.checkpoint_shards import ShardedSqliteSaver
+
+CHECKPOINTS_PRUNED = metrics.counter("checkpoint_pruned_rows_total", "Rows removed by checkpoint retention", ("table",))
+CHECKPOINT_BYTES_RECLAIMED = metrics.counter("checkpoint_reclaimed_bytes_total", "Bytes returned by vacuuming the checkpoint database")
+CHECKPOINT_SWEEP_SECONDS = metrics.histogram("checkpoint_sweep_duration_seconds", "Duration of checkpoint retention sweeps",
+                                             buckets=(0.1, 0.5, 1, 5, 10, 30, 60, 300, 900))
+CHECKPOINT_THREADS_PURGED = metrics.counter("checkpoint_purged_threads_total", "Threads of reset conversations deleted by the purger")
+
+# Threads are visited in thread_id order so each batch resumes where the previous one stopped
+THREADS_SQL = "SELECT DISTINCT thread_id FROM checkpoints WHERE thread_id > ? ORDER BY thread_id LIMIT ?"
+
+PRUNE_CHECKPOINTS_SQL = """
+DELETE FROM checkpoints WHERE thread_id = ? AND rowid IN (
+    SELECT rowid FROM (
+        SELECT rowid, ROW_NUMBER() OVER (PARTITION BY checkpoint_ns ORDER BY checkpoint_id DESC) AS position
+        FROM checkpoints WHERE thread_id = ?
+    ) WHERE position > ?
+)"""
+
+PRUNE_WRITES_SQL = """
+DELETE FROM writes WHERE thread_id = ? AND NOT EXISTS (
+    SELECT 1 FROM checkpoints c
+    WHERE c.thread_id = writes.thread_id AND c.checkpoint_ns = writes.checkpoint_ns AND c.checkpoint_id = writes.checkpoint_id
+)"""
+
+
+# PRAGMA auto_vacuum value of databases whose free pages can be released in small steps
+INCREMENTAL_VACUUM = 2
+
+# Rows of one thread deleted per transaction by ThreadPurger
+PURGE_ROWS_SQL = "DELETE FROM {table} WHERE rowid IN (SELECT rowid FROM {table} WHERE thread_id = ? LIMIT ?)"
+
+
+async def _pragma(conn, statement: str):
+    async with conn.execute(f"PRAGMA {statement}") as cur:
+        row = await cur.fetchone()
+    return row[0] if row else None
+
+
+async def enable_incremental_vacuum(path: str) -> bool:
+    """
+    Switches a database created without auto_vacuum to incremental auto-vacuum with one full
+    VACUUM, which rewrites the whole file and blocks writers until it finishes, so it is only
+    run offline (scripts/vacuum_checkpoints.py). Returns False when nothing had to change.
+    """
+    async with aiosqlite.connect(path) as conn:
+        if await _pragma(conn, "auto_vacuum") == INCREMENTAL_VACUUM:
+            return False
+        await conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        await conn.execute("VACUUM")
+    return True
+
+
+class CheckpointPruner:
+    """
+    Retention for the checkpoint database. LangGraph stores a checkpoint for every step of every
+    turn and never deletes them; this keeps the latest `keep_per_thread` checkpoints of each thread
+    and drops pending writes that no longer belong to a checkpoint.
+
+    A sweep visits the threads in batches of `batch_threads`, each batch in one short transaction
+    on the writer connection, pausing in between so live turns can write. It ends with an
+    incremental vacuum (in steps of `vacuum_pages` pages; databases created without incremental
+    auto-vacuum are converted offline by enable_incremental_vacuum) and a bounded ANALYZE. A sharded store
+    is swept one shard after the other.
+    """
+
+    def __init__(self, saver, keep_per_thread: int, batch_threads: int = 50, interval: float = 600,
+                 vacuum_pages: int = 2000, pause: float = 0.05):
+        self.saver = saver
+        self.stores = saver.shards if isinstance(saver, ShardedSqliteSaver) else [saver]
+        self.keep_per_thread = keep_per_thread
+        self.batch_threads = batch_threads
+        self.interval = interval
+        self.vacuum_pages = vacuum_pages
+        self.pause = pause
+        self.stats = {"sweeps": 0, "checkpoints_deleted": 0, "writes_deleted": 0, "bytes_reclaimed": 0,
+                      "last_sweep_seconds": None}
+        self._warned_full_vacuum = False
+        self._task: Optional[asyncio.Task] = None
+
+    async def prune_batch(self, store, after: str = "") -> Optional[str]:
+        """Prunes the threads following `after`; returns the last thread pruned, or None when there are no more"""
+        async with store.lock:
+            conn = store.conn
+            async with conn.execute(THREADS_SQL, (after, self.batch_threads)) as cur:
+                threads = [row[0] for row in await cur.fetchall()]
+            if not threads:
+                return None
+            checkpoints = writes = 0
+            for thread_id in threads:
+                async with conn.execute(PRUNE_CHECKPOINTS_SQL, (thread_id, thread_id, self.keep_per_thread)) as cur:
+                    checkpoints += max(cur.rowcount, 0)
+                async with conn.execute(PRUNE_WRITES_SQL, (thread_id,)) as cur:
+                    writes += max(cur.rowcount, 0)
+            await conn.commit()
+        self.stats["checkpoints_deleted"] += checkpoints
+        self.stats["writes_deleted"] += writes
+        CHECKPOINTS_PRUNED.inc(checkpoints, table="checkpoints")
+        CHECKPOINTS_PRUNED.inc(writes, table="writes")
+        return threads[-1]
+
+    async def maintain(self, store) -> int:
+        """Returns free pages to the filesystem and refreshes planner statistics; returns bytes reclaimed"""
+        conn = store.conn
+        async with store.lock:
+            page_size = await _pragma(conn, "page_size")
+            pages_before = await _pragma(conn, "page_count")
+            incremental = await _pragma(conn, "auto_vacuum") == INCREMENTAL_VACUUM
+        if not incremental and not self._warned_full_vacuum:
+            # Switching needs a full VACUUM, which would hold the writer for as long as it runs
+            print("Checkpoint database was created without incremental auto-vacuum; free pages are only "
+                  "reused, not returned. Run scripts/vacuum_checkpoints.py with the app stopped to switch it.")
+            self._warned_full_vacuum = True
+        while incremental:
+            async with store.lock:
+                if not await _pragma(conn, "freelist_count"):
+                    break
+                async with conn.execute(f"PRAGMA incremental_vacuum({int(self.vacuum_pages)})") as cur:
+                    await cur.fetchall()
+                await conn.commit()
+            await asyncio.sleep(self.pause)
+        async with store.lock:
+            await conn.execute("PRAGMA analysis_limit=1000")
+            await conn.execute("ANALYZE")
+            await conn.commit()
+            pages_after = await _pragma(conn, "page_count")
+            # Fold the WAL back into the database file and truncate it
+            await _pragma(conn, "wal_checkpoint(TRUNCATE)")
+        reclaimed = max(pages_before - pages_after, 0) * page_size
+        self.stats["bytes_reclaimed"] += reclaimed
+        CHECKPOINT_BYTES_RECLAIMED.inc(reclaimed)
+        return reclaimed
+
+    async def sweep(self) -> dict:
+        start = time.perf_counter()
+        before = dict(self.stats)
+        reclaimed = 0
+        for store in self.stores:
+            after = ""
+            while (after := await self.prune_batch(store, after)) is not None:
+                await asyncio.sleep(self.pause)
+            reclaimed += await self.maintain(store)
+        elapsed = time.perf_counter() - start
+        CHECKPOINT_SWEEP_SECONDS.observe(elapsed)
+        self.stats["sweeps"] += 1
+        self.stats["last_sweep_seconds"] = round(elapsed, 3)
+        return {
+            "checkpoints_deleted": self.stats["checkpoints_deleted"] - before["checkpoints_deleted"],
+            "writes_deleted": self.stats["writes_deleted"] - before["writes_deleted"],
+            "bytes_reclaimed": reclaimed,
+        }
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                result = await self.sweep()
+                print(f"Checkpoint retention: {result}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Checkpoint retention sweep failed: {e}")
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+class ThreadPurger:
+    """
+    Deletes the checkpoints of threads left behind by conversation resets (see ThreadAliases).
+    Every `interval` seconds it takes the threads queued at least that long ago, so a turn still
+    running on an old thread has finished, and deletes their rows `batch_rows` at a time, each
+    batch in its own short transaction on the writer, pausing in between so live turns can write.
+    """
+
+    def __init__(self, saver, aliases, batch_rows: int = 500, interval: float = 60, pause: float = 0.05):
+        self.saver = saver
+        self.aliases = aliases
+        self.batch_rows = batch_rows
+        self.interval = interval
+        self.pause = pause
+        self.stats = {"threads_purged": 0, "rows_deleted": 0, "last_purge_seconds": None}
+        self._task: Optional[asyncio.Task] = None
+
+    async def purge_thread(self, thread_id: str) -> int:
+        """Deletes all rows of a thread; returns how many"""
+        store = self.saver.shard_for(thread_id) if isinstance(self.saver, ShardedSqliteSaver) else self.saver
+        if getattr(store, "cache", None) is not None:
+            store.cache.invalidate(thread_id)
+        deleted = 0
+        for table in ("writes", "checkpoints"):
+            while True:
+                async with store.lock:
+                    async with store.conn.execute(PURGE_ROWS_SQL.format(table=table), (thread_id, self.batch_rows)) as cur:
+                        rows = max(cur.rowcount, 0)
+                    await store.conn.commit()
+                deleted += rows
+                CHECKPOINTS_PRUNED.inc(rows, table=table)
+                if rows < self.batch_rows:
+                    break
+                await asyncio.sleep(self.pause)
+        return deleted
+
+    async def purge(self, min_age: Optional[float] = None) -> dict:
+        """Purges the queued threads; returns the number of threads and rows removed"""
+        start = time.perf_counter()
+        threads = rows = 0
+        while queued := await self.aliases.queued(self.interval if min_age is None else min_age):
+            for thread_id in queued:
+                rows += await self.purge_thread(thread_id)
+                await self.aliases.forget(thread_id)
+                threads += 1
+                await asyncio.sleep(self.pause)
+        CHECKPOINT_THREADS_PURGED.inc(threads)
+        self.stats["threads_purged"] += threads
+        self.stats["rows_deleted"] += rows
+        self.stats["last_purge_seconds"] = round(time.perf_counter() - start, 3)
+        return {"threads_purged": threads, "rows_deleted": rows}
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                result = await self.purge()
+                if result["threads_purged"]:
+                    print(f"Checkpoint purge: {result}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Checkpoint purge failed: {e}")
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,78 @@
+import zlib
+from typing import Optional
+
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from config import CHECKPOINT_COMPRESSION, CHECKPOINT_COMPRESSION_LEVEL, CHECKPOINT_COMPRESSION_MIN_BYTES
+from utils import metrics
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+CHECKPOINT_SERIALIZED_BYTES = metrics.counter(
+    "checkpoint_serialized_bytes_total", "Checkpoint and pending write payload bytes before and after compression", ("stage",)
+)
+
+CODECS = ("zlib", "zstd")
+
+
+class CompressedSerializer(JsonPlusSerializer):
+    """
+    LangGraph's serializer with transparent compression of large payloads. Compressed payloads
+    are tagged like EncryptedSerializer does, as "<type>+<codec>" (e.g. "msgpack+zlib"), so rows
+    written before compression was enabled (or with it disabled) are read unchanged, and
+    compressed rows stay readable when `codec` is later set to None.
+
+    Payloads under `min_bytes`, or that do not shrink, are stored as they are.
+    """
+
+    def __init__(self, codec: Optional[str] = "zlib", level: int = 3, min_bytes: int = 1024, **kwargs):
+        super().__init__(**kwargs)
+        if codec == "zstd" and zstandard is None:
+            print("zstandard is not installed; compressing checkpoints with zlib")
+            codec = "zlib"
+        if codec not in CODECS + (None,):
+            raise ValueError(f"Unknown checkpoint compression codec: {codec}")
+        self.codec = codec
+        self.level = level
+        self.min_bytes = min_bytes
+        # Serialization runs on the event loop thread only, so the zstd contexts are shared
+        self._zstd_compressor = zstandard.ZstdCompressor(level=level) if codec == "zstd" else None
+        self._zstd_decompressor = zstandard.ZstdDecompressor() if zstandard is not None else None
+
+    def dumps_typed(self, obj):
+        type_, data = super().dumps_typed(obj)
+        CHECKPOINT_SERIALIZED_BYTES.inc(len(data), stage="raw")
+        if self.codec is not None and len(data) >= self.min_bytes:
+            compressed = self._compress(data)
+            if len(compressed) < len(data):
+                type_, data = f"{type_}+{self.codec}", compressed
+        CHECKPOINT_SERIALIZED_BYTES.inc(len(data), stage="stored")
+        return type_, data
+
+    def loads_typed(self, data):
+        type_, payload = data
+        base, _, codec = type_.rpartition("+")
+        if base and codec in CODECS:
+            return super().loads_typed((base, self._decompress(codec, payload)))
+        return super().loads_typed(data)
+
+    def _compress(self, data: bytes) -> bytes:
+        if self.codec == "zstd":
+            return self._zstd_compressor.compress(data)
+        return zlib.compress(data, self.level)
+
+    def _decompress(self, codec: str, data: bytes) -> bytes:
+        if codec == "zlib":
+            return zlib.decompress(data)
+        if self._zstd_decompressor is None:
+            raise RuntimeError("Checkpoint was compressed with zstd, but zstandard is not installed")
+        return self._zstd_decompressor.decompress(data)
+
+
+def checkpoint_serializer(codec: str = CHECKPOINT_COMPRESSION, level: int = CHECKPOINT_COMPRESSION_LEVEL,
+                          min_bytes: int = CHECKPOINT_COMPRESSION_MIN_BYTES) -> CompressedSerializer:
+    """Serializer for the checkpoint store; with compression off it still reads compressed rows"""
+    return CompressedSerializer(codec=None if codec in ("", "none", "off") else codec, level=level, min_bytes=min_bytes)
@@ -0,0 +1,173 @@
+import glob
+import heapq
+import os
+import re
+import zlib
+from typing import Dict, List, Optional
+
+import aiosqlite
+from langgraph.checkpoint.base import BaseCheckpointSaver
+
+from utils.checkpointer import PooledSqliteSaver
+
+SHARD_PATTERN = re.compile(r"\.(\d+)-of-(\d+)$")
+
+CHECKPOINT_COLUMNS = "thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata"
+WRITES_COLUMNS = "thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, type, value"
+
+
+def shard_index(thread_id, shards: int) -> int:
+    """Stable across processes and restarts, unlike hash()"""
+    return zlib.crc32(str(thread_id).encode("utf-8")) % shards
+
+
+def shard_paths(db_path: str, shards: int) -> List[str]:
+    """chat_history.sqlite for one shard, chat_history.0-of-4.sqlite ... chat_history.3-of-4.sqlite for four"""
+    if shards <= 1:
+        return [db_path]
+    stem, ext = os.path.splitext(db_path)
+    return [f"{stem}.{i}-of-{shards}{ext}" for i in range(shards)]
+
+
+def existing_layouts(db_path: str) -> Dict[int, List[str]]:
+    """Shard count -> files, for every complete layout of `db_path` found on disk"""
+    layouts = {1: [db_path]} if os.path.exists(db_path) else {}
+    stem, ext = os.path.splitext(db_path)
+    for path in glob.glob(f"{glob.escape(stem)}.*-of-*{ext}"):
+        match = SHARD_PATTERN.search(os.path.splitext(path)[0])
+        if match:
+            shards = int(match.group(2))
+            paths = shard_paths(db_path, shards)
+            if all(os.path.exists(p) for p in paths):
+                layouts[shards] = paths
+    return layouts
+
+
+class ShardedSqliteSaver(BaseCheckpointSaver):
+    """
+    Checkpoint store split over several SQLite files (each a PooledSqliteSaver with its own writer
+    and readers) by a stable hash of the thread id, so conversations on different shards never
+    wait for each other's writes. All checkpoints and writes of a thread live in one shard;
+    listing across threads merges the shards.
+    """
+
+    def __init__(self, shards: List[PooledSqliteSaver], paths: Optional[List[str]] = None):
+        super().__init__(serde=shards[0].serde)
+        self.shards = shards
+        self.paths = paths or []
+
+    @classmethod
+    async def open(cls, db_path: str, shards: int, **kwargs) -> "ShardedSqliteSaver":
+        paths = shard_paths(db_path, shards)
+        return cls([await PooledSqliteSaver.open(path, **kwargs) for path in paths], paths)
+
+    @property
+    def conn(self):
+        return self.shards[0].conn
+
+    @property
+    def cache(self):
+        return self.shards[0].cache
+
+    def shard_for(self, thread_id) -> PooledSqliteSaver:
+        return self.shards[shard_index(thread_id, len(self.shards))]
+
+    def _shard(self, config) -> PooledSqliteSaver:
+        return self.shard_for(config["configurable"]["thread_id"])
+
+    async def aget_tuple(self, config):
+        return await self._shard(config).aget_tuple(config)
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        if config and config.get("configurable", {}).get("thread_id") is not None:
+            async for item in self._shard(config).alist(config, filter=filter, before=before, limit=limit):
+                yield item
+            return
+        # Each shard lists newest first; merge them the same way
+        per_shard = [[item async for item in shard.alist(config, filter=filter, before=before, limit=limit)]
+                     for shard in self.shards]
+        merged = heapq.merge(*per_shard, key=lambda item: item.config["configurable"]["checkpoint_id"], reverse=True)
+        for count, item in enumerate(merged):
+            if limit is not None and count >= limit:
+                break
+            yield item
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        return await self._shard(config).aput(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config, writes, task_id, task_path=""):
+        await self._shard(config).aput_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id):
+        await self.shard_for(thread_id).adelete_thread(thread_id)
+
+    async def aget_delta_channel_history(self, *, config, channels):
+        return await self._shard(config).aget_delta_channel_history(config=config, channels=channels)
+
+    def get_next_version(self, current, channel):
+        return self.shards[0].get_next_version(current, channel)
+
+    def with_allowlist(self, extra_allowlist):
+        shards = [shard.with_allowlist(extra_allowlist) for shard in self.shards]
+        if all(new is old for new, old in zip(shards, self.shards)):
+            return self
+        return ShardedSqliteSaver(shards, self.paths)
+
+    def pool_stats(self) -> dict:
+        stats = [shard.pool_stats() for shard in self.shards]
+        return {
+            "shards": len(self.shards),
+            "readers": sum(s["readers"] for s in stats),
+            "idle_readers": sum(s["idle_readers"] for s in stats),
+            "writers_locked": sum(s["writer_locked"] for s in stats),
+        }
+
+    async def aclose(self):
+        for shard in self.shards:
+            await shard.aclose()
+
+
+async def _columns(conn: aiosqlite.Connection, schema: str, table: str) -> List[str]:
+    async with conn.execute(f"PRAGMA {schema}.table_info({table})") as cur:
+        return [row[1] for row in await cur.fetchall()]
+
+
+async def reshard(source_paths: List[str], target_paths: List[str]) -> Dict[str, int]:
+    """
+    Copies every thread of the source files (one database or an older shard layout) into the
+    target layout, routing each thread to its shard. Rows are copied as stored, without
+    deserializing them. Existing rows in the targets are kept, so an interrupted run can be
+    repeated. Session aliases and queued purges of conversation resets move to the first shard.
+    Returns the number of checkpoints and writes copied.
+    """
+    # Imported here: thread_aliases builds on this module
+    from utils.thread_aliases import SCHEMA as ALIAS_SCHEMA
+
+    shards = len(target_paths)
+    copied = {"checkpoints": 0, "writes": 0}
+    for index, target_path in enumerate(target_paths):
+        # Creates the tables with the store's pragmas
+        await (await PooledSqliteSaver.open(target_path, readers=0)).aclose()
+        async with aiosqlite.connect(target_path) as conn:
+            await conn.create_function("shard_index", 1, lambda thread_id: shard_index(thread_id, shards), deterministic=True)
+            for source_path in source_paths:
+                await conn.execute("ATTACH DATABASE ? AS source", (source_path,))
+                try:
+                    # Databases from before task_path was added to the writes table
+                    writes_columns = WRITES_COLUMNS
+                    if "task_path" in await _columns(conn, "source", "writes"):
+                        writes_columns += ", task_path"
+                    for table, columns in (("checkpoints", CHECKPOINT_COLUMNS), ("writes", writes_columns)):
+                        async with conn.execute(
+                            f"INSERT OR IGNORE INTO main.{table} ({columns}) "
+                            f"SELECT {columns} FROM source.{table} WHERE shard_index(thread_id) = ?", (index,)
+                        ) as cur:
+                            copied[table] += max(cur.rowcount, 0)
+                    if index == 0 and await _columns(conn, "source", "thread_aliases"):
+                        await conn.executescript(ALIAS_SCHEMA)
+                        for table in ("thread_aliases", "thread_purges"):
+                            await conn.execute(f"INSERT OR IGNORE INTO main.{table} SELECT * FROM source.{table}")
+                    await conn.commit()
+                finally:
+                    await conn.execute("DETACH DATABASE source")
+    return copied
@@ -0,0 +1,157 @@
+import asyncio
+import glob
+import os
+import shutil
+import sqlite3
+import time
+from typing import Dict, List, Optional, Tuple
+
+from utils import metrics
+
+CHECKPOINT_SNAPSHOT_SECONDS = metrics.histogram(
+    "checkpoint_snapshot_duration_seconds", "Time to snapshot the local checkpoint database to persistent storage",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+CHECKPOINT_SNAPSHOT_AGE = metrics.gauge(
+    "checkpoint_snapshot_age_seconds", "Seconds since the last checkpoint snapshot",
+    callback=lambda: {(): time.time() - _last_snapshot_at} if _last_snapshot_at else {},
+)
+CHECKPOINT_SNAPSHOT_BYTES = metrics.counter("checkpoint_snapshot_bytes_total", "Bytes copied to persistent storage by checkpoint snapshots")
+CHECKPOINT_SNAPSHOT_FAILURES = metrics.counter("checkpoint_snapshot_failures_total", "Background checkpoint snapshots that failed")
+CHECKPOINT_SNAPSHOT_RESTORED = metrics.counter("checkpoint_snapshot_restored_total", "Databases restored from snapshots on boot")
+_last_snapshot_at = 0.0
+
+DB_PATTERN = "chat_history*.sqlite"
+
+
+def _signature(path: str) -> Tuple:
+    """Changes whenever a commit reaches the database or its WAL"""
+    return tuple((os.stat(p).st_mtime_ns, os.stat(p).st_size) if os.path.exists(p) else None
+                 for p in (path, path + "-wal"))
+
+
+def _backup(source_path: str, target_path: str):
+    """Consistent copy of a live database (including committed WAL content) with the online backup API"""
+    source = sqlite3.connect(source_path)
+    target = sqlite3.connect(target_path)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+
+def _remove_sidecars(path: str):
+    for suffix in ("-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+class CheckpointSnapshotter:
+    """
+    Keeps the live checkpoint database on fast local disk and copies it to persistent storage
+    (the /home/data share on Azure) every `interval` seconds when it changed, so at most that
+    much conversation state is lost when the instance goes away.
+
+    A snapshot is taken with SQLite's online backup API into a local file, which is then copied
+    to the share under a temporary name and renamed over the previous snapshot, so the share
+    always holds a complete database. On boot, `restore` brings the snapshots back to local disk
+    unless the local copy is newer. Snapshots have the same names as the databases, so turning
+    this mode off again picks them up directly.
+    """
+
+    def __init__(self, persist_dir: str, local_dir: str, interval: float = 30):
+        self.persist_dir = persist_dir
+        self.local_dir = local_dir
+        self.interval = interval
+        self.paths: List[str] = []
+        self.stats = {"snapshots": 0, "restored": 0, "last_snapshot_seconds": None, "last_snapshot_at": None,
+                      "bytes": 0, "failures": 0}
+        self._signatures: Dict[str, Tuple] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def persist_path(self, local_path: str) -> str:
+        return os.path.join(self.persist_dir, os.path.basename(local_path))
+
+    def restore(self) -> List[str]:
+        """Copies snapshots that are newer than the local databases to local disk; returns the restored files"""
+        os.makedirs(self.local_dir, exist_ok=True)
+        restored = []
+        for persist_path in sorted(glob.glob(os.path.join(glob.escape(self.persist_dir), DB_PATTERN))):
+            local_path = os.path.join(self.local_dir, os.path.basename(persist_path))
+            local_mtime = max((os.path.getmtime(p) for p in (local_path, local_path + "-wal") if os.path.exists(p)), default=None)
+            if local_mtime is not None and local_mtime >= os.path.getmtime(persist_path):
+                continue
+            staging = local_path + ".restore"
+            # Read through SQLite rather than copying the file, so a WAL left next to it is applied
+            _backup(persist_path, staging)
+            _remove_sidecars(local_path)
+            os.replace(staging, local_path)
+            self._signatures[local_path] = _signature(local_path)
+            restored.append(local_path)
+        self.stats["restored"] += len(restored)
+        CHECKPOINT_SNAPSHOT_RESTORED.inc(len(restored))
+        return restored
+
+    def watch(self, paths: List[str]):
+        """Sets the live databases to snapshot"""
+        self.paths = list(paths)
+
+    def snapshot(self, force: bool = False) -> int:
+        """Snapshots the databases that changed since the last snapshot; returns how many were copied"""
+        global _last_snapshot_at
+        start = time.perf_counter()
+        copied = 0
+        for local_path in self.paths:
+            signature = _signature(local_path)
+            if not force and signature == self._signatures.get(local_path):
+                continue
+            staging = local_path + ".snapshot"
+            persist_path = self.persist_path(local_path)
+            try:
+                _backup(local_path, staging)
+                shutil.copyfile(staging, persist_path + ".tmp")
+                # The share's WAL and shm, if any, belong to the database being replaced
+                _remove_sidecars(persist_path)
+                os.replace(persist_path + ".tmp", persist_path)
+                size = os.path.getsize(staging)
+                self.stats["bytes"] += size
+                CHECKPOINT_SNAPSHOT_BYTES.inc(size)
+            finally:
+                if os.path.exists(staging):
+                    os.remove(staging)
+            self._signatures[local_path] = signature
+            copied += 1
+        elapsed = time.perf_counter() - start
+        if copied:
+            CHECKPOINT_SNAPSHOT_SECONDS.observe(elapsed)
+            self.stats["snapshots"] += 1
+            self.stats["last_snapshot_seconds"] = round(elapsed, 3)
+        _last_snapshot_at = time.time()
+        self.stats["last_snapshot_at"] = _last_snapshot_at
+        return copied
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.to_thread(self.snapshot)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats["failures"] += 1
+                CHECKPOINT_SNAPSHOT_FAILURES.inc()
+                print(f"Checkpoint snapshot failed: {e}")
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
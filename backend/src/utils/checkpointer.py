@@ -0,0 +1,196 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager, nullcontext
+from typing import List, Optional
+
+import aiosqlite
+from langgraph.checkpoint.base import get_checkpoint_id
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+from config import (
+    CHECKPOINT_DB_READERS, CHECKPOINT_DB_SYNCHRONOUS, CHECKPOINT_DB_CACHE_KB,
+    CHECKPOINT_DB_MMAP_BYTES, CHECKPOINT_DB_BUSY_TIMEOUT_MS
+)
+from utils import metrics
+from utils.checkpoint_cache import ThreadStateCache
+from utils.metrics import CHECKPOINT_SECONDS
+
+SYNCHRONOUS_MODES = ("OFF", "NORMAL", "FULL", "EXTRA")
+
+CHECKPOINT_LOCK_WAIT_SECONDS = metrics.histogram(
+    "checkpoint_lock_wait_seconds", "Time checkpoint operations wait for the writer connection or a pooled reader",
+    ("lock",), buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5),
+)
+
+
+class InstrumentedSqliteSaver(AsyncSqliteSaver):
+    """AsyncSqliteSaver that records how long checkpoint reads and writes take"""
+
+    async def aget_tuple(self, config):
+        with CHECKPOINT_SECONDS.time(operation="read"):
+            return await super().aget_tuple(config)
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        with CHECKPOINT_SECONDS.time(operation="write"):
+            return await super().aput(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config, writes, task_id, task_path=""):
+        with CHECKPOINT_SECONDS.time(operation="write_pending"):
+            return await super().aput_writes(config, writes, task_id, task_path)
+
+
+class TimedLock(asyncio.Lock):
+    """asyncio.Lock recording how long callers wait to acquire it"""
+
+    def __init__(self, name: str):
+        super().__init__()
+        self.name = name
+
+    async def acquire(self):
+        start = time.perf_counter()
+        result = await super().acquire()
+        CHECKPOINT_LOCK_WAIT_SECONDS.observe(time.perf_counter() - start, lock=self.name)
+        return result
+
+
+class _ReaderView:
+    """The saver as seen by one read: its settings and serializer, a pooled connection and no writer lock"""
+
+    def __init__(self, saver: "PooledSqliteSaver", conn: aiosqlite.Connection):
+        self._saver = saver
+        self.conn = conn
+        self.lock = nullcontext()
+
+    def __getattr__(self, name):
+        return getattr(self._saver, name)
+
+
+def pragma_script(read_only: bool = False, synchronous: str = CHECKPOINT_DB_SYNCHRONOUS,
+                  cache_kb: int = CHECKPOINT_DB_CACHE_KB, mmap_bytes: int = CHECKPOINT_DB_MMAP_BYTES,
+                  busy_timeout_ms: int = CHECKPOINT_DB_BUSY_TIMEOUT_MS) -> str:
+    synchronous = synchronous.upper() if synchronous.upper() in SYNCHRONOUS_MODES else "NORMAL"
+    pragmas = [
+        f"PRAGMA busy_timeout={int(busy_timeout_ms)}",
+        f"PRAGMA cache_size=-{int(cache_kb)}",
+        f"PRAGMA mmap_size={int(mmap_bytes)}",
+    ]
+    if read_only:
+        pragmas.append("PRAGMA query_only=1")
+    else:
+        # WAL lets the pooled readers run while the writer commits; with WAL, NORMAL only
+        # syncs at checkpoints and stays safe against application crashes
+        # auto_vacuum only takes effect on a new database (older ones: scripts/vacuum_checkpoints.py)
+        pragmas += ["PRAGMA auto_vacuum=INCREMENTAL", "PRAGMA journal_mode=WAL", f"PRAGMA synchronous={synchronous}"]
+    return ";\n".join(pragmas) + ";"
+
+
+class PooledSqliteSaver(InstrumentedSqliteSaver):
+    """
+    Checkpoint store on one SQLite database in WAL mode: writes (and setup / deletes) go through
+    the single writer connection of AsyncSqliteSaver, while checkpoint reads take a connection
+    from a pool of read-only connections, so loading one conversation never waits for another's
+    write. Lock waits for the writer and the pool are recorded in checkpoint_lock_wait_seconds.
+
+    With a `cache`, the latest state of recently active threads is also kept in memory: writes
+    go to the database first and then to the cache, and latest-checkpoint reads of a cached
+    thread touch neither the database nor the serializer.
+    """
+
+    def __init__(self, conn: aiosqlite.Connection, readers: Optional[List[aiosqlite.Connection]] = None, *,
+                 serde=None, cache: Optional[ThreadStateCache] = None):
+        super().__init__(conn, serde=serde)
+        self.lock = TimedLock("writer")
+        self.cache = cache
+        self.readers: List[aiosqlite.Connection] = []
+        self._idle: asyncio.Queue = asyncio.Queue()
+        for reader in readers or []:
+            self.add_reader(reader)
+
+    @classmethod
+    async def open(cls, path: str, readers: int = CHECKPOINT_DB_READERS, cache: Optional[ThreadStateCache] = None,
+                   serde=None, **pragmas) -> "PooledSqliteSaver":
+        writer = await aiosqlite.connect(path)
+        await writer.executescript(pragma_script(**pragmas))
+        saver = cls(writer, serde=serde, cache=cache)
+        # Tables must exist before read-only connections can use them
+        await saver.setup()
+        for _ in range(readers):
+            reader = await aiosqlite.connect(path)
+            await reader.executescript(pragma_script(read_only=True, **pragmas))
+            saver.add_reader(reader)
+        return saver
+
+    async def setup(self):
+        # Skips the writer lock AsyncSqliteSaver.setup takes on every call
+        if not self.is_setup:
+            await super().setup()
+
+    def add_reader(self, conn: aiosqlite.Connection):
+        self.readers.append(conn)
+        self._idle.put_nowait(conn)
+
+    @asynccontextmanager
+    async def _reader(self):
+        if not self.readers:
+            # No pool: read on the writer connection, under its lock
+            async with self.lock:
+                yield self.conn
+            return
+        start = time.perf_counter()
+        conn = await self._idle.get()
+        CHECKPOINT_LOCK_WAIT_SECONDS.observe(time.perf_counter() - start, lock="reader")
+        try:
+            yield conn
+        finally:
+            self._idle.put_nowait(conn)
+
+    async def aget_tuple(self, config):
+        with CHECKPOINT_SECONDS.time(operation="read"):
+            if self.cache is None:
+                async with self._reader() as conn:
+                    return await AsyncSqliteSaver.aget_tuple(_ReaderView(self, conn), config)
+            saved = self.cache.get(config)
+            if saved is not None:
+                return saved
+            generation = self.cache.generation(config)
+            async with self._reader() as conn:
+                saved = await AsyncSqliteSaver.aget_tuple(_ReaderView(self, conn), config)
+            if saved is not None and not get_checkpoint_id(config):
+                self.cache.fill(saved, generation)
+            return saved
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        if self.cache is None:
+            return await super().aput(config, checkpoint, metadata, new_versions)
+        generation = self.cache.generation(config)
+        saved = await super().aput(config, checkpoint, metadata, new_versions)
+        self.cache.put(config, saved, checkpoint, metadata, generation)
+        return saved
+
+    async def aput_writes(self, config, writes, task_id, task_path=""):
+        await super().aput_writes(config, writes, task_id, task_path)
+        if self.cache is not None:
+            self.cache.put_writes(config, writes, task_id, task_path if self._has_task_path else "")
+
+    async def adelete_thread(self, thread_id):
+        if self.cache is not None:
+            self.cache.invalidate(thread_id)
+        await super().adelete_thread(thread_id)
+        if self.cache is not None:
+            # Again, for reads that started while the delete was running
+            self.cache.invalidate(thread_id)
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        async with self._reader() as conn:
+            async for item in AsyncSqliteSaver.alist(_ReaderView(self, conn), config, filter=filter, before=before, limit=limit):
+                yield item
+
+    def pool_stats(self) -> dict:
+        return {"readers": len(self.readers), "idle_readers": self._idle.qsize(), "writer_locked": self.lock.locked()}
+
+    async def aclose(self):
+        for reader in self.readers:
+            await reader.close()
+        self.readers = []
+        self._idle = asyncio.Queue()
+        await self.conn.close()
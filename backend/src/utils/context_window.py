@@ -0,0 +1,96 @@
+from collections import OrderedDict
+from typing import List, Sequence, Tuple
+
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+
+# Token estimate: ~4 characters per token for English text, plus the fixed
+# per-message overhead the chat format adds (role, separators). An estimate keeps
+# trimming free of tokenizer downloads and is close enough for a budget.
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Name given to the SystemMessage that replaces compacted turns at the start of a thread
+SUMMARY_MESSAGE_NAME = "conversation_summary"
+
+
+def split_turns(messages: Sequence[BaseMessage]) -> List[List[BaseMessage]]:
+    """Groups messages into turns, each starting at a HumanMessage"""
+    turns: List[List[BaseMessage]] = []
+    for message in messages:
+        if not turns or isinstance(message, HumanMessage):
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+
+class ContextWindow:
+    """
+    Trims conversation history to a token/turn budget before it is sent to the model.
+    The system prompt is always kept, and history is dropped a whole turn at a time
+    (a turn starts at a HumanMessage), so tool-call / tool-result pairs stay intact.
+    """
+
+    def __init__(self, max_tokens: int = 0, max_turns: int = 0, cache_size: int = 10000):
+        self.max_tokens = max_tokens
+        self.max_turns = max_turns
+        self.cache_size = cache_size
+        self._token_cache: "OrderedDict[str, int]" = OrderedDict()
+        self.stats = {
+            "calls": 0,
+            "dropped_messages": 0,
+            "dropped_tokens": 0,
+            "last_dropped_tokens": 0,
+            "last_kept_tokens": 0,
+        }
+
+    def count_tokens(self, message: BaseMessage) -> int:
+        """Estimated token count for a single message, cached by message id"""
+        key = message.id
+        if key:
+            cached = self._token_cache.get(key)
+            if cached is not None:
+                self._token_cache.move_to_end(key)
+                return cached
+
+        text = message.content if isinstance(message.content, str) else str(message.content)
+        tool_calls = getattr(message, "tool_calls", None)
+        if tool_calls:
+            text += str(tool_calls)
+        tokens = -(-len(text) // CHARS_PER_TOKEN) + MESSAGE_OVERHEAD_TOKENS
+
+        if key:
+            self._token_cache[key] = tokens
+            if len(self._token_cache) > self.cache_size:
+                self._token_cache.popitem(last=False)
+        return tokens
+
+    def apply(self, system_message: SystemMessage, messages: Sequence[BaseMessage]) -> Tuple[List[BaseMessage], int]:
+        """
+        Returns the messages to send (system prompt first) and the number of tokens dropped.
+        The most recent turn is always kept, even if it alone exceeds the budget.
+        """
+        turns = split_turns(messages)
+        budget = self.max_tokens - self.count_tokens(system_message) if self.max_tokens else None
+
+        kept_turns = []
+        kept_tokens = 0
+        for turn in reversed(turns):
+            turn_tokens = sum(self.count_tokens(m) for m in turn)
+            if kept_turns:
+                if self.max_turns and len(kept_turns) >= self.max_turns:
+                    break
+                if budget is not None and kept_tokens + turn_tokens > budget:
+                    break
+            kept_turns.append(turn)
+            kept_tokens += turn_tokens
+
+        kept = [m for turn in reversed(kept_turns) for m in turn]
+        dropped = turns[:len(turns) - len(kept_turns)]
+        dropped_tokens = sum(self.count_tokens(m) for turn in dropped for m in turn)
+
+        self.stats["calls"] += 1
+        self.stats["dropped_messages"] += len(messages) - len(kept)
+        self.stats["dropped_tokens"] += dropped_tokens
+        self.stats["last_dropped_tokens"] = dropped_tokens
+        self.stats["last_kept_tokens"] = kept_tokens + self.count_tokens(system_message)
+        return [system_message] + kept, dropped_tokens
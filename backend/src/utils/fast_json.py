@@ -0,0 +1,29 @@
+import json
+from typing import Any, Union
+
+from config import FAST_JSON
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if FAST_JSON and orjson is None:
+    print("orjson is not installed; FAST_JSON falls back to the json module")
+
+
+def loads(data: Union[bytes, str], fast: bool = FAST_JSON) -> Any:
+    """Parses a JSON document, with orjson when FAST_JSON is on; raises ValueError on bad input either way"""
+    if fast and orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj: Any, fast: bool = FAST_JSON) -> str:
+    """
+    Compact JSON text, with orjson when FAST_JSON is on. The output is valid JSON in both cases, but
+    not byte-identical: orjson leaves out the spaces after separators and does not escape non-ASCII.
+    """
+    if fast and orjson is not None:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj)
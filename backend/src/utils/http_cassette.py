@@ -0,0 +1,294 @@
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from config import HTTP_CASSETTE_DIR, HTTP_CASSETTE_MODE, HTTP_CASSETTE_TIMING
+
+MODES = ("off", "record", "replay")
+
+# Headers describing the encoded body; requests hands us decoded content, so they are not replayed
+_DECODED_BODY_HEADERS = {"content-encoding", "transfer-encoding", "content-length"}
+
+
+class CassetteMiss(LookupError):
+    """No unused recorded response matches an outbound request during replay"""
+
+
+def parse_timing(value: str) -> float:
+    """'original' -> 1.0, 'none' -> 0.0, otherwise a factor applied to recorded latencies"""
+    value = (value or "original").strip().lower()
+    if value == "original":
+        return 1.0
+    if value == "none":
+        return 0.0
+    return max(float(value), 0.0)
+
+
+def _digest(body) -> str:
+    if body is None:
+        body = b""
+    elif isinstance(body, str):
+        body = body.encode()
+    return hashlib.sha256(bytes(body)).hexdigest()
+
+
+def _route(method: str, url: str) -> str:
+    # Hosts differ between a recording and a replay environment; method and path identify the API
+    return f"{method.upper()} {urlsplit(str(url)).path}"
+
+
+class Cassette:
+    """
+    Outbound HTTP interactions of one process, stored as JSON lines.
+    Each interaction keeps the response status, headers and body chunks with their arrival
+    offsets, so replay can reproduce the original latency, scaled by `timing`.
+    Replay serves a recorded response for the same method and path: one with an identical
+    request body when there is one, otherwise the next unused one in recording order.
+    """
+
+    def __init__(self, path: str, mode: str, timing: float = 1.0):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.timing = timing
+        self._lock = threading.Lock()
+        self._routes: Dict[str, List[dict]] = {}
+        self.stats = {"recorded": 0, "replayed": 0, "misses": 0}
+        if mode == "record":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            open(path, "w").close()
+        else:
+            with open(path) as f:
+                for line in f:
+                    if line.strip():
+                        interaction = json.loads(line)
+                        self._routes.setdefault(_route(interaction["method"], interaction["url"]), []).append(interaction)
+
+    def record(self, client: str, method: str, url: str, body, status: int, headers, ttfb: float, chunks):
+        interaction = {
+            "client": client,
+            "method": method,
+            "url": str(url),
+            "body_sha256": _digest(body),
+            "status": status,
+            "headers": [list(h) for h in headers],
+            "ttfb": ttfb,
+            "chunks": [[offset, base64.b64encode(data).decode()] for offset, data in chunks],
+        }
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.write(json.dumps(interaction) + "\n")
+            self.stats["recorded"] += 1
+
+    def match(self, method: str, url: str, body) -> dict:
+        candidates = self._routes.get(_route(method, url), [])
+        digest = _digest(body)
+        with self._lock:
+            unused = [i for i in candidates if not i.get("_used")]
+            interaction = next((i for i in unused if i["body_sha256"] == digest), unused[0] if unused else None)
+            if interaction is None:
+                self.stats["misses"] += 1
+                raise CassetteMiss(f"No recorded response for {method} {url}")
+            interaction["_used"] = True
+            self.stats["replayed"] += 1
+        return interaction
+
+    def delays(self, interaction: dict):
+        """(seconds to wait, chunk) pairs reproducing the recorded timing"""
+        previous = interaction["ttfb"]
+        for offset, data in interaction["chunks"]:
+            yield max(offset - previous, 0) * self.timing, base64.b64decode(data)
+            previous = offset
+
+
+class _RecordingStream(httpx.SyncByteStream):
+    def __init__(self, inner, on_close):
+        self.inner, self.on_close, self.chunks, self.start = inner, on_close, [], time.perf_counter()
+
+    def __iter__(self):
+        for chunk in self.inner:
+            self.chunks.append((time.perf_counter() - self.start, chunk))
+            yield chunk
+
+    def close(self):
+        self.inner.close()
+        self.on_close(self.chunks)
+
+
+class _AsyncRecordingStream(httpx.AsyncByteStream):
+    def __init__(self, inner, on_close):
+        self.inner, self.on_close, self.chunks, self.start = inner, on_close, [], time.perf_counter()
+
+    async def __aiter__(self):
+        async for chunk in self.inner:
+            self.chunks.append((time.perf_counter() - self.start, chunk))
+            yield chunk
+
+    async def aclose(self):
+        await self.inner.aclose()
+        self.on_close(self.chunks)
+
+
+class _ReplayStream(httpx.SyncByteStream):
+    def __init__(self, cassette, interaction):
+        self.cassette, self.interaction = cassette, interaction
+
+    def __iter__(self):
+        for delay, chunk in self.cassette.delays(self.interaction):
+            if delay:
+                time.sleep(delay)
+            yield chunk
+
+
+class _AsyncReplayStream(httpx.AsyncByteStream):
+    def __init__(self, cassette, interaction):
+        self.cassette, self.interaction = cassette, interaction
+
+    async def __aiter__(self):
+        for delay, chunk in self.cassette.delays(self.interaction):
+            if delay:
+                await asyncio.sleep(delay)
+            yield chunk
+
+
+class CassetteTransport(httpx.BaseTransport):
+    """httpx transport recording through `inner`, or replaying without touching the network"""
+
+    def __init__(self, cassette: Cassette, inner: httpx.BaseTransport):
+        self.cassette = cassette
+        self.inner = inner
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        body = request.read()
+        if self.cassette.mode == "replay":
+            try:
+                interaction = self.cassette.match(request.method, request.url, body)
+            except CassetteMiss as e:
+                raise httpx.ConnectError(str(e), request=request)
+            time.sleep(interaction["ttfb"] * self.cassette.timing)
+            return httpx.Response(interaction["status"], headers=interaction["headers"],
+                                  stream=_ReplayStream(self.cassette, interaction))
+
+        start = time.perf_counter()
+        response = self.inner.handle_request(request)
+        ttfb = time.perf_counter() - start
+
+        def save(chunks):
+            chunks = [(ttfb + offset, data) for offset, data in chunks]
+            self.cassette.record("httpx", request.method, request.url, body, response.status_code,
+                                 response.headers.multi_items(), ttfb, chunks)
+
+        return httpx.Response(response.status_code, headers=response.headers,
+                              stream=_RecordingStream(response.stream, save), extensions=response.extensions)
+
+    def close(self):
+        self.inner.close()
+
+
+class AsyncCassetteTransport(httpx.AsyncBaseTransport):
+    def __init__(self, cassette: Cassette, inner: httpx.AsyncBaseTransport):
+        self.cassette = cassette
+        self.inner = inner
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        body = await request.aread()
+        if self.cassette.mode == "replay":
+            try:
+                interaction = self.cassette.match(request.method, request.url, body)
+            except CassetteMiss as e:
+                raise httpx.ConnectError(str(e), request=request)
+            await asyncio.sleep(interaction["ttfb"] * self.cassette.timing)
+            return httpx.Response(interaction["status"], headers=interaction["headers"],
+                                  stream=_AsyncReplayStream(self.cassette, interaction))
+
+        start = time.perf_counter()
+        response = await self.inner.handle_async_request(request)
+        ttfb = time.perf_counter() - start
+
+        def save(chunks):
+            chunks = [(ttfb + offset, data) for offset, data in chunks]
+            self.cassette.record("httpx", request.method, request.url, body, response.status_code,
+                                 response.headers.multi_items(), ttfb, chunks)
+
+        return httpx.Response(response.status_code, headers=response.headers,
+                              stream=_AsyncRecordingStream(response.stream, save), extensions=response.extensions)
+
+    async def aclose(self):
+        await self.inner.aclose()
+
+
+def _replay_requests_response(cassette: Cassette, request: requests.PreparedRequest) -> requests.Response:
+    try:
+        interaction = cassette.match(request.method, request.url, request.body)
+    except CassetteMiss as e:
+        raise requests.ConnectionError(str(e), request=request)
+    chunks = list(cassette.delays(interaction))
+    time.sleep(interaction["ttfb"] * cassette.timing + sum(delay for delay, _ in chunks))
+    response = requests.Response()
+    response.status_code = interaction["status"]
+    response.headers = CaseInsensitiveDict(interaction["headers"])
+    response._content = b"".join(chunk for _, chunk in chunks)
+    response.encoding = get_encoding_from_headers(response.headers)
+    response.url = request.url
+    response.request = request
+    return response
+
+
+_cassette: Optional[Cassette] = None
+_original_session_send = requests.Session.send
+
+
+def _session_send(session, request, **kwargs):
+    cassette = _cassette
+    if cassette is None:
+        return _original_session_send(session, request, **kwargs)
+    if cassette.mode == "replay":
+        return _replay_requests_response(cassette, request)
+    start = time.perf_counter()
+    response = _original_session_send(session, request, **kwargs)
+    content = response.content
+    elapsed = time.perf_counter() - start
+    headers = [(k, v) for k, v in response.headers.items() if k.lower() not in _DECODED_BODY_HEADERS]
+    cassette.record("requests", request.method, request.url, request.body, response.status_code,
+                    headers, elapsed, [(elapsed, content)])
+    return response
+
+
+def active() -> Optional[Cassette]:
+    return _cassette
+
+
+def install(name: str, mode: str = HTTP_CASSETTE_MODE, directory: str = HTTP_CASSETTE_DIR,
+            timing: str = HTTP_CASSETTE_TIMING) -> Optional[Cassette]:
+    """
+    Records or replays this process's outbound HTTP in `<directory>/<name>.jsonl`.
+    Covers the shared httpx pool (Azure OpenAI, Whisper, FLUX) and everything sent through
+    requests (Graph API, media downloads, the Twilio SDK). A no-op when `mode` is "off".
+    Must run before the shared HTTP clients are created.
+    """
+    global _cassette
+    if mode not in MODES:
+        raise ValueError(f"HTTP_CASSETTE_MODE must be one of {', '.join(MODES)}, got {mode!r}")
+    if mode == "off":
+        return None
+    _cassette = Cassette(os.path.join(directory, f"{name}.jsonl"), mode, parse_timing(timing))
+    requests.Session.send = _session_send
+    return _cassette
+
+
+def uninstall():
+    global _cassette
+    _cassette = None
+    requests.Session.send = _original_session_send
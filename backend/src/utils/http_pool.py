@@ -0,0 +1,168 @@
+import importlib.util
+from typing import Optional
+
+import httpx
+
+from config import (
+    HTTP_POOL_MAX_CONNECTIONS, HTTP_POOL_MAX_KEEPALIVE, HTTP_POOL_KEEPALIVE_EXPIRY,
+    HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, HTTP2_ENABLED
+)
+from utils import http_cassette, metrics
+
+# Process-wide HTTP clients shared by the chat model, Whisper and image generation, so
+# TLS connections to Azure are kept alive and reused instead of opened per call.
+_async_client: Optional[httpx.AsyncClient] = None
+_sync_client: Optional[httpx.Client] = None
+
+# Updated from worker threads as well as the event loop; the metrics take a lock per update
+HTTP_POOL_REQUESTS = metrics.counter("http_pool_requests_total", "Outbound requests sent on the shared HTTP pool")
+HTTP_POOL_ERRORS = metrics.counter("http_pool_errors_total", "Outbound requests on the shared HTTP pool that failed or got a 5xx response")
+HTTP_POOL_IN_FLIGHT = metrics.gauge("http_pool_requests_in_flight", "Outbound requests in flight on the shared HTTP pool")
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=HTTP_POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_POOL_MAX_KEEPALIVE,
+        keepalive_expiry=HTTP_POOL_KEEPALIVE_EXPIRY,
+    )
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)
+
+
+def _http2() -> bool:
+    # HTTP/2 needs the `h2` package (httpx[http2] in requirements.txt)
+    return HTTP2_ENABLED and importlib.util.find_spec("h2") is not None
+
+
+def _count(response: httpx.Response):
+    if response.status_code >= 500:
+        HTTP_POOL_ERRORS.inc()
+
+
+class CountingTransport(httpx.BaseTransport):
+    """Counts requests, requests in flight and failures (5xx responses and transport errors)"""
+
+    def __init__(self, inner: httpx.BaseTransport):
+        self.inner = inner
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        HTTP_POOL_REQUESTS.inc()
+        HTTP_POOL_IN_FLIGHT.inc()
+        try:
+            response = self.inner.handle_request(request)
+        except Exception:
+            HTTP_POOL_ERRORS.inc()
+            raise
+        finally:
+            HTTP_POOL_IN_FLIGHT.dec()
+        _count(response)
+        return response
+
+    def close(self):
+        self.inner.close()
+
+
+class AsyncCountingTransport(httpx.AsyncBaseTransport):
+    """Counts requests, requests in flight and failures (5xx responses and transport errors)"""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport):
+        self.inner = inner
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        HTTP_POOL_REQUESTS.inc()
+        HTTP_POOL_IN_FLIGHT.inc()
+        try:
+            response = await self.inner.handle_async_request(request)
+        except Exception:
+            HTTP_POOL_ERRORS.inc()
+            raise
+        finally:
+            HTTP_POOL_IN_FLIGHT.dec()
+        _count(response)
+        return response
+
+    async def aclose(self):
+        await self.inner.aclose()
+
+
+def _async_transport() -> httpx.AsyncBaseTransport:
+    transport = httpx.AsyncHTTPTransport(limits=_limits(), http2=_http2())
+    cassette = http_cassette.active()
+    return AsyncCountingTransport(http_cassette.AsyncCassetteTransport(cassette, transport) if cassette else transport)
+
+
+def _sync_transport() -> httpx.BaseTransport:
+    transport = httpx.HTTPTransport(limits=_limits(), http2=_http2())
+    cassette = http_cassette.active()
+    return CountingTransport(http_cassette.CassetteTransport(cassette, transport) if cassette else transport)
+
+
+def get_async_client() -> httpx.AsyncClient:
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        _async_client = httpx.AsyncClient(
+            transport=_async_transport(), timeout=_timeout(),
+        )
+    return _async_client
+
+
+def get_sync_client() -> httpx.Client:
+    global _sync_client
+    if _sync_client is None or _sync_client.is_closed:
+        _sync_client = httpx.Client(
+            transport=_sync_transport(), timeout=_timeout(),
+        )
+    return _sync_client
+
+
+def pooled_post(url: str, **kwargs) -> httpx.Response:
+    """requests.post-style helper on the shared sync client"""
+    return get_sync_client().post(url, **kwargs)
+
+
+def _pool_connections(client) -> dict:
+    try:
+        transport = client._transport
+        # Below the counting and cassette wrappers
+        while hasattr(transport, "inner"):
+            transport = transport.inner
+        connections = transport._pool.connections
+    except AttributeError:
+        return {"open": 0, "idle": 0}
+    return {"open": len(connections), "idle": sum(1 for c in connections if c.is_idle())}
+
+
+def _connection_gauge() -> dict:
+    values = {}
+    for name, client in (("async", _async_client), ("sync", _sync_client)):
+        if client is not None:
+            for state, count in _pool_connections(client).items():
+                values[(name, state)] = count
+    return values
+
+
+HTTP_POOL_CONNECTIONS = metrics.gauge("http_pool_connections", "Open and idle connections of the shared HTTP pool",
+                                      ("client", "state"), callback=_connection_gauge)
+
+
+def pool_stats() -> dict:
+    return {
+        "http2": _http2(),
+        "max_connections": HTTP_POOL_MAX_CONNECTIONS,
+        "max_keepalive": HTTP_POOL_MAX_KEEPALIVE,
+        "async_connections": _pool_connections(_async_client) if _async_client else {"open": 0, "idle": 0},
+        "sync_connections": _pool_connections(_sync_client) if _sync_client else {"open": 0, "idle": 0},
+    }
+
+
+async def aclose():
+    global _async_client, _sync_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+    if _sync_client is not None:
+        _sync_client.close()
+        _sync_client = None
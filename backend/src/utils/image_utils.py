@@ -5,6 +5,7 @@ import time
 from PIL import Image
 from app_state import IMAGES_DIR, diag_logger
 from config import IMAGE_RETENTION_HOURS
+from utils.metrics import IMAGE_TRANSCODE_SECONDS
 
 def save_base64_image(image_data: str, base_url: str) -> str:
     """Saves base64 image and transcodes to JPEG for WhatsApp compatibility"""
@@ -17,11 +18,12 @@ def save_base64_image(image_data: str, base_url: str) -> str:
         filepath = IMAGES_DIR / filename
         
         # Decode and transcode to RGB JPEG
-        image_bytes = base64.b64decode(encoded)
-        img = Image.open(io.BytesIO(image_bytes))
-        if img.mode in ("RGBA", "P"):
-            img = img.convert("RGB")
-        img.save(filepath, "JPEG", quality=85)
+        with IMAGE_TRANSCODE_SECONDS.time():
+            image_bytes = base64.b64decode(encoded)
+            img = Image.open(io.BytesIO(image_bytes))
+            if img.mode in ("RGBA", "P"):
+                img = img.convert("RGB")
+            img.save(filepath, "JPEG", quality=85)
         
         filesize_kb = filepath.stat().st_size / 1024
         diag_logger.info(f"Image saved: {filename} ({filesize_kb:.2f} KB)")
@@ -0,0 +1,82 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+from langchain_core.tools import StructuredTool
+
+from utils import metrics
+from utils.metrics import TOOL_QUEUE_SECONDS
+
+INPROCESS_TOOL_CALLS_IN_FLIGHT = metrics.gauge("inprocess_tool_calls_in_flight", "Tool calls running on the in-process tool threads")
+
+
+def tool_functions() -> List[Callable[..., str]]:
+    """The tools the MCP server exposes, as plain functions"""
+    # Imported on first use: the Twilio SDK and Pillow are only needed once tools are loaded
+    from utils.tools.communication import send_twilio_sms, send_whatsapp_message
+    from utils.tools.media import generate_image
+    return [send_twilio_sms, send_whatsapp_message, generate_image]
+
+
+class InProcessTools:
+    """
+    The MCP server's tools run inside the API process, without the JSON-RPC round trip over
+    stdio to a server subprocess. The tools are blocking (requests, the Twilio SDK), so calls run
+    on a pool of `threads` worker threads; a call waits while all of them are busy, and that wait
+    is recorded in tool_call_queue_seconds like a queued MCP call. Same interface as MCPClient.
+    """
+
+    def __init__(self, threads: int = 8, functions: Optional[List[Callable[..., str]]] = None):
+        self.threads = max(1, threads)
+        self.functions = functions
+        self.in_flight = 0
+        self.calls = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    async def initialize(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="tool")
+
+    async def call_tool(self, fn: Callable[..., str], arguments: dict) -> str:
+        if self._executor is None:
+            await self.initialize()
+        submitted = time.perf_counter()
+
+        def run():
+            TOOL_QUEUE_SECONDS.observe(time.perf_counter() - submitted, tool=fn.__name__)
+            return fn(**arguments)
+
+        self.in_flight += 1
+        self.calls += 1
+        INPROCESS_TOOL_CALLS_IN_FLIGHT.inc()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, run)
+        except Exception as e:
+            # The tools report their own failures as text; this is what the MCP server would send back
+            return f"Error: {e}"
+        finally:
+            self.in_flight -= 1
+            INPROCESS_TOOL_CALLS_IN_FLIGHT.dec()
+
+    async def get_tools(self) -> List[StructuredTool]:
+        await self.initialize()
+        if self.functions is None:
+            self.functions = tool_functions()
+        langchain_tools = []
+        for fn in self.functions:
+            async def call_tool(fn=fn, **kwargs):
+                return await self.call_tool(fn, kwargs)
+
+            # Name, description and arguments come from the function, as FastMCP derives them
+            langchain_tools.append(StructuredTool.from_function(func=fn, coroutine=call_tool))
+        return langchain_tools
+
+    def stats(self) -> dict:
+        return {"mode": "inprocess", "threads": self.threads}
+
+    async def close(self):
+        if self._executor is not None:
+            # Calls still running finish in their threads; nothing waits for them
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
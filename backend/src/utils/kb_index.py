@@ -0,0 +1,146 @@
+import math
+import os
+import re
+import time
+from collections import Counter
+from typing import Dict, List, NamedTuple
+
+# Our own per-channel instructions (e.g. "[Instruction: Keep your response under ...]") are not part of the question
+INSTRUCTION_PATTERN = re.compile(r"\[instruction:.*?\]", re.IGNORECASE | re.DOTALL)
+
+# Words that carry no meaning for matching
+STOPWORDS = frozenset("""
+a an the is are was were be been am do does did i me my you your we our it its this that these those
+of to in on for with at by from about as and or but if so can could would should will shall may might
+what whats how who whom which when where why please tell hi hello hey there any some
+""".split())
+
+HEADING_PATTERN = re.compile(r"^(#{1,6})\s+(.*)$")
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    return [w for w in WORD_PATTERN.findall(text.lower()) if w not in STOPWORDS]
+
+
+def list_kb_files(paths: List[str]) -> List[str]:
+    """Expands knowledge base paths (markdown files or directories of them) into a sorted file list"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files.extend(os.path.join(root, n) for n in names if n.endswith(".md"))
+        elif os.path.exists(path):
+            files.append(path)
+    return sorted(files)
+
+
+class Section(NamedTuple):
+    source: str
+    title: str
+    text: str
+
+
+def split_sections(markdown: str, source: str = "") -> List[Section]:
+    """Splits markdown into one section per heading; the title carries the parent headings"""
+    sections = []
+    stack: List[str] = []
+    title, body = "", []
+
+    def flush():
+        content = "\n".join(body).strip()
+        if content:
+            sections.append(Section(source, title, content))
+
+    for line in markdown.splitlines():
+        match = HEADING_PATTERN.match(line)
+        if match:
+            flush()
+            level = len(match.group(1))
+            stack = stack[:level - 1] + [match.group(2).strip()]
+            title, body = " > ".join(stack), []
+        else:
+            body.append(line)
+    flush()
+    return sections
+
+
+class KnowledgeBaseIndex:
+    """
+    BM25 index over knowledge base sections, so each turn only carries the relevant parts.
+    Rebuilt automatically when a knowledge base file is added, removed or modified.
+    """
+
+    def __init__(self, paths: List[str], k1: float = 1.5, b: float = 0.75, check_interval: float = 5.0):
+        self.paths = paths
+        self.k1 = k1
+        self.b = b
+        self.check_interval = check_interval
+        self.sections: List[Section] = []
+        self._term_freqs: List[Counter] = []
+        self._lengths: List[int] = []
+        self._idf: Dict[str, float] = {}
+        self._postings: Dict[str, List[int]] = {}
+        self._avg_length = 0.0
+        self._signature = None
+        self._next_check = 0.0
+        self.refresh_if_changed(force=True)
+
+    def files(self) -> List[str]:
+        return list_kb_files(self.paths)
+
+    def refresh_if_changed(self, force: bool = False) -> bool:
+        now = time.monotonic()
+        if not force and now < self._next_check:
+            return False
+        self._next_check = now + self.check_interval
+        files = self.files()
+        signature = tuple((f, os.stat(f).st_mtime_ns) for f in files)
+        if signature == self._signature:
+            return False
+        self._signature = signature
+        self.build(files)
+        return True
+
+    def build(self, files: List[str]):
+        sections = []
+        for path in files:
+            try:
+                with open(path, "r") as f:
+                    sections.extend(split_sections(f.read(), source=os.path.basename(path)))
+            except Exception:
+                continue
+
+        self.sections = sections
+        self._term_freqs = [Counter(tokenize(f"{s.title}\n{s.text}")) for s in sections]
+        self._lengths = [sum(tf.values()) for tf in self._term_freqs]
+        self._avg_length = (sum(self._lengths) / len(self._lengths)) if self._lengths else 0.0
+
+        self._postings = {}
+        for i, tf in enumerate(self._term_freqs):
+            for term in tf:
+                self._postings.setdefault(term, []).append(i)
+        n = len(sections)
+        self._idf = {
+            term: math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self._postings.items()
+        }
+
+    def search(self, query: str, k: int = 4) -> List[Section]:
+        """Top-k sections for the query, best first; sections sharing no terms are never returned"""
+        self.refresh_if_changed()
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            idf = self._idf.get(term)
+            if idf is None:
+                continue
+            for i in self._postings[term]:
+                tf = self._term_freqs[i][term]
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[i] / self._avg_length)
+                scores[i] = scores.get(i, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        best = sorted(scores, key=lambda i: (-scores[i], i))[:k]
+        return [self.sections[i] for i in best]
+
+
+def format_section(section: Section) -> str:
+    return f"## {section.title}\n{section.text}" if section.title else section.text
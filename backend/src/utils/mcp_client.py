@@ -1,54 +1,202 @@
 import logging
 import asyncio
+import time
 from contextlib import AsyncExitStack
+from datetime import timedelta
 from typing import List, Optional
 
+import anyio
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
+from mcp.shared.exceptions import McpError
+from mcp.types import CONNECTION_CLOSED
 from langchain_core.tools import StructuredTool
 from pydantic import BaseModel, Field, create_model
 
+from utils.metrics import (
+    MCP_SERVER_CALLS, MCP_SERVER_CALLS_IN_FLIGHT, MCP_SERVER_HEALTHY, MCP_SERVER_RESTARTS, TOOL_QUEUE_SECONDS
+)
+
+# Errors meaning the stdio connection to a server process is gone
+TRANSPORT_ERRORS = (anyio.ClosedResourceError, anyio.BrokenResourceError, anyio.EndOfStream, BrokenPipeError)
+
+
+class ServerProcess:
+    """
+    One MCP server subprocess and its session. The stdio connection is opened and closed by a
+    task of its own, so a restart triggered from anywhere (a health check, a failed call) shuts
+    the old process down cleanly.
+    """
+
+    def __init__(self, index: int, params: StdioServerParameters):
+        self.index = index
+        self.params = params
+        self.session: Optional[ClientSession] = None
+        self._healthy = False
+        self.in_flight = 0
+        self.calls = 0
+        self.restarts = 0
+        self.restarting = False
+        self._stop: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def healthy(self) -> bool:
+        return self._healthy
+
+    @healthy.setter
+    def healthy(self, value: bool):
+        self._healthy = value
+        MCP_SERVER_HEALTHY.set(1 if value else 0, process=self.index)
+
+    async def start(self):
+        ready = asyncio.get_running_loop().create_future()
+        self._stop = asyncio.Event()
+        self._task = asyncio.create_task(self._run(ready))
+        await ready
+
+    async def _run(self, ready: asyncio.Future):
+        try:
+            async with AsyncExitStack() as stack:
+                read, write = await stack.enter_async_context(stdio_client(self.params))
+                session = await stack.enter_async_context(ClientSession(read, write))
+                await session.initialize()
+                self.session, self.healthy = session, True
+                ready.set_result(None)
+                await self._stop.wait()
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+            else:
+                logging.debug(f"MCP server process {self.index} exited: {e}")
+        finally:
+            self.session, self.healthy = None, False
+
+    async def ping(self, timeout: float) -> bool:
+        if not self.healthy or self.session is None:
+            return False
+        try:
+            await asyncio.wait_for(self.session.send_ping(), timeout)
+            return True
+        except Exception:
+            return False
+
+    async def stop(self):
+        self.healthy = False
+        if self._task is not None:
+            self._stop.set()
+            await self._task
+            self._task = None
+
+
 class MCPClient:
-    def __init__(self, command: str, args: List[str], env: Optional[dict] = None):
+    """
+    Tools of the MCP server, served by a pool of `processes` server subprocesses so that one slow
+    call (an image generation) does not hold up the others. A call goes to the least busy healthy
+    process; when every process already runs `max_in_flight` calls it waits for a free one, and
+    that wait is recorded in tool_call_queue_seconds. Every `health_interval` seconds each process
+    is pinged and restarted if it does not answer; a process whose connection breaks during a
+    call is restarted right away.
+    """
+
+    def __init__(self, command: str, args: List[str], env: Optional[dict] = None, tool_timeout: Optional[float] = None,
+                 processes: int = 1, max_in_flight: int = 8, health_interval: float = 30, health_timeout: float = 5):
         self.command = command
         self.args = args
         self.env = env
-        self.session: Optional[ClientSession] = None
-        self.exit_stack = AsyncExitStack()
+        # Seconds to wait for a tool result before giving up on the call
+        self.tool_timeout = tool_timeout
+        params = StdioServerParameters(command=command, args=args, env=env)
+        self.processes = [ServerProcess(i, params) for i in range(max(1, processes))]
+        self.max_in_flight = max_in_flight
+        self.health_interval = health_interval
+        self.health_timeout = health_timeout
+        self._available = asyncio.Condition()
+        self._monitor_task: Optional[asyncio.Task] = None
+        self._restart_tasks = set()
+
+    @property
+    def session(self) -> Optional[ClientSession]:
+        """Session of a healthy process, for calls that any process can answer (listing tools)"""
+        return next((p.session for p in self.processes if p.healthy and p.session is not None), None)
 
     async def initialize(self):
-        server_params = StdioServerParameters(
-            command=self.command,
-            args=self.args,
-            env=self.env
-        )
-        
-        # Connect to server
-        read, write = await self.exit_stack.enter_async_context(
-            stdio_client(server_params)
-        )
-        self.session = await self.exit_stack.enter_async_context(
-            ClientSession(read, write)
-        )
-        await self.session.initialize()
-    
+        results = await asyncio.gather(*(p.start() for p in self.processes), return_exceptions=True)
+        failures = [r for r in results if isinstance(r, BaseException)]
+        if len(failures) == len(self.processes):
+            raise failures[0]
+        for failure in failures:
+            # The health check retries them
+            logging.error(f"MCP server process failed to start: {failure}")
+        if self.health_interval and self._monitor_task is None:
+            self._monitor_task = asyncio.create_task(self._monitor())
+
+    async def _acquire(self) -> ServerProcess:
+        async with self._available:
+            while True:
+                # A process is only handed out with a live session; it is None while the process restarts
+                candidates = [p for p in self.processes
+                              if p.healthy and p.session is not None and p.in_flight < self.max_in_flight]
+                if candidates:
+                    process = min(candidates, key=lambda p: (p.in_flight, p.calls))
+                    process.in_flight += 1
+                    process.calls += 1
+                    MCP_SERVER_CALLS.inc(process=process.index)
+                    MCP_SERVER_CALLS_IN_FLIGHT.inc(process=process.index)
+                    return process
+                await self._available.wait()
+
+    async def _release(self, process: ServerProcess):
+        async with self._available:
+            process.in_flight -= 1
+            MCP_SERVER_CALLS_IN_FLIGHT.dec(process=process.index)
+            self._available.notify()
+
+    async def call_tool(self, tool_name: str, arguments: dict) -> str:
+        start = time.perf_counter()
+        try:
+            process = await asyncio.wait_for(self._acquire(), self.tool_timeout)
+        except asyncio.TimeoutError:
+            return "Error: no tool server was free to run the call in time"
+        finally:
+            TOOL_QUEUE_SECONDS.observe(time.perf_counter() - start, tool=tool_name)
+        try:
+            if self.tool_timeout:
+                result = await process.session.call_tool(
+                    tool_name, arguments=arguments, read_timeout_seconds=timedelta(seconds=self.tool_timeout)
+                )
+            else:
+                result = await process.session.call_tool(tool_name, arguments=arguments)
+        except McpError as e:
+            if e.error.code == CONNECTION_CLOSED:
+                # The session saw its stdio stream end: the server process is gone
+                self._schedule_restart(process, "call")
+                return "Error: tool server connection lost (connection closed)"
+            # Raised when the server does not answer within the read timeout
+            return f"Error: {e}"
+        except TRANSPORT_ERRORS as e:
+            self._schedule_restart(process, "call")
+            return f"Error: tool server connection lost ({type(e).__name__})"
+        finally:
+            await self._release(process)
+        if result.isError:
+            return f"Error: {result.content}"
+        return result.content[0].text
+
     async def get_tools(self) -> List[StructuredTool]:
         if not self.session:
             await self.initialize()
-            
+
         mcp_tools = await self.session.list_tools()
         langchain_tools = []
 
         for tool in mcp_tools.tools:
             async def call_tool(tool_name=tool.name, **kwargs):
-                result = await self.session.call_tool(tool_name, arguments=kwargs)
-                if result.isError:
-                    return f"Error: {result.content}"
-                return result.content[0].text
+                return await self.call_tool(tool_name, kwargs)
 
             # Create Pydantic model for args dynamically
             fields = {
-                k: (str, Field(description=v.get("description", ""))) 
+                k: (str, Field(description=v.get("description", "")))
                 for k, v in tool.inputSchema.get("properties", {}).items()
             }
             ArgsModel = create_model(f"{tool.name}Args", **fields)
@@ -59,14 +207,61 @@ class MCPClient:
                 description=tool.description,
                 args_schema=ArgsModel
             ))
-            
+
         return langchain_tools
 
-    async def close(self):
+    async def restart(self, process: ServerProcess, reason: str):
+        if process.restarting:
+            return
+        process.restarting = True
         try:
-            await self.exit_stack.aclose()
-        except RuntimeError as e:
-            # Ignore "Attempted to exit cancel scope in a different task" error during shutdown
-            logging.debug(f"Ignored RuntimeError during MCP client close: {e}")
+            logging.warning(f"Restarting MCP server process {process.index} ({reason})")
+            await process.stop()
+            await process.start()
+            process.restarts += 1
+            MCP_SERVER_RESTARTS.inc(reason=reason)
         except Exception as e:
-            logging.debug(f"Ignored generic Exception during MCP client close: {e}")
+            logging.error(f"MCP server process {process.index} failed to restart: {e}")
+        finally:
+            process.restarting = False
+            async with self._available:
+                self._available.notify_all()
+
+    def _schedule_restart(self, process: ServerProcess, reason: str):
+        # Taken out of rotation at once, so no other call is sent to it before the restart
+        process.healthy = False
+        task = asyncio.create_task(self.restart(process, reason))
+        self._restart_tasks.add(task)
+        task.add_done_callback(self._restart_tasks.discard)
+
+    async def _monitor(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            for process in self.processes:
+                if not process.restarting and not await process.ping(self.health_timeout):
+                    await self.restart(process, "health_check")
+
+    def stats(self) -> dict:
+        return {
+            "processes": [
+                {"index": p.index, "healthy": p.healthy, "restarting": p.restarting}
+                for p in self.processes
+            ],
+            "mode": "mcp",
+            "max_in_flight": self.max_in_flight,
+        }
+
+    async def close(self):
+        if self._monitor_task is not None:
+            self._monitor_task.cancel()
+            self._monitor_task = None
+        for task in list(self._restart_tasks):
+            task.cancel()
+        for process in self.processes:
+            try:
+                await process.stop()
+            except RuntimeError as e:
+                # Ignore "Attempted to exit cancel scope in a different task" error during shutdown
+                logging.debug(f"Ignored RuntimeError during MCP client close: {e}")
+            except Exception as e:
+                logging.debug(f"Ignored generic Exception during MCP client close: {e}")
@@ -12,9 +12,26 @@ parent_dir = os.path.dirname(current_dir)
 if parent_dir not in sys.path:
     sys.path.append(parent_dir)
 
+import functools
+import anyio
 from tools.communication import send_twilio_sms, send_whatsapp_message
 from tools.media import generate_image
-from config import APP_NAME
+from config import APP_NAME, TOOL_SERVER_THREADS
+from utils import http_cassette
+
+# Our tools are blocking (requests/Twilio SDK). FastMCP calls sync tools directly on its event loop,
+# which would serialize concurrent calls, so run them in worker threads instead.
+tool_thread_limiter = anyio.CapacityLimiter(TOOL_SERVER_THREADS)
+
+def run_in_thread(fn):
+    @functools.wraps(fn)
+    async def wrapper(**kwargs):
+        return await anyio.to_thread.run_sync(functools.partial(fn, **kwargs), limiter=tool_thread_limiter)
+    return wrapper
+
+send_twilio_sms = run_in_thread(send_twilio_sms)
+send_whatsapp_message = run_in_thread(send_whatsapp_message)
+generate_image = run_in_thread(generate_image)
 
 # Initialize FastMCP Server
 mcp = FastMCP(f"{APP_NAME} Communication Server")
@@ -25,6 +42,8 @@ mcp.add_tool(send_whatsapp_message)
 mcp.add_tool(generate_image)
 
 if __name__ == "__main__":
+    # Records or replays the tools' outbound calls when HTTP_CASSETTE_MODE is set
+    http_cassette.install("mcp_server")
     try:
         mcp.run()
     except KeyboardInterrupt:
@@ -0,0 +1,217 @@
+import bisect
+from abc import ABC, abstractmethod
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Latency buckets in seconds, from fast in-process work up to slow model/tool calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, description: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> Tuple:
+        return tuple(labels.get(n, "") for n in self.label_names)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    @abstractmethod
+    def _samples(self) -> List[str]:
+        """Exposition lines for the current values, without HELP and TYPE"""
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, description, labels=()):
+        super().__init__(name, description, labels)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self):
+        return [f"{self.name}{_format_labels(self.label_names, k)} {_format_value(v)}" for k, v in sorted(self._values.items())]
+
+
+class Gauge(_Metric):
+    """Gauge set directly, or read from `callback` (returning {label tuple: value}) at scrape time"""
+    kind = "gauge"
+
+    def __init__(self, name, description, labels=(), callback: Optional[Callable[[], Dict[Tuple, float]]] = None):
+        super().__init__(name, description, labels)
+        self._values: Dict[Tuple, float] = {}
+        self.callback = callback
+        if not self.label_names and callback is None:
+            self._values[()] = 0
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self):
+        values = dict(self._values)
+        if self.callback is not None:
+            try:
+                values.update(self.callback())
+            except Exception:
+                pass
+        return [f"{self.name}{_format_labels(self.label_names, k)} {_format_value(v)}" for k, v in sorted(values.items())]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, description, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(sorted(buckets))
+        # key -> ([count per bucket], sum, count)
+        self._values: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def count(self, **labels) -> int:
+        entry = self._values.get(self._key(labels))
+        return entry[2] if entry else 0
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self):
+        lines = []
+        for key, (counts, total, count) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts + [count - sum(counts)]):
+                cumulative += n
+                le = 'le="%s"' % _format_value(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        # Registering the same name again (e.g. on module reload) returns the existing metric
+        return self._metrics.setdefault(metric.name, metric)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name, description, labels=()) -> Counter:
+    return REGISTRY.register(Counter(name, description, labels))
+
+
+def gauge(name, description, labels=(), callback=None) -> Gauge:
+    return REGISTRY.register(Gauge(name, description, labels, callback))
+
+
+def histogram(name, description, labels=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+    return REGISTRY.register(Histogram(name, description, labels, buckets))
+
+
+# Metrics shared across modules
+HTTP_REQUEST_SECONDS = histogram("http_request_duration_seconds", "HTTP request latency by route", ("method", "path", "status"))
+HTTP_REQUESTS_IN_FLIGHT = gauge("http_requests_in_flight", "HTTP requests currently being handled")
+BACKGROUND_TASK_SECONDS = histogram("background_task_duration_seconds", "Duration of webhook background tasks", ("task", "status"))
+BACKGROUND_TASKS_IN_FLIGHT = gauge("background_tasks_in_flight", "Webhook background tasks currently running", ("task",))
+MODEL_CALL_SECONDS = histogram("model_call_duration_seconds", "Chat model call latency", ("tier",))
+MODEL_TOKENS = counter("model_tokens_total", "Tokens used by chat model calls", ("tier", "kind"))
+CONTEXT_DROPPED_TOKENS = histogram("context_dropped_tokens", "Estimated tokens of history trimmed from a model call by the context window",
+                                   buckets=(0, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000))
+TOOL_CALL_SECONDS = histogram("tool_call_duration_seconds", "MCP tool call latency", ("tool", "status"))
+TOOL_QUEUE_SECONDS = histogram("tool_call_queue_seconds", "Time a tool call waited for a free MCP server process", ("tool",))
+MCP_SERVER_CALLS_IN_FLIGHT = gauge("mcp_server_calls_in_flight", "Tool calls running on each MCP server process", ("process",))
+MCP_SERVER_CALLS = counter("mcp_server_calls_total", "Tool calls sent to each MCP server process", ("process",))
+MCP_SERVER_HEALTHY = gauge("mcp_server_healthy", "1 while an MCP server process is connected, 0 while it is down or restarting", ("process",))
+MCP_SERVER_RESTARTS = counter("mcp_server_restarts_total", "MCP server processes restarted after a failed health check or call", ("reason",))
+IMAGE_TRANSCODE_SECONDS = histogram("image_transcode_duration_seconds", "Time to decode and transcode a generated image to JPEG")
+CHECKPOINT_SECONDS = histogram("checkpoint_operation_duration_seconds", "Checkpoint store read/write latency", ("operation",))
+TURNS_IN_FLIGHT = gauge("agent_turns_in_flight", "Agent turns currently running")
+TURN_QUEUE_DEPTH = gauge("turn_queue_depth", "WhatsApp messages waiting in the per-sender turn queue")
+
+
+def track_background_task(task: str):
+    """Decorator recording duration and in-flight count of an async background task"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            BACKGROUND_TASKS_IN_FLIGHT.inc(task=task)
+            start = time.perf_counter()
+            status = "ok"
+            try:
+                return await fn(*args, **kwargs)
+            except Exception:
+                status = "error"
+                raise
+            finally:
+                BACKGROUND_TASKS_IN_FLIGHT.dec(task=task)
+                BACKGROUND_TASK_SECONDS.observe(time.perf_counter() - start, task=task, status=status)
+        return wrapper
+    return decorator
@@ -0,0 +1,98 @@
+import re
+from collections import deque
+from typing import Dict, NamedTuple, Sequence
+
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage, ToolMessage
+
+from utils import metrics
+from utils.context_window import SUMMARY_MESSAGE_NAME
+from utils.kb_index import INSTRUCTION_PATTERN
+
+ROUTED_TURNS = metrics.counter("model_routed_turns_total", "Turns answered by each model tier", ("tier",))
+ROUTING_ESCALATIONS = metrics.counter("model_routing_escalations_total", "Turns sent to the fast tier that escalated to the large tier for a tool call")
+
+# Words that suggest the turn needs one of our tools (image generation, SMS / WhatsApp sending)
+TOOL_INTENT_PATTERN = re.compile(
+    r"\b(image|picture|photo|draw|paint|illustrat\w*|generate|sketch|logo|sms|text message|whatsapp|send|message to)\b",
+    re.IGNORECASE,
+)
+
+FAST = "fast"
+LARGE = "large"
+POLICIES = ("auto", FAST, LARGE)
+
+
+class RouteDecision(NamedTuple):
+    tier: str
+    reason: str
+
+
+def parse_channel_policies(spec: str) -> Dict[str, str]:
+    """Parses 'web:auto,twilio:fast,meta:large' into a channel -> policy map, ignoring unknown policies"""
+    policies = {}
+    for item in spec.split(","):
+        channel, _, policy = item.strip().partition(":")
+        policy = policy.strip().lower()
+        if channel and policy in POLICIES:
+            policies[channel.strip().lower()] = policy
+    return policies
+
+
+class ModelRouter:
+    """
+    Picks the model tier for each model call of a turn.
+    Under the `auto` policy short, self-contained messages go to the fast deployment; the large
+    deployment handles tool intent, long or multi-part questions, answers built on tool results
+    and compacted threads. Channels can also be pinned to one tier.
+    """
+
+    def __init__(self, channel_policies: Dict[str, str], default_policy: str = "auto",
+                 max_fast_chars: int = 280, history_size: int = 100):
+        self.channel_policies = channel_policies
+        self.default_policy = default_policy
+        self.max_fast_chars = max_fast_chars
+        self.recent = deque(maxlen=history_size)
+        self.stats = {"fast": 0, "large": 0, "escalations": 0}
+
+    def policy_for(self, channel: str) -> str:
+        return self.channel_policies.get((channel or "").lower(), self.default_policy)
+
+    def classify(self, messages: Sequence[BaseMessage], channel: str = "web") -> RouteDecision:
+        policy = self.policy_for(channel)
+        if policy != "auto":
+            return RouteDecision(policy, f"channel:{policy}")
+
+        if any(isinstance(m, SystemMessage) and m.name == SUMMARY_MESSAGE_NAME for m in messages[:1]):
+            return RouteDecision(LARGE, "compacted_thread")
+
+        # Messages after the latest HumanMessage belong to the current turn
+        last_human = next((i for i in range(len(messages) - 1, -1, -1) if isinstance(messages[i], HumanMessage)), None)
+        if last_human is None:
+            return RouteDecision(LARGE, "no_user_message")
+        if any(isinstance(m, ToolMessage) for m in messages[last_human + 1:]):
+            return RouteDecision(LARGE, "tool_results")
+
+        content = messages[last_human].content
+        text = INSTRUCTION_PATTERN.sub("", content if isinstance(content, str) else str(content)).strip()
+        if TOOL_INTENT_PATTERN.search(text):
+            return RouteDecision(LARGE, "tool_intent")
+        if len(text) > self.max_fast_chars:
+            return RouteDecision(LARGE, "long_message")
+        if text.count("?") > 1 or "```" in text:
+            return RouteDecision(LARGE, "complex_query")
+        return RouteDecision(FAST, "simple")
+
+    def record(self, thread_id: str, channel: str, decision: RouteDecision, latency_ms: float, escalated: bool = False):
+        tier = LARGE if escalated else decision.tier
+        self.stats[tier] += 1
+        ROUTED_TURNS.inc(tier=tier)
+        if escalated:
+            self.stats["escalations"] += 1
+            ROUTING_ESCALATIONS.inc()
+        self.recent.append({
+            "thread_id": thread_id,
+            "channel": channel,
+            "tier": tier,
+            "reason": "escalated:tool_call" if escalated else decision.reason,
+            "latency_ms": round(latency_ms, 1),
+        })
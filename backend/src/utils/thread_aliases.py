@@ -0,0 +1,67 @@
+import time
+import uuid
+from typing import Dict, List
+
+from utils.checkpoint_shards import ShardedSqliteSaver
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS thread_aliases (session_id TEXT PRIMARY KEY, thread_id TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS thread_purges (thread_id TEXT PRIMARY KEY, queued_at REAL NOT NULL);
+"""
+
+
+class ThreadAliases:
+    """
+    Maps a session id (a phone number, a web session id) to the checkpoint thread that holds its
+    current conversation. Sessions that were never reset map to themselves.
+
+    Resetting a session points it at a new thread (`<session>#<random suffix>`, so channel
+    prefixes are kept) and queues the old thread for deletion by ThreadPurger. That is one small
+    write, however long the old conversation was. The tables live in the checkpoint database (the
+    first shard of a sharded store) and only reset sessions have a row, so all of them are kept
+    in memory and `resolve` does not touch the database.
+    """
+
+    def __init__(self, saver):
+        self.store = saver.shards[0] if isinstance(saver, ShardedSqliteSaver) else saver
+        self._aliases: Dict[str, str] = {}
+
+    async def setup(self):
+        async with self.store.lock:
+            await self.store.conn.executescript(SCHEMA)
+            await self.store.conn.commit()
+            async with self.store.conn.execute("SELECT session_id, thread_id FROM thread_aliases") as cur:
+                self._aliases = {session_id: thread_id for session_id, thread_id in await cur.fetchall()}
+
+    def __len__(self) -> int:
+        return len(self._aliases)
+
+    def resolve(self, session_id: str) -> str:
+        return self._aliases.get(session_id, session_id)
+
+    async def reset(self, session_id: str) -> str:
+        """Starts a new conversation for the session; returns its thread id"""
+        old = self.resolve(session_id)
+        new = f"{session_id}#{uuid.uuid4().hex[:12]}"
+        async with self.store.lock:
+            await self.store.conn.execute(
+                "INSERT OR REPLACE INTO thread_aliases (session_id, thread_id) VALUES (?, ?)", (session_id, new))
+            await self.store.conn.execute(
+                "INSERT OR IGNORE INTO thread_purges (thread_id, queued_at) VALUES (?, ?)", (old, time.time()))
+            await self.store.conn.commit()
+        self._aliases[session_id] = new
+        return new
+
+    async def queued(self, min_age: float = 0, limit: int = 100) -> List[str]:
+        """Threads waiting to be purged that were queued at least `min_age` seconds ago, oldest first"""
+        async with self.store.lock:
+            async with self.store.conn.execute(
+                    "SELECT thread_id FROM thread_purges WHERE queued_at <= ? ORDER BY queued_at LIMIT ?",
+                    (time.time() - min_age, limit)) as cur:
+                return [row[0] for row in await cur.fetchall()]
+
+    async def forget(self, thread_id: str):
+        """Removes a purged thread from the queue"""
+        async with self.store.lock:
+            await self.store.conn.execute("DELETE FROM thread_purges WHERE thread_id = ?", (thread_id,))
+            await self.store.conn.commit()
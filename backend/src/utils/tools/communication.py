@@ -1,6 +1,7 @@
 import os
 import requests
 from twilio.rest import Client as TwilioClient
+from config import GRAPH_API_BASE_URL, TWILIO_API_BASE_URL
 
 def send_twilio_sms(to_number: str, message_body: str) -> str:
     """
@@ -19,6 +20,8 @@ def send_twilio_sms(to_number: str, message_body: str) -> str:
 
     try:
         client = TwilioClient(account_sid, auth_token)
+        if TWILIO_API_BASE_URL:
+            client.api.base_url = TWILIO_API_BASE_URL
         message = client.messages.create(
             body=message_body,
             from_=from_number,
@@ -42,7 +45,7 @@ def send_whatsapp_message(to_number: str, message_body: str) -> str:
     if not token or not pid:
         return "Error: Meta WhatsApp credentials (WHATSAPP_ACCESS_TOKEN, WHATSAPP_PHONE_NUMBER_ID) are missing."
 
-    url = f"https://graph.facebook.com/v18.0/{pid}/messages"
+    url = f"{GRAPH_API_BASE_URL}/{pid}/messages"
     headers = {
         "Authorization": f"Bearer {token}",
         "Content-Type": "application/json"
@@ -1,10 +1,11 @@
 import os
-import requests
 import base64
 import uuid
 import io
 from PIL import Image
 
+from utils.http_pool import pooled_post
+
 def generate_image(prompt: str) -> str:
     """
     Generates an image using Azure OpenAI (Flux) based on the user's prompt.
@@ -40,7 +41,7 @@ def generate_image(prompt: str) -> str:
     }
 
     try:
-        response = requests.post(flux_url, headers=headers, json=payload)
+        response = pooled_post(flux_url, headers=headers, json=payload)
         if response.status_code != 200:
             return f"Error: Image API returned {response.status_code}: {response.text}"
         
@@ -0,0 +1,80 @@
+import time
+from typing import Dict, Optional, Sequence
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+
+# Name given to the AIMessage that ends a turn which ran out of time or tool iterations
+BUDGET_MESSAGE_NAME = "turn_budget_exhausted"
+
+RETRY_TEXT = {
+    "deadline": "Sorry, this is taking longer than expected and I couldn't finish. Please try again in a moment.",
+    "iteration_limit": "Sorry, I couldn't complete that request. Please try again or rephrase it.",
+}
+
+
+def parse_channel_seconds(spec: str) -> Dict[str, float]:
+    """Parses 'web:60,twilio:25' into a channel -> seconds map, ignoring malformed entries"""
+    values = {}
+    for item in spec.split(","):
+        channel, _, seconds = item.strip().partition(":")
+        try:
+            values[channel.strip().lower()] = float(seconds)
+        except ValueError:
+            continue
+    return values
+
+
+def current_turn(messages: Sequence[BaseMessage]) -> Sequence[BaseMessage]:
+    """Messages from the latest HumanMessage onwards"""
+    for i in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[i], HumanMessage):
+            return messages[i:]
+    return messages
+
+
+def tool_iterations(messages: Sequence[BaseMessage]) -> int:
+    """Number of agent -> tools round trips already made in the current turn"""
+    return sum(1 for m in current_turn(messages) if isinstance(m, AIMessage) and m.tool_calls)
+
+
+class TurnBudget:
+    """
+    Time and tool-iteration limits for one turn. The deadline is stored in the run config
+    (`configurable.deadline`, a time.monotonic() value) so every model and tool call of the
+    turn can bound itself by the time that is left.
+    """
+
+    def __init__(self, channel_seconds: Dict[str, float], default_seconds: float = 60,
+                 max_tool_iterations: int = 5, tool_timeout: float = 30):
+        self.channel_seconds = channel_seconds
+        self.default_seconds = default_seconds
+        self.max_tool_iterations = max_tool_iterations
+        self.tool_timeout = tool_timeout
+        self.stats = {"deadline": 0, "iteration_limit": 0, "tool_timeouts": 0}
+
+    def deadline_for(self, channel: str) -> Optional[float]:
+        seconds = self.channel_seconds.get((channel or "").lower(), self.default_seconds)
+        return time.monotonic() + seconds if seconds > 0 else None
+
+    def remaining(self, configurable: dict) -> Optional[float]:
+        """Seconds left in the turn, or None when it has no deadline"""
+        deadline = configurable.get("deadline")
+        return None if deadline is None else deadline - time.monotonic()
+
+    def tool_timeout_for(self, configurable: dict) -> Optional[float]:
+        remaining = self.remaining(configurable)
+        limits = [t for t in (remaining, self.tool_timeout or None) if t is not None]
+        return max(min(limits), 0) if limits else None
+
+    def exhausted(self, messages: Sequence[BaseMessage], reason: str) -> AIMessage:
+        """Closing reply for a turn out of budget: whatever the model already said, plus a retry hint"""
+        self.stats[reason] += 1
+        partial = [m.content for m in current_turn(messages)
+                   if isinstance(m, AIMessage) and isinstance(m.content, str) and m.content.strip()]
+        content = "\n\n".join(partial + [RETRY_TEXT[reason]])
+        return AIMessage(content=content, name=BUDGET_MESSAGE_NAME)
+
+
+def retry_hint(message: AIMessage) -> str:
+    """The retry hint that closes a budget reply, without the partial answer before it"""
+    return next((hint for hint in RETRY_TEXT.values() if message.content.endswith(hint)), message.content)
@@ -0,0 +1,90 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from utils.metrics import TURN_QUEUE_DEPTH
+
+
+class TurnQueue:
+    """
+    Per-thread queue in front of the agent.
+    Runs at most one turn per thread at a time, in arrival order. A message for an idle thread
+    starts its turn right away. Messages that arrive while a turn is running are merged into the
+    next turn, which starts once no message arrived for `window` seconds (at most `max_wait`).
+    The reply is delivered to the caller of the last merged message; earlier callers get None.
+    """
+
+    def __init__(self, handler: Callable[..., Awaitable[str]], window: float = 1.5, max_wait: float = 5.0):
+        self.handler = handler
+        self.window = window
+        self.max_wait = max_wait
+        self._pending: Dict[str, List[Tuple[str, dict, asyncio.Future]]] = {}
+        self._last_arrival: Dict[str, float] = {}
+        self._workers: Dict[str, asyncio.Task] = {}
+        self.stats = {"messages": 0, "turns": 0, "coalesced": 0}
+
+    def depth(self) -> int:
+        """Number of messages waiting for a turn across all threads"""
+        return sum(len(batch) for batch in self._pending.values())
+
+    async def submit(self, thread_id: str, text: str, **kwargs) -> Optional[str]:
+        future = asyncio.get_running_loop().create_future()
+        self._pending.setdefault(thread_id, []).append((text, kwargs, future))
+        self._last_arrival[thread_id] = time.monotonic()
+        self.stats["messages"] += 1
+        TURN_QUEUE_DEPTH.set(self.depth())
+        if thread_id not in self._workers:
+            self._workers[thread_id] = asyncio.create_task(self._drain(thread_id))
+        return await future
+
+    async def _drain(self, thread_id: str):
+        batch = []
+        try:
+            while self._pending.get(thread_id):
+                if batch:
+                    # These arrived during the previous turn: let the sender finish typing
+                    await self._wait_for_quiet(thread_id)
+                batch = self._pending.pop(thread_id)
+                TURN_QUEUE_DEPTH.set(self.depth())
+                self.stats["turns"] += 1
+                self.stats["coalesced"] += len(batch) - 1
+
+                text = "\n".join(item[0] for item in batch)
+                try:
+                    reply = await self.handler(text, thread_id, **batch[-1][1])
+                except Exception as e:
+                    for _, _, future in batch:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+
+                for _, _, future in batch[:-1]:
+                    if not future.done():
+                        future.set_result(None)
+                if not batch[-1][2].done():
+                    batch[-1][2].set_result(reply)
+        except asyncio.CancelledError:
+            # Shutting down: callers still waiting on this thread get a cancelled turn, not a hang
+            for _, _, future in batch + self._pending.pop(thread_id, []):
+                future.cancel()
+            TURN_QUEUE_DEPTH.set(self.depth())
+            raise
+        finally:
+            self._workers.pop(thread_id, None)
+            if not self._pending.get(thread_id):
+                self._last_arrival.pop(thread_id, None)
+
+    def close(self):
+        """Cancels the running and queued turns of every thread"""
+        for task in list(self._workers.values()):
+            task.cancel()
+
+    async def _wait_for_quiet(self, thread_id: str):
+        """Waits until no message arrived for `window` seconds, but never longer than `max_wait`"""
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            quiet_at = self._last_arrival.get(thread_id, 0) + self.window
+            now = time.monotonic()
+            if now >= quiet_at or now >= deadline:
+                return
+            await asyncio.sleep(min(quiet_at, deadline) - now)
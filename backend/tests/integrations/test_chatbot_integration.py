@@ -9,7 +9,7 @@ project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..
 sys.path.append(project_root)
 sys.path.append(os.path.join(project_root, "backend/src"))
 
-from backend.src.chatbot import ChatBot
+from chatbot import ChatBot
 
 async def main():
     load_dotenv()
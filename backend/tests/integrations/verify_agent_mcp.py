@@ -1,11 +1,11 @@
 import asyncio
 import os
 import sys
-# Add project root to path
-# backend/tests/integrations -> ../../../
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+# Add backend/src to path
+# backend/tests/integrations -> ../../src
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../src")))
 
-from backend.src.agent import ChatbotAgent
+from agent import ChatbotAgent
 from dotenv import load_dotenv
 
 async def main():
@@ -1,4 +1,5 @@
 import pytest
+import pytest_asyncio
 import os
 import sys
 from fastapi.testclient import TestClient
@@ -7,6 +8,34 @@ from unittest.mock import patch, MagicMock, AsyncMock
 # Add the src directory to sys.path to allow importing local modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) + "/src")
 
+@pytest.fixture(scope="session", autouse=True)
+def test_data_dir(tmp_path_factory):
+    """Checkpoint databases created by tests go to a temp directory instead of backend/data"""
+    with patch.dict(os.environ, {"DATA_DIR": str(tmp_path_factory.mktemp("data"))}):
+        yield
+
+def checkpoint_config(thread_id, checkpoint_id=None):
+    """LangGraph config for a thread's latest checkpoint, or one checkpoint of it"""
+    config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+    if checkpoint_id:
+        config["configurable"]["checkpoint_id"] = checkpoint_id
+    return config
+
+@pytest_asyncio.fixture
+async def open_saver(tmp_path):
+    """Opens PooledSqliteSaver stores (tmp_path/cp.sqlite unless a path is given) and closes them after the test"""
+    from utils.checkpointer import PooledSqliteSaver
+    savers = []
+
+    async def open_(path=None, **kwargs):
+        saver = await PooledSqliteSaver.open(path or str(tmp_path / "cp.sqlite"), **kwargs)
+        savers.append(saver)
+        return saver
+
+    yield open_
+    for saver in reversed(savers):
+        await saver.aclose()
+
 @pytest.fixture(scope="session", autouse=True)
 def mock_chatbot_session():
     """Mock ChatBot globally for the entire test session to avoid real init"""
@@ -19,6 +48,8 @@ def mock_chatbot_session():
         mock_agent.initialize = AsyncMock()
         mock_agent.chat = AsyncMock(return_value="Global Mock AI Response")
         mock_agent.reset_history = AsyncMock()
+        # No checkpoint store until a test sets one
+        mock_agent.memory = None
         mock_instance.agent = mock_agent
         
         # Mock high-level methods
@@ -27,9 +58,10 @@ def mock_chatbot_session():
         mock_instance.generate_image.return_value = "data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mP8/5+hHgAHggJ/PchI7wAAAABJRU5ErkJggg=="
         mock_instance.reset_history = AsyncMock()
         
-        # Ensure we patch where it is used/imported
-        with patch("app_state.ChatBot", MockChatBot):
-             yield mock_instance
+        # app_state creates the ChatBot during startup; tests use the mock from the start
+        import app_state
+        with patch.object(app_state, "chatbot", mock_instance):
+            yield mock_instance
 
 @pytest.fixture
 def client(mock_chatbot_session):
@@ -1,4 +1,6 @@
 import pytest
+import asyncio
+import time
 from unittest.mock import AsyncMock, MagicMock, patch
 from langchain_core.messages import HumanMessage, AIMessage, ToolMessage, SystemMessage
 from langchain_core.tools import StructuredTool
@@ -9,6 +11,9 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) + "/src")
 
 from agent import ChatbotAgent
+from utils.http_pool import get_async_client
+from utils.answer_cache import AnswerCache
+from utils.checkpointer import PooledSqliteSaver
 
 @pytest.fixture
 def mock_mcp_client():
@@ -54,12 +59,37 @@ async def test_agent_initialization_azure_path(mock_mcp_client):
     """Test that the agent routes correctly to /home/data on Azure App Service."""
     envs = {
         "WEBSITE_SITE_NAME": "nviv",
+        "DATA_DIR": "",
     }
     with patch.dict(os.environ, envs), patch("os.makedirs"):
         agent = ChatbotAgent()
         assert agent.data_dir == "/home/data"
         assert agent.db_path == "/home/data/chat_history.sqlite"
 
+@pytest.mark.asyncio
+async def test_agent_local_disk_checkpoints(tmp_path):
+    """Test that the live database moves to local disk, restored from and snapshotted to the data directory."""
+    share, local = tmp_path / "share", tmp_path / "local"
+    with patch.dict(os.environ, {"DATA_DIR": str(share)}), patch("agent.CHECKPOINT_LOCAL_DIR", str(local)):
+        agent = ChatbotAgent()
+        assert agent.db_path == str(local / "chat_history.sqlite")
+        await agent._init_memory()
+        config = {"configurable": {"thread_id": "t1", "checkpoint_ns": ""}}
+        from langgraph.checkpoint.base import empty_checkpoint
+        await agent.memory.aput(config, empty_checkpoint(), {"step": 0}, {})
+        await agent.cleanup()
+    assert (share / "chat_history.sqlite").exists()
+
+    os.remove(local / "chat_history.sqlite")
+    with patch.dict(os.environ, {"DATA_DIR": str(share)}), patch("agent.CHECKPOINT_LOCAL_DIR", str(local)):
+        agent = ChatbotAgent()
+        await agent._init_memory()
+        try:
+            assert await agent.memory.aget_tuple(config) is not None
+            assert agent.snapshotter.stats["restored"] == 1
+        finally:
+            await agent.cleanup()
+
 @pytest.mark.asyncio
 async def test_agent_should_continue():
     """Test conditional edge logic."""
@@ -95,6 +125,19 @@ async def test_agent_chat_flow(mock_mcp_client):
     agent.app.ainvoke.assert_awaited_once()
     assert response == "Hi there!"
 
+@pytest.mark.asyncio
+async def test_agent_chat_uses_configured_durability(mock_mcp_client):
+    """Verify turns are committed with the configured checkpoint durability"""
+    agent = ChatbotAgent()
+    agent.mcp_client = mock_mcp_client
+    agent.app = AsyncMock()
+    agent.app.ainvoke.return_value = {"messages": [HumanMessage(content="Hello"), AIMessage(content="Hi")]}
+
+    with patch("agent.CHECKPOINT_DURABILITY", "exit"):
+        await agent.chat("Hello", thread_id="test_thread")
+
+    assert agent.app.ainvoke.call_args.kwargs["durability"] == "exit"
+
 @pytest.mark.asyncio
 async def test_agent_chat_error_handling(mock_mcp_client):
     """Test error handling during chat."""
@@ -117,7 +160,7 @@ async def test_agent_chat_error_handling(mock_mcp_client):
 async def test_agent_initialization_standard_openai(mock_mcp_client):
     """Test agent initialization with standard OpenAI (non-Azure)."""
     # Provide a dummy key so ChatOpenAI init doesn't fail before mock takes over or during validation
-    with patch.dict(os.environ, {"OPENAI_API_KEY": "dummy"}, clear=True):
+    with patch.dict(os.environ, {"OPENAI_API_KEY": "dummy", "DATA_DIR": os.environ["DATA_DIR"]}, clear=True):
         agent = ChatbotAgent()
         agent.mcp_client = mock_mcp_client
         
@@ -129,7 +172,9 @@ async def test_agent_initialization_standard_openai(mock_mcp_client):
             
             await agent.initialize()
             
-            mock_openai.assert_called_with(model="gpt-4o")
+            kwargs = mock_openai.call_args.kwargs
+            assert kwargs["model"] == "gpt-4o"
+            assert kwargs["http_async_client"] is get_async_client()
             assert agent.model is not None
             await agent.cleanup()
 
@@ -148,10 +193,19 @@ async def test_agent_cleanup(mock_mcp_client):
     mock_mcp_client.close.assert_awaited_once()
     agent.conn.close.assert_awaited_once()
 
+def test_agent_tool_execution_mode():
+    """Verify TOOL_EXECUTION picks the MCP server pool or in-process tools"""
+    from utils.mcp_client import MCPClient
+    from utils.inprocess_tools import InProcessTools
+    assert isinstance(ChatbotAgent().mcp_client, MCPClient)
+    with patch("agent.TOOL_EXECUTION", "inprocess"):
+        assert isinstance(ChatbotAgent().mcp_client, InProcessTools)
+
 @pytest.mark.asyncio
 async def test_agent_load_system_message_file():
-    """Test loading system message from file."""
-    with patch("os.path.exists", return_value=True), \
+    """Test loading system message from file when retrieval is disabled (KB_TOP_K=0)."""
+    with patch("agent.KB_TOP_K", 0), \
+         patch("os.path.exists", return_value=True), \
          patch("builtins.open", new_callable=MagicMock) as mock_open:
         mock_file = MagicMock()
         mock_file.__enter__.return_value.read.return_value = "Knowledge content"
@@ -222,19 +276,20 @@ async def test_agent_reset_history():
     """Test history reset attempts to clear records."""
     agent = ChatbotAgent()
     agent.conn = MagicMock()
-    agent.conn.execute = AsyncMock()
-    agent.conn.commit = AsyncMock()
+    agent.memory = MagicMock()
+    agent.memory.adelete_thread = AsyncMock()
     
     await agent.reset_history("test_thread")
     
-    assert agent.conn.execute.called
+    agent.memory.adelete_thread.assert_awaited_once_with("test_thread")
 
 @pytest.mark.asyncio
 async def test_agent_reset_history_exception(capsys):
     """Test history reset handles SQLite exceptions gracefully."""
     agent = ChatbotAgent()
     agent.conn = MagicMock()
-    agent.conn.execute = AsyncMock(side_effect=Exception("SQLite Error"))
+    agent.memory = MagicMock()
+    agent.memory.adelete_thread = AsyncMock(side_effect=Exception("SQLite Error"))
     
     # Should catch the error and print to stdout
     await agent.reset_history("test_thread")
@@ -243,6 +298,34 @@ async def test_agent_reset_history_exception(capsys):
     captured = capsys.readouterr()
     assert "Failed to reset history for test_thread: SQLite Error" in captured.out
 
+@pytest.mark.asyncio
+async def test_agent_reset_history_remaps_thread(tmp_path):
+    """Test reset starts a new thread for the session instead of deleting the old one in place."""
+    with patch.dict(os.environ, {"DATA_DIR": str(tmp_path)}):
+        agent = ChatbotAgent()
+        await agent._init_memory()
+        try:
+            agent.memory.adelete_thread = AsyncMock()
+            await agent.reset_history("web_1")
+            assert agent._thread_for("web_1").startswith("web_1#")
+            assert await agent.aliases.queued() == ["web_1"]
+            agent.memory.adelete_thread.assert_not_awaited()
+        finally:
+            await agent.cleanup()
+
+@pytest.mark.asyncio
+async def test_agent_reset_during_startup_opens_one_store(tmp_path):
+    """Test a reset arriving while startup opens the checkpoint store shares that store."""
+    with patch.dict(os.environ, {"DATA_DIR": str(tmp_path)}):
+        agent = ChatbotAgent()
+        with patch("agent.PooledSqliteSaver.open", wraps=PooledSqliteSaver.open) as opened:
+            await asyncio.gather(agent._init_memory(), agent.reset_history("web_1"))
+        try:
+            assert opened.call_count == 1
+            assert agent._thread_for("web_1").startswith("web_1#")
+        finally:
+            await agent.cleanup()
+
 @pytest.mark.asyncio
 async def test_agent_chat_auto_initialize(mock_mcp_client):
     """Test that chat() calls initialize() if app is None."""
@@ -265,3 +348,527 @@ async def test_agent_chat_auto_initialize(mock_mcp_client):
     await agent.chat("Hello", thread_id="test_thread")
     
     agent.initialize.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_agent_chat_stream_events(mock_mcp_client):
+    """Test that chat_stream surfaces tokens and tool events, then the final reply."""
+    from langchain_core.messages import AIMessageChunk
+    agent = ChatbotAgent()
+    agent.mcp_client = mock_mcp_client
+    agent.app = MagicMock()
+
+    async def fake_events(inputs, config=None, version=None, durability=None):
+        tool_call = AIMessage(content="", tool_calls=[{"name": "test_tool", "args": {}, "id": "call_1"}])
+        yield {"event": "on_chat_model_end", "data": {"output": tool_call}, "metadata": {"langgraph_node": "agent"}}
+        yield {"event": "on_tool_start", "name": "test_tool", "data": {}}
+        yield {"event": "on_tool_end", "name": "test_tool", "data": {"output": ToolMessage(content="Tool output", tool_call_id="call_1")}}
+        yield {"event": "on_chat_model_stream", "data": {"chunk": AIMessageChunk(content="Hi ")}, "metadata": {"langgraph_node": "agent"}}
+        yield {"event": "on_chat_model_stream", "data": {"chunk": AIMessageChunk(content="there")}, "metadata": {"langgraph_node": "agent"}}
+        yield {"event": "on_chat_model_end", "data": {"output": AIMessage(content="Hi there")}, "metadata": {"langgraph_node": "agent"}}
+
+    agent.app.astream_events = fake_events
+
+    events = [e async for e in agent.chat_stream("Hello", thread_id="test_thread")]
+
+    assert events[0] == {"type": "tool_start", "name": "test_tool"}
+    assert events[1] == {"type": "tool_end", "name": "test_tool", "output": "Tool output"}
+    assert [e["content"] for e in events if e["type"] == "token"] == ["Hi ", "there"]
+    assert events[-1] == {"type": "done", "message": "Hi there"}
+
+@pytest.mark.asyncio
+async def test_agent_chat_stream_budget_sends_only_the_hint(mock_mcp_client):
+    """Test that a turn ended by the budget streams the retry hint, not the partial answer again."""
+    from langchain_core.messages import AIMessageChunk
+    from utils.turn_budget import RETRY_TEXT
+    agent = ChatbotAgent()
+    agent.mcp_client = mock_mcp_client
+    agent.app = MagicMock()
+    closing = AIMessage(content="Checking the calendar\n\n" + RETRY_TEXT["deadline"], name="turn_budget_exhausted")
+
+    async def fake_events(inputs, config=None, version=None, durability=None):
+        yield {"event": "on_chat_model_stream", "data": {"chunk": AIMessageChunk(content="Checking the calendar")}, "metadata": {"langgraph_node": "agent"}}
+        yield {"event": "on_chain_end", "data": {"output": {"messages": [HumanMessage(content="Hello"), closing]}}, "parent_ids": []}
+
+    agent.app.astream_events = fake_events
+
+    events = [e async for e in agent.chat_stream("Hello", thread_id="test_thread")]
+
+    tokens = [e["content"] for e in events if e["type"] == "token"]
+    assert tokens == ["Checking the calendar", "\n\n" + RETRY_TEXT["deadline"]]
+    assert "".join(tokens) == closing.content
+    assert events[-1] == {"type": "done", "message": closing.content}
+
+@pytest.mark.asyncio
+async def test_agent_chat_stream_error(mock_mcp_client):
+    """Test that chat_stream reports failures as a final error event."""
+    agent = ChatbotAgent()
+    agent.mcp_client = mock_mcp_client
+    agent.app = MagicMock()
+
+    async def failing_events(inputs, config=None, version=None, durability=None):
+        raise Exception("Graph error")
+        yield
+
+    agent.app.astream_events = failing_events
+
+    events = [e async for e in agent.chat_stream("Hello", thread_id="test_thread")]
+
+    assert events == [{"type": "error", "message": "I encountered an error: Graph error"}]
+
+@pytest.mark.asyncio
+async def test_agent_call_model_trims_history(mock_mcp_client):
+    """Test that call_model applies the context window before calling the model."""
+    agent = ChatbotAgent()
+    agent.mcp_client = mock_mcp_client
+    agent.model = AsyncMock()
+    agent.model.ainvoke.return_value = AIMessage(content="Response")
+    agent.context_window.max_tokens = 0
+    agent.context_window.max_turns = 1
+    from utils.metrics import CONTEXT_DROPPED_TOKENS
+    observed = CONTEXT_DROPPED_TOKENS.count()
+
+    state = {"messages": [
+        HumanMessage(content="Old question"),
+        AIMessage(content="Old answer"),
+        HumanMessage(content="New question"),
+    ]}
+    await agent.call_model(state)
+
+    call_args = agent.model.ainvoke.call_args[0][0]
+    assert isinstance(call_args[0], SystemMessage)
+    assert [m.content for m in call_args[1:]] == ["New question"]
+    assert agent.context_window.stats["last_dropped_tokens"] > 0
+    assert CONTEXT_DROPPED_TOKENS.count() == observed + 1
+    assert 'context_dropped_tokens_bucket{le="0"}' in "\n".join(CONTEXT_DROPPED_TOKENS.render())
+
+def make_turns(count):
+    messages = []
+    for i in range(count):
+        messages.append(HumanMessage(content=f"question {i}", id=f"h{i}"))
+        messages.append(AIMessage(content=f"answer {i}", id=f"a{i}"))
+    return messages
+
+@pytest.mark.asyncio
+async def test_agent_compact_thread_rewrites_state(mock_mcp_client):
+    """Test that compaction replaces old turns with a summary and keeps recent turns."""
+    from langchain_core.messages import RemoveMessage
+    from agent import SUMMARY_MESSAGE_NAME
+    agent = ChatbotAgent()
+    agent.mcp_client = mock_mcp_client
+    agent.base_model = AsyncMock()
+    agent.base_model.ainvoke.return_value = AIMessage(content="Summary text")
+    agent.app = AsyncMock()
+    messages = make_turns(10)
+    agent.app.aget_state.return_value = MagicMock(values={"messages": messages})
+
+    with patch("agent.COMPACT_KEEP_TURNS", 3):
+        assert await agent.compact_thread("test_thread") is True
+
+    update = agent.app.aupdate_state.call_args[0][1]["messages"]
+    assert isinstance(update[0], RemoveMessage)
+    assert update[1].name == SUMMARY_MESSAGE_NAME
+    assert update[1].content == "Summary text"
+    assert update[2:] == messages[-6:]
+    assert agent.app.aupdate_state.call_args[1]["as_node"] == "agent"
+
+@pytest.mark.asyncio
+async def test_agent_compact_thread_skips_when_thread_changed(mock_mcp_client):
+    """Test that compaction does not overwrite a thread that changed while summarizing."""
+    agent = ChatbotAgent()
+    agent.mcp_client = mock_mcp_client
+    agent.base_model = AsyncMock()
+    agent.base_model.ainvoke.return_value = AIMessage(content="Summary text")
+    agent.app = AsyncMock()
+    agent.app.aget_state.side_effect = [
+        MagicMock(values={"messages": make_turns(10)}),
+        MagicMock(values={"messages": [HumanMessage(content="fresh", id="new")]}),
+    ]
+
+    with patch("agent.COMPACT_KEEP_TURNS", 3):
+        assert await agent.compact_thread("test_thread") is False
+
+    agent.app.aupdate_state.assert_not_awaited()
+
+@pytest.mark.asyncio
+async def test_agent_compact_thread_short_thread(mock_mcp_client):
+    """Test that short threads are left alone."""
+    agent = ChatbotAgent()
+    agent.mcp_client = mock_mcp_client
+    agent.base_model = AsyncMock()
+    agent.app = AsyncMock()
+    agent.app.aget_state.return_value = MagicMock(values={"messages": make_turns(2)})
+
+    with patch("agent.COMPACT_KEEP_TURNS", 3):
+        assert await agent.compact_thread("test_thread") is False
+
+    agent.base_model.ainvoke.assert_not_awaited()
+
+@pytest.mark.asyncio
+async def test_agent_chat_schedules_compaction(mock_mcp_client):
+    """Test that chat() starts compaction in the background once the thread is long."""
+    agent = ChatbotAgent()
+    agent.mcp_client = mock_mcp_client
+    agent.base_model = AsyncMock()
+    agent.app = AsyncMock()
+    agent.app.ainvoke.return_value = {"messages": make_turns(5)}
+    agent.compact_thread = AsyncMock(return_value=True)
+
+    with patch("agent.COMPACT_THRESHOLD_MESSAGES", 8):
+        await agent.chat("Hello", thread_id="long_thread")
+        agent.app.ainvoke.return_value = {"messages": make_turns(2)}
+        await agent.chat("Hello", thread_id="short_thread")
+
+    await asyncio.sleep(0)
+    agent.compact_thread.assert_awaited_once_with("long_thread")
+
+@pytest.mark.asyncio
+async def test_agent_call_model_folds_summary(mock_mcp_client):
+    """Test that a stored summary is merged into the system prompt."""
+    from agent import SUMMARY_MESSAGE_NAME
+    agent = ChatbotAgent()
+    agent.mcp_client = mock_mcp_client
+    agent.model = AsyncMock()
+    agent.model.ainvoke.return_value = AIMessage(content="Response")
+
+    summary = SystemMessage(content="User likes cats", name=SUMMARY_MESSAGE_NAME)
+    await agent.call_model({"messages": [summary, HumanMessage(content="Hi")]})
+
+    call_args = agent.model.ainvoke.call_args[0][0]
+    assert call_args[0].content.startswith(agent.system_message)
+    assert "User likes cats" in call_args[0].content
+    assert isinstance(call_args[1], HumanMessage)
+
+def _faq_agent(tmp_path):
+    (tmp_path / "faq.md").write_text("## FAQ\n### Q: What are the pricing plans?\nA: Free and Pro.\n")
+    agent = ChatbotAgent()
+    agent.answer_cache = AnswerCache([str(tmp_path)])
+    agent.app = AsyncMock()
+    return agent
+
+@pytest.mark.asyncio
+async def test_agent_chat_served_from_cache(mock_mcp_client, tmp_path):
+    """Test that an FAQ answer skips the graph on a thread's first turn and is recorded in the thread."""
+    agent = _faq_agent(tmp_path)
+    agent.mcp_client = mock_mcp_client
+    agent.app.aget_state.return_value = MagicMock(values={})
+
+    response = await agent.chat("what are the pricing plans", thread_id="test_thread")
+
+    assert response == "Free and Pro."
+    agent.app.ainvoke.assert_not_awaited()
+    recorded = agent.app.aupdate_state.call_args[0][1]["messages"]
+    assert isinstance(recorded[0], HumanMessage)
+    assert recorded[1].content == "Free and Pro."
+
+@pytest.mark.asyncio
+async def test_agent_cache_skipped_mid_conversation(mock_mcp_client, tmp_path):
+    """Test that a later turn goes to the model even when it reads like an FAQ question."""
+    agent = _faq_agent(tmp_path)
+    agent.mcp_client = mock_mcp_client
+    agent.app.aget_state.return_value = MagicMock(values={"messages": make_turns(1)})
+    agent.app.ainvoke.return_value = {"messages": make_turns(1) + [HumanMessage(content="q"), AIMessage(content="It depends.")]}
+
+    response = await agent.chat("What are the pricing plans for that?", thread_id="t1")
+
+    assert response == "It depends."
+    agent.app.aupdate_state.assert_not_awaited()
+    assert agent.answer_cache.stats["hits"] == 0
+    assert agent.answer_cache.stats["misses"] == 1
+
+@pytest.mark.asyncio
+async def test_agent_model_replies_are_not_cached(mock_mcp_client, tmp_path):
+    """Test that one user's model reply is never served to another."""
+    agent = _faq_agent(tmp_path)
+    agent.mcp_client = mock_mcp_client
+    agent.app.aget_state.return_value = MagicMock(values={})
+    agent.app.ainvoke.return_value = {"messages": [HumanMessage(content="q"), AIMessage(content="Your balance is 10.")]}
+    question = "my account id is 9912, what is my balance?"
+
+    await agent.chat(question, thread_id="alice")
+    await agent.chat(question, thread_id="bob")
+
+    assert agent.app.ainvoke.await_count == 2
+    assert agent.answer_cache.lookup(question) is None
+
+@pytest.mark.asyncio
+async def test_agent_call_model_injects_relevant_kb_sections(mock_mcp_client, tmp_path):
+    """Test that only knowledge base sections relevant to the question reach the prompt."""
+    from utils.kb_index import KnowledgeBaseIndex
+    (tmp_path / "products.md").write_text("# Products\n## Pricing\nThe pro plan costs 10 dollars.\n## Support\nEmail support@nviv.com\n")
+    agent = ChatbotAgent()
+    agent.mcp_client = mock_mcp_client
+    agent.kb_index = KnowledgeBaseIndex([str(tmp_path)])
+    agent.model = AsyncMock()
+    agent.model.ainvoke.return_value = AIMessage(content="Response")
+
+    await agent.call_model({"messages": [HumanMessage(content="How much is the pro plan pricing?")]})
+
+    system_prompt = agent.model.ainvoke.call_args[0][0][0].content
+    assert "The pro plan costs 10 dollars." in system_prompt
+    assert "support@nviv.com" not in system_prompt
+    assert agent.system_message not in system_prompt
+    assert "markdown link" in system_prompt
+
+@pytest.mark.asyncio
+async def test_agent_tool_concurrency_cap(mock_mcp_client):
+    """Test that tool calls of one turn run concurrently up to TOOL_MAX_CONCURRENCY."""
+    agent = ChatbotAgent()
+    agent.mcp_client = mock_mcp_client
+    running = 0
+    peak = 0
+
+    async def execute(request):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return request.tool_call["id"]
+
+    request = lambda i: MagicMock(tool_call={"id": f"call_{i}"}, runtime=MagicMock(config={"configurable": {"thread_id": "t1"}}))
+    with patch("agent.TOOL_MAX_CONCURRENCY", 2):
+        results = await asyncio.gather(*(agent._limit_tool_concurrency(request(i), execute) for i in range(5)))
+
+    assert results == [f"call_{i}" for i in range(5)]
+    assert peak == 2
+
+@pytest.mark.asyncio
+async def test_agent_call_model_routes_simple_turn_to_fast_model(mock_mcp_client):
+    """Test that a simple turn uses the fast model and the decision is recorded."""
+    agent = ChatbotAgent()
+    agent.model = AsyncMock()
+    agent.fast_model = AsyncMock()
+    agent.fast_model.ainvoke.return_value = AIMessage(content="Hello!")
+
+    config = {"configurable": {"thread_id": "t1", "channel": "twilio"}}
+    result = await agent.call_model({"messages": [HumanMessage(content="hi")]}, config)
+
+    assert result["messages"][0].content == "Hello!"
+    agent.model.ainvoke.assert_not_awaited()
+    decision = agent.model_router.recent[-1]
+    assert decision["tier"] == "fast" and decision["channel"] == "twilio" and decision["thread_id"] == "t1"
+    assert decision["latency_ms"] >= 0
+
+@pytest.mark.asyncio
+async def test_agent_call_model_escalates_tool_calls(mock_mcp_client):
+    """Test that a tool call from the fast model is redone by the large model."""
+    agent = ChatbotAgent()
+    agent.fast_model = AsyncMock()
+    agent.fast_model.ainvoke.return_value = AIMessage(content="", tool_calls=[{"name": "t", "args": {}, "id": "1"}])
+    agent.model = AsyncMock()
+    agent.model.ainvoke.return_value = AIMessage(content="", tool_calls=[{"name": "t", "args": {"a": 1}, "id": "2"}])
+
+    result = await agent.call_model({"messages": [HumanMessage(content="hmm ok")]})
+
+    assert result["messages"][0].tool_calls[0]["id"] == "2"
+    assert agent.model_router.recent[-1]["reason"] == "escalated:tool_call"
+    assert agent.model_router.stats["escalations"] == 1
+
+@pytest.mark.asyncio
+async def test_agent_call_model_escalation_times_each_call(mock_mcp_client):
+    """Test that an escalated turn records the fast and the large call under their own tiers."""
+    from utils.metrics import MODEL_CALL_SECONDS
+    agent = ChatbotAgent()
+    agent.fast_model = AsyncMock()
+    agent.fast_model.ainvoke.return_value = AIMessage(content="", tool_calls=[{"name": "t", "args": {}, "id": "1"}])
+    agent.model = AsyncMock()
+    agent.model.ainvoke.return_value = AIMessage(content="Done")
+    fast, large = MODEL_CALL_SECONDS.count(tier="fast"), MODEL_CALL_SECONDS.count(tier="large")
+
+    await agent.call_model({"messages": [HumanMessage(content="hmm ok")]})
+
+    assert MODEL_CALL_SECONDS.count(tier="fast") == fast + 1
+    assert MODEL_CALL_SECONDS.count(tier="large") == large + 1
+
+@pytest.mark.asyncio
+async def test_agent_call_model_routes_compacted_thread_to_large_model(mock_mcp_client):
+    """Test that a compacted thread goes to the large model even for a simple message."""
+    from utils.context_window import SUMMARY_MESSAGE_NAME
+    agent = ChatbotAgent()
+    agent.fast_model = AsyncMock()
+    agent.model = AsyncMock()
+    agent.model.ainvoke.return_value = AIMessage(content="Hi again")
+    summary = SystemMessage(content="User likes cats", name=SUMMARY_MESSAGE_NAME)
+
+    await agent.call_model({"messages": [summary, HumanMessage(content="hi")]})
+
+    agent.fast_model.ainvoke.assert_not_awaited()
+    assert agent.model_router.recent[-1]["reason"] == "compacted_thread"
+
+@pytest.mark.asyncio
+async def test_agent_call_model_without_fast_model_uses_main_model(mock_mcp_client):
+    """Test that routing is off when no fast deployment is configured."""
+    agent = ChatbotAgent()
+    agent.model = AsyncMock()
+    agent.model.ainvoke.return_value = AIMessage(content="Hi")
+
+    await agent.call_model({"messages": [HumanMessage(content="hi")]})
+
+    agent.model.ainvoke.assert_awaited_once()
+    assert agent.model_router.recent[-1]["reason"] == "no_fast_model"
+
+@pytest.mark.asyncio
+async def test_agent_initialization_with_fast_deployment(mock_mcp_client):
+    """Test that a fast deployment is created when configured."""
+    envs = {"AZURE_OPENAI_API_KEY": "k", "AZURE_OPENAI_DEPLOYMENT_NAME": "gpt-4o", "AZURE_OPENAI_FAST_DEPLOYMENT_NAME": "gpt-4o-mini"}
+    with patch.dict(os.environ, envs):
+        agent = ChatbotAgent()
+        agent.mcp_client = mock_mcp_client
+        with patch("agent.AzureChatOpenAI") as mock_azure, patch("agent.StateGraph"):
+            await agent.initialize()
+
+            deployments = [c.kwargs["azure_deployment"] for c in mock_azure.call_args_list]
+            assert deployments == ["gpt-4o", "gpt-4o-mini"]
+            assert agent.fast_model is not None
+            await agent.cleanup()
+
+@pytest.mark.asyncio
+async def test_agent_call_model_stops_after_max_tool_iterations(mock_mcp_client):
+    """Test that the turn ends gracefully once the tool iteration budget is used up."""
+    agent = ChatbotAgent()
+    agent.model = AsyncMock()
+    agent.turn_budget.max_tool_iterations = 2
+    history = [HumanMessage(content="loop please")]
+    for i in range(2):
+        history += [AIMessage(content="", tool_calls=[{"name": "t", "args": {}, "id": f"c{i}"}]), ToolMessage(content="x", tool_call_id=f"c{i}")]
+
+    result = await agent.call_model({"messages": history})
+
+    agent.model.ainvoke.assert_not_awaited()
+    assert result["messages"][0].name == "turn_budget_exhausted"
+    assert not result["messages"][0].tool_calls
+    assert agent.should_continue({"messages": result["messages"]}) == "end"
+
+@pytest.mark.asyncio
+async def test_agent_call_model_times_out_at_deadline(mock_mcp_client):
+    """Test that a slow model call is cut off at the turn deadline."""
+    agent = ChatbotAgent()
+
+    async def slow(messages):
+        await asyncio.sleep(5)
+
+    agent.model = MagicMock(ainvoke=slow)
+    config = {"configurable": {"thread_id": "t1", "deadline": time.monotonic() + 0.05}}
+    result = await agent.call_model({"messages": [HumanMessage(content="hi")]}, config)
+
+    assert result["messages"][0].name == "turn_budget_exhausted"
+    assert agent.turn_budget.stats["deadline"] == 1
+
+@pytest.mark.asyncio
+async def test_agent_tool_call_timeout(mock_mcp_client):
+    """Test that a hanging tool call returns an error result instead of blocking the turn."""
+    agent = ChatbotAgent()
+    agent.turn_budget.tool_timeout = 0.05
+
+    async def hang(request):
+        await asyncio.sleep(5)
+
+    request = MagicMock(tool_call={"id": "call_1", "name": "slow_tool"}, runtime=MagicMock(config={"configurable": {"thread_id": "t1"}}))
+    result = await agent._limit_tool_concurrency(request, hang)
+
+    assert isinstance(result, ToolMessage)
+    assert result.tool_call_id == "call_1"
+    assert result.status == "error"
+    assert agent.turn_budget.stats["tool_timeouts"] == 1
+
+@pytest.mark.asyncio
+async def test_agent_chat_budget_reply(mock_mcp_client):
+    """Test that a turn ended by the budget is returned and carries a deadline."""
+    agent = ChatbotAgent()
+    agent.app = AsyncMock()
+    agent.answer_cache = MagicMock()
+    agent.answer_cache.match.return_value = None
+    exhausted = AIMessage(content="Please try again.", name="turn_budget_exhausted")
+    agent.app.ainvoke.return_value = {"messages": [HumanMessage(content="Hello"), exhausted]}
+
+    response = await agent.chat("Hello", thread_id="t1", channel="twilio")
+
+    assert response == "Please try again."
+    configurable = agent.app.ainvoke.call_args.kwargs["config"]["configurable"]
+    assert configurable["channel"] == "twilio"
+    assert configurable["deadline"] > time.monotonic()
+
+@pytest.mark.asyncio
+async def test_agent_turn_deadline_starts_after_queue_wait(mock_mcp_client):
+    """Test that a turn queued behind another on the same thread gets its whole budget."""
+    agent = ChatbotAgent()
+    agent.app = AsyncMock()
+    agent.answer_cache = None
+    agent.app.ainvoke.return_value = {"messages": [HumanMessage(content="Hello"), AIMessage(content="Hi")]}
+    agent.turn_budget.deadline_for = lambda channel: time.monotonic() + 1
+
+    async with agent._thread_lock("web_default"):
+        turn = asyncio.create_task(agent.chat("Hello", thread_id="web_default"))
+        await asyncio.sleep(0.1)
+        released_at = time.monotonic()
+    assert await turn == "Hi"
+
+    assert agent.app.ainvoke.call_args.kwargs["config"]["configurable"]["deadline"] >= released_at + 1
+
+@pytest.mark.asyncio
+async def test_agent_call_model_records_latency_and_tokens(mock_mcp_client):
+    """Test that model calls record latency and token usage per tier."""
+    from utils.metrics import MODEL_CALL_SECONDS, MODEL_TOKENS
+    agent = ChatbotAgent()
+    agent.model = AsyncMock()
+    agent.model.ainvoke.return_value = AIMessage(
+        content="Hi", usage_metadata={"input_tokens": 120, "output_tokens": 8, "total_tokens": 128}
+    )
+    calls = MODEL_CALL_SECONDS.count(tier="large")
+    prompt_tokens = MODEL_TOKENS.value(tier="large", kind="prompt")
+
+    await agent.call_model({"messages": [HumanMessage(content="hi")]})
+
+    assert MODEL_CALL_SECONDS.count(tier="large") == calls + 1
+    assert MODEL_TOKENS.value(tier="large", kind="prompt") == prompt_tokens + 120
+
+@pytest.mark.asyncio
+async def test_agent_tool_call_latency_per_tool(mock_mcp_client):
+    """Test that tool calls record latency labelled by tool name and outcome."""
+    from utils.metrics import TOOL_CALL_SECONDS
+    agent = ChatbotAgent()
+    request = MagicMock(tool_call={"id": "call_1", "name": "generate_image"}, runtime=MagicMock(config={"configurable": {"thread_id": "t1"}}))
+    before = TOOL_CALL_SECONDS.count(tool="generate_image", status="ok")
+
+    async def execute(request):
+        return "done"
+
+    await agent._limit_tool_concurrency(request, execute)
+    assert TOOL_CALL_SECONDS.count(tool="generate_image", status="ok") == before + 1
+
+@pytest.mark.asyncio
+async def test_checkpointer_records_read_and_write_time(tmp_path):
+    """Test that the checkpoint store times reads and writes."""
+    import aiosqlite
+    from utils.checkpointer import InstrumentedSqliteSaver
+    from utils.metrics import CHECKPOINT_SECONDS
+    from langgraph.checkpoint.base import empty_checkpoint
+
+    async with aiosqlite.connect(tmp_path / "cp.sqlite") as conn:
+        saver = InstrumentedSqliteSaver(conn)
+        await saver.setup()
+        reads, writes = CHECKPOINT_SECONDS.count(operation="read"), CHECKPOINT_SECONDS.count(operation="write")
+        config = {"configurable": {"thread_id": "t1", "checkpoint_ns": ""}}
+
+        saved = await saver.aput(config, empty_checkpoint(), {}, {})
+        assert (await saver.aget_tuple(saved)) is not None
+
+        assert CHECKPOINT_SECONDS.count(operation="write") == writes + 1
+        assert CHECKPOINT_SECONDS.count(operation="read") == reads + 1
+
+@pytest.mark.asyncio
+async def test_agent_initialize_is_single_flight(mock_mcp_client):
+    """Test that concurrent first turns start only one MCP server and build one graph."""
+    agent = ChatbotAgent()
+    agent.mcp_client = mock_mcp_client
+
+    async def slow_init():
+        await asyncio.sleep(0.01)
+
+    mock_mcp_client.initialize.side_effect = slow_init
+    with patch("agent.AzureChatOpenAI"), patch("agent.ChatOpenAI"), patch("agent.StateGraph"):
+        await asyncio.gather(*(agent.initialize() for _ in range(5)))
+
+    mock_mcp_client.initialize.assert_awaited_once()
+    mock_mcp_client.get_tools.assert_awaited_once()
+    await agent.cleanup()
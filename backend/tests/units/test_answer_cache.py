@@ -0,0 +1,85 @@
+import pytest
+import os
+import time
+
+# Add src to path
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) + "/src")
+
+from utils.answer_cache import ANSWER_CACHE_LOOKUPS, AnswerCache, normalize_question, parse_faq
+
+KB = """# KB
+
+## Frequently Asked Questions
+
+### Q: What is Nviv?
+A: Nviv is a personal AI assistant.
+
+### Q: How do I get started?
+A: Just ask me anything.
+
+## Contact Information
+- Email: support@nviv.com
+"""
+
+@pytest.fixture
+def kb_file(tmp_path):
+    path = tmp_path / "knowledge_base.md"
+    path.write_text(KB)
+    return path
+
+def test_parse_faq():
+    """Verify FAQ question/answer pairs are extracted from markdown"""
+    assert parse_faq(KB) == [
+        ("What is Nviv?", "Nviv is a personal AI assistant."),
+        ("How do I get started?", "Just ask me anything."),
+    ]
+
+def test_normalize_strips_punctuation_and_instructions():
+    """Verify normalization ignores case, punctuation and our channel instructions"""
+    text = "What is NVIV??\n\n[Instruction: Keep your response under 1500 characters.]"
+    assert normalize_question(text) == "what is nviv"
+
+def test_exact_and_similar_hits(kb_file):
+    """Verify FAQ answers are served for exact and reworded questions"""
+    cache = AnswerCache([str(kb_file)])
+    before = {r: ANSWER_CACHE_LOOKUPS.value(result=r) for r in ("exact_hit", "similar_hit", "miss")}
+
+    assert cache.lookup("what is nviv") == "Nviv is a personal AI assistant."
+    assert cache.lookup("Who is Nviv?") == "Nviv is a personal AI assistant."
+    assert cache.lookup("How can I get started with Nviv") == "Just ask me anything."
+    assert cache.lookup("draw a cat") is None
+    assert cache.stats["exact_hits"] == 1
+    assert cache.stats["similar_hits"] == 2
+    assert cache.stats["misses"] == 1
+    assert {r: ANSWER_CACHE_LOOKUPS.value(result=r) - n for r, n in before.items()} == {"exact_hit": 1, "similar_hit": 2, "miss": 1}
+
+def test_off_topic_question_is_not_matched(kb_file):
+    """Verify a question about something the knowledge base never mentions gets no FAQ answer"""
+    cache = AnswerCache([str(kb_file)])
+
+    assert cache.lookup("What is OpenAI?") is None
+    assert cache.lookup("How do I get started with OpenAI?") is None
+    assert cache.lookup("What is the Nviv email?") is None
+
+def test_faq_key_terms_required(kb_file):
+    """Verify a similar question is only matched when it contains every key term of the FAQ question"""
+    cache = AnswerCache([str(kb_file)], similarity_threshold=0.2)
+    assert cache.lookup("get a personal assistant") is None
+    assert cache.lookup("How do I get started?") == "Just ask me anything."
+
+def test_invalidation_on_kb_change(kb_file):
+    """Verify the cache is rebuilt when the knowledge base file changes"""
+    cache = AnswerCache([str(kb_file)], check_interval=0)
+
+    kb_file.write_text(KB.replace("Just ask me anything.", "Say hello!"))
+    os.utime(kb_file, ns=(time.time_ns(), time.time_ns() + 10**9))
+
+    assert cache.lookup("How do I get started?") == "Say hello!"
+    assert cache.stats["invalidations"] == 1
+
+def test_missing_kb_file(tmp_path):
+    """Verify a missing knowledge base just leaves the cache empty"""
+    cache = AnswerCache([str(tmp_path / "missing.md")])
+    assert len(cache) == 0
+    assert cache.lookup("What is Nviv?") is None
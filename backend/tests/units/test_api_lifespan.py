@@ -6,6 +6,7 @@ from fastapi import FastAPI
 from fastapi.testclient import TestClient
 import sys
 import os
+import time
 
 # Add src to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) + "/src")
@@ -27,12 +28,14 @@ async def test_api_lifespan():
     with patch.object(app_state, "chatbot", mock_chatbot):
         # Use TestClient with the app context to trigger lifespan
         with TestClient(api.app) as client:
-            # Startup should have run
+            # Startup runs in the background; /ready turns 200 once it finished
+            for _ in range(100):
+                if client.get("/ready").status_code == 200:
+                    break
+                time.sleep(0.01)
+            assert client.get("/ready").status_code == 200
             mock_chatbot.initialize.assert_awaited_once()
             
-            # Make a dummy request to ensure app is up (optional)
-            # client.get("/") 
-            
         # Context exit triggers shutdown
         mock_chatbot.agent.cleanup.assert_awaited_once()
 
@@ -68,3 +71,25 @@ async def test_background_cleanup_task_exception():
                 await api.background_cleanup_task()
                 mock_logger.error.assert_called_with("Image cleanup task error: Test error")
                 mock_sleep.assert_awaited_once_with(3600)
+
+@pytest.mark.asyncio
+async def test_startup_is_single_flight():
+    """Verify concurrent start() calls share one startup and wait_until_ready waits for it"""
+    mock_chatbot = MagicMock()
+    mock_chatbot.initialize = AsyncMock()
+    with patch.object(app_state, "chatbot", None), patch.object(app_state, "_startup_task", None), \
+         patch.object(app_state, "create_chatbot", return_value=mock_chatbot) as create:
+        assert app_state.start() is app_state.start()
+        assert await app_state.wait_until_ready(timeout=5) is True
+        await app_state._startup_task
+
+        create.assert_called_once()
+        mock_chatbot.initialize.assert_awaited_once()
+        assert app_state.is_ready()
+        assert app_state.startup_seconds is not None
+
+@pytest.mark.asyncio
+async def test_wait_until_ready_without_startup():
+    """Verify webhooks do not wait when no startup is running and no chatbot exists"""
+    with patch.object(app_state, "chatbot", None), patch.object(app_state, "_startup_task", None):
+        assert await app_state.wait_until_ready(timeout=5) is False
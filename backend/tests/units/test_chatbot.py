@@ -58,7 +58,7 @@ async def test_chatbot_chat_flow(mock_agent):
             bot = ChatBot()
             response = await bot.chat("hello world")
             
-            mock_agent.chat.assert_awaited_once_with("hello world", thread_id="default_thread")
+            mock_agent.chat.assert_awaited_once_with("hello world", thread_id="default_thread", channel="web")
             assert response == "Mocked AI Response"
 
 @pytest.mark.asyncio
@@ -118,7 +118,7 @@ def test_chatbot_generate_image_success_b64(mock_agent):
         "AZURE_OPENAI_FLUX_DEPLOYMENT": "flux-model"
     }
     with patch.dict(os.environ, envs):
-        with patch('chatbot.AzureOpenAI'), patch('requests.post') as mock_post:
+        with patch('chatbot.AzureOpenAI'), patch('chatbot.pooled_post') as mock_post:
             mock_response = MagicMock()
             mock_response.status_code = 200
             mock_response.json.return_value = {"data": [{"b64_json": "base64data"}]}
@@ -189,7 +189,7 @@ def test_chatbot_generate_image_api_error(mock_agent):
     }
     with patch.dict(os.environ, envs), \
          patch('chatbot.AzureOpenAI'), \
-         patch('requests.post') as mock_post:
+         patch('chatbot.pooled_post') as mock_post:
          
         mock_response = MagicMock()
         mock_response.status_code = 400
@@ -210,7 +210,7 @@ def test_chatbot_generate_image_no_data(mock_agent):
     }
     with patch.dict(os.environ, envs), \
          patch('chatbot.AzureOpenAI'), \
-         patch('requests.post') as mock_post:
+         patch('chatbot.pooled_post') as mock_post:
          
         mock_response = MagicMock()
         mock_response.status_code = 200
@@ -231,7 +231,7 @@ def test_chatbot_generate_image_url_response(mock_agent):
     }
     with patch.dict(os.environ, envs), \
          patch('chatbot.AzureOpenAI'), \
-         patch('requests.post') as mock_post:
+         patch('chatbot.pooled_post') as mock_post:
          
         mock_response = MagicMock()
         mock_response.status_code = 200
@@ -255,7 +255,7 @@ def test_chatbot_generate_image_construct_url(mock_agent):
     with patch.dict(os.environ, envs, clear=True), \
          patch('chatbot.AzureOpenAI'), \
          patch('chatbot.load_dotenv'), \
-         patch('requests.post') as mock_post:
+         patch('chatbot.pooled_post') as mock_post:
          
         mock_response = MagicMock()
         mock_response.status_code = 200
@@ -324,3 +324,37 @@ async def test_chatbot_initialize(mock_agent):
         bot = ChatBot()
         await bot.initialize()
         mock_agent.initialize.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_chatbot_chat_with_instruction(mock_agent):
+    """Verify the instruction is appended to the message sent to the agent"""
+    envs = {
+        "AZURE_OPENAI_ENDPOINT": "https://test.openai.azure.com/",
+        "AZURE_OPENAI_API_KEY": "test-key",
+        "AZURE_OPENAI_DEPLOYMENT_NAME": "test-model"
+    }
+    with patch.dict(os.environ, envs):
+        with patch('chatbot.AzureOpenAI'):
+            bot = ChatBot()
+            await bot.chat("hello", thread_id="t1", instruction="Be brief.")
+            mock_agent.chat.assert_awaited_once_with("hello\n\n[Instruction: Be brief.]", thread_id="t1", channel="web")
+
+@pytest.mark.asyncio
+async def test_chatbot_chat_coalesce(mock_agent):
+    """Verify coalesced messages from one sender produce a single agent turn"""
+    import asyncio
+    envs = {
+        "AZURE_OPENAI_ENDPOINT": "https://test.openai.azure.com/",
+        "AZURE_OPENAI_API_KEY": "test-key",
+        "AZURE_OPENAI_DEPLOYMENT_NAME": "test-model"
+    }
+    with patch.dict(os.environ, envs):
+        with patch('chatbot.AzureOpenAI'):
+            bot = ChatBot()
+            bot.turn_queue.window = 0.01
+            results = await asyncio.gather(
+                bot.chat("hi", thread_id="t1", coalesce=True),
+                bot.chat("how are you", thread_id="t1", coalesce=True),
+            )
+            assert results == [None, "Mocked AI Response"]
+            mock_agent.chat.assert_awaited_once_with("hi\nhow are you", thread_id="t1", channel="web")
@@ -0,0 +1,136 @@
+import sys
+import os
+import pytest
+
+# Add backend/src to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) + "/src")
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.base import CheckpointTuple, create_checkpoint, empty_checkpoint
+
+from conftest import checkpoint_config as _config
+from utils.checkpoint_cache import ThreadStateCache, approximate_size
+from utils.checkpointer import CHECKPOINT_LOCK_WAIT_SECONDS
+
+
+def _checkpoint(previous=None, step=0, text="hello"):
+    checkpoint = create_checkpoint(previous or empty_checkpoint(), None, step)
+    checkpoint["channel_values"] = {"messages": [HumanMessage(content=text), AIMessage(content=text * 10)]}
+    checkpoint["channel_versions"] = {"messages": step + 1}
+    return checkpoint
+
+
+async def _turn(saver, thread_id, step, parent=None):
+    checkpoint = _checkpoint(step=step, text=f"turn {step}")
+    saved = await saver.aput(parent or _config(thread_id), checkpoint, {"step": step}, {})
+    await saver.aput_writes(saved, [("messages", [HumanMessage(content="next")])], "task-1", "~path")
+    return saved
+
+
+async def _stores(open_saver):
+    """A cached saver and an uncached one on the same database"""
+    return await open_saver(readers=1, cache=ThreadStateCache()), await open_saver(readers=1)
+
+
+@pytest.mark.asyncio
+async def test_hit_matches_database_read(open_saver):
+    """Verify a cached read returns exactly what the database holds, without touching it"""
+    cached, plain = await _stores(open_saver)
+    first = await _turn(cached, "t1", 0)
+    await _turn(cached, "t1", 1, parent=first)
+
+    readers_before = CHECKPOINT_LOCK_WAIT_SECONDS.count(lock="reader")
+    hit = await cached.aget_tuple(_config("t1"))
+    assert CHECKPOINT_LOCK_WAIT_SECONDS.count(lock="reader") == readers_before
+    assert cached.cache.stats["hits"] == 1
+
+    stored = await plain.aget_tuple(_config("t1"))
+    assert hit.config == stored.config
+    assert hit.checkpoint == stored.checkpoint
+    assert hit.metadata == stored.metadata
+    assert hit.parent_config == stored.parent_config
+    assert hit.pending_writes == stored.pending_writes
+
+
+@pytest.mark.asyncio
+async def test_miss_fills_the_cache(open_saver):
+    """Verify a thread written by another process is loaded once, then served from memory"""
+    cached, plain = await _stores(open_saver)
+    await plain.aput(_config("t1"), _checkpoint(), {"step": 0}, {})
+
+    assert (await cached.aget_tuple(_config("t1"))) is not None
+    assert (await cached.aget_tuple(_config("t1"))) is not None
+    assert cached.cache.stats["misses"] == 1
+    assert cached.cache.stats["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_callers_cannot_change_cached_state(open_saver):
+    """Verify in-place updates to a loaded checkpoint do not leak into the cache"""
+    cached, plain = await _stores(open_saver)
+    await _turn(cached, "t1", 0)
+    loaded = await cached.aget_tuple(_config("t1"))
+    loaded.checkpoint["channel_versions"]["messages"] = 99
+    loaded.checkpoint["versions_seen"]["agent"] = {"messages": 99}
+    loaded.pending_writes.clear()
+
+    again = await cached.aget_tuple(_config("t1"))
+    assert again.checkpoint["channel_versions"]["messages"] == 1
+    assert "agent" not in again.checkpoint["versions_seen"]
+    assert len(again.pending_writes) == 1
+
+
+@pytest.mark.asyncio
+async def test_delete_invalidates(open_saver):
+    """Verify a deleted thread is not served from the cache"""
+    cached, plain = await _stores(open_saver)
+    await _turn(cached, "t1", 0)
+    await cached.adelete_thread("t1")
+    assert await cached.aget_tuple(_config("t1")) is None
+
+
+@pytest.mark.asyncio
+async def test_writes_before_their_checkpoint_skip_the_cache(open_saver):
+    """Verify writes stored before their checkpoint's aput completes are not lost from reads"""
+    cached, plain = await _stores(open_saver)
+    checkpoint = _checkpoint()
+    saved_config = _config("t1", checkpoint["id"])
+    generation = cached.cache.generation(_config("t1"))
+    # The aput for `checkpoint` is in flight while its writes land
+    await cached.aput_writes(saved_config, [("messages", "early")], "task-1")
+    await plain.aput(_config("t1"), checkpoint, {"step": 0}, {})
+    cached.cache.put(_config("t1"), saved_config, checkpoint, {"step": 0}, generation)
+
+    loaded = await cached.aget_tuple(_config("t1"))
+    assert loaded.pending_writes == [("task-1", "messages", "early")]
+
+
+def test_stale_read_does_not_refill_after_invalidate():
+    """Verify a database read that started before an invalidation is not cached"""
+    cache = ThreadStateCache()
+    checkpoint = _checkpoint()
+    generation = cache.generation(_config("t1"))
+    cache.invalidate("t1")
+    cache.fill(CheckpointTuple(_config("t1", checkpoint["id"]), checkpoint, {}, None, []), generation)
+    assert len(cache) == 0
+
+
+def test_evicts_least_recently_used_by_count_and_size():
+    """Verify eviction beyond the thread limit and the byte limit, oldest first"""
+    cache = ThreadStateCache(max_threads=2)
+    for thread_id in ("a", "b", "c"):
+        checkpoint = _checkpoint()
+        cache.put(_config(thread_id), _config(thread_id, checkpoint["id"]), checkpoint, {}, cache.generation(_config(thread_id)))
+        if thread_id == "b":
+            cache.get(_config("a"))
+    assert cache.get(_config("b")) is None
+    assert cache.get(_config("a")) is not None and cache.get(_config("c")) is not None
+    assert cache.stats["evictions"] == 1
+
+    small = ThreadStateCache(max_bytes=approximate_size(_checkpoint()) * 2)
+    for thread_id in ("a", "b", "c"):
+        checkpoint = _checkpoint()
+        small.put(_config(thread_id), _config(thread_id, checkpoint["id"]), checkpoint, {}, small.generation(_config(thread_id)))
+    assert len(small) == 2
+    assert small.bytes <= small.max_bytes
+    assert small.get(_config("a")) is None
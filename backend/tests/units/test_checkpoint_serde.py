@@ -0,0 +1,86 @@
+import sys
+import os
+import pytest
+
+# Add backend/src to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) + "/src")
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.base import empty_checkpoint
+
+from conftest import checkpoint_config as _config
+from utils.checkpoint_serde import CompressedSerializer, checkpoint_serializer
+
+LONG_TEXT = "Our support team is available Monday to Friday, 9am to 5pm, and answers within one day. " * 40
+
+
+def _checkpoint():
+    checkpoint = empty_checkpoint()
+    checkpoint["channel_values"] = {"messages": [HumanMessage(content="hours?"), AIMessage(content=LONG_TEXT)]}
+    return checkpoint
+
+
+async def _stored_sizes(saver):
+    async with saver.conn.execute("SELECT type, length(checkpoint) FROM checkpoints") as cur:
+        return await cur.fetchall()
+
+
+def test_large_payloads_are_compressed_and_small_ones_are_not():
+    """Verify the size threshold and the codec tag on the payload type"""
+    serde = CompressedSerializer(codec="zlib", min_bytes=1024)
+    type_, data = serde.dumps_typed({"text": LONG_TEXT})
+    assert type_.endswith("+zlib")
+    assert len(data) < len(LONG_TEXT) / 5
+    assert serde.loads_typed((type_, data)) == {"text": LONG_TEXT}
+
+    type_, data = serde.dumps_typed({"text": "short"})
+    assert "+" not in type_
+    assert serde.loads_typed((type_, data)) == {"text": "short"}
+
+
+def test_zstd_round_trip():
+    """Verify zstd compressed payloads load back"""
+    pytest.importorskip("zstandard")
+    serde = CompressedSerializer(codec="zstd", level=3)
+    type_, data = serde.dumps_typed([LONG_TEXT])
+    assert type_.endswith("+zstd")
+    assert serde.loads_typed((type_, data)) == [LONG_TEXT]
+
+
+def test_disabled_compression_still_reads_compressed_rows():
+    """Verify turning compression off keeps existing compressed rows readable"""
+    stored = CompressedSerializer(codec="zlib").dumps_typed(LONG_TEXT)
+    serde = checkpoint_serializer(codec="none")
+    assert serde.codec is None
+    assert serde.loads_typed(stored) == LONG_TEXT
+    assert "+" not in serde.dumps_typed(LONG_TEXT)[0]
+
+
+def test_unknown_codec_is_rejected():
+    """Verify a misconfigured codec fails at startup rather than on first write"""
+    with pytest.raises(ValueError):
+        CompressedSerializer(codec="lz4")
+
+
+def test_msgpack_allowlist_keeps_compression():
+    """Verify the serializer LangGraph derives for an allowlist still compresses"""
+    serde = CompressedSerializer(codec="zlib", allowed_msgpack_modules=None)
+    derived = serde.with_msgpack_allowlist([("langchain_core", "messages", "ai", "AIMessage")])
+    assert isinstance(derived, CompressedSerializer)
+    assert derived.dumps_typed(LONG_TEXT)[0].endswith("+zlib")
+
+
+@pytest.mark.asyncio
+async def test_store_reads_rows_written_before_compression(open_saver):
+    """Verify uncompressed and compressed rows coexist in one database"""
+    plain = await open_saver(readers=0)
+    compressed = await open_saver(readers=1, serde=CompressedSerializer(codec="zlib"))
+    await plain.aput(_config("old"), _checkpoint(), {}, {})
+    await compressed.aput(_config("new"), _checkpoint(), {}, {})
+
+    sizes = dict(await _stored_sizes(compressed))
+    assert set(sizes) == {"msgpack", "msgpack+zlib"}
+    assert sizes["msgpack+zlib"] < sizes["msgpack"] / 5
+    for thread_id in ("old", "new"):
+        loaded = await compressed.aget_tuple(_config(thread_id))
+        assert loaded.checkpoint["channel_values"]["messages"][1].content == LONG_TEXT
@@ -0,0 +1,123 @@
+import sys
+import os
+import pytest
+
+# Add backend/src to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) + "/src")
+
+import aiosqlite
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.graph import END, MessagesState, StateGraph
+
+from conftest import checkpoint_config as _config
+from utils.checkpoint_shards import ShardedSqliteSaver, existing_layouts, reshard, shard_index, shard_paths
+
+THREADS = [f"whatsapp:+1555000{i:04d}" for i in range(30)]
+
+
+async def _threads_in(path):
+    async with aiosqlite.connect(path) as conn:
+        async with conn.execute("SELECT DISTINCT thread_id FROM checkpoints") as cur:
+            return {row[0] for row in await cur.fetchall()}
+
+
+async def _write_threads(saver, threads):
+    for thread_id in threads:
+        saved = await saver.aput(_config(thread_id), empty_checkpoint(), {"step": 0}, {})
+        await saver.aput_writes(saved, [("messages", thread_id)], "task-1")
+
+
+def test_shard_layout():
+    """Verify shard files are named after the shard count and threads hash stably"""
+    assert shard_paths("/data/chat_history.sqlite", 1) == ["/data/chat_history.sqlite"]
+    assert shard_paths("/data/chat_history.sqlite", 2) == ["/data/chat_history.0-of-2.sqlite", "/data/chat_history.1-of-2.sqlite"]
+    assert shard_index("whatsapp:+15550001", 4) == shard_index("whatsapp:+15550001", 4)
+    assert len({shard_index(t, 4) for t in THREADS}) == 4
+
+
+@pytest.mark.asyncio
+async def test_threads_are_routed_to_one_shard(tmp_path):
+    """Verify every thread's checkpoints live in its own shard and reads, lists and deletes follow it"""
+    db_path = str(tmp_path / "chat_history.sqlite")
+    saver = await ShardedSqliteSaver.open(db_path, 3, readers=1)
+    try:
+        await _write_threads(saver, THREADS)
+        for index, path in enumerate(saver.paths):
+            assert await _threads_in(path) == {t for t in THREADS if shard_index(t, 3) == index}
+
+        loaded = await saver.aget_tuple(_config(THREADS[0]))
+        assert loaded.pending_writes == [("task-1", "messages", THREADS[0])]
+        assert len([item async for item in saver.alist(None)]) == len(THREADS)
+        assert len([item async for item in saver.alist(None, limit=5)]) == 5
+
+        await saver.adelete_thread(THREADS[0])
+        assert await saver.aget_tuple(_config(THREADS[0])) is None
+        assert saver.pool_stats()["shards"] == 3
+        assert existing_layouts(db_path) == {3: saver.paths}
+    finally:
+        await saver.aclose()
+
+
+@pytest.mark.asyncio
+async def test_graph_runs_on_sharded_store(tmp_path):
+    """Verify a LangGraph conversation keeps its history on a sharded store"""
+    def reply(state):
+        return {"messages": [AIMessage(content=f"reply {len(state['messages'])}")]}
+
+    workflow = StateGraph(MessagesState)
+    workflow.add_node("agent", reply)
+    workflow.set_entry_point("agent")
+    workflow.add_edge("agent", END)
+    saver = await ShardedSqliteSaver.open(str(tmp_path / "chat_history.sqlite"), 2, readers=1)
+    try:
+        app = workflow.compile(checkpointer=saver)
+        for thread_id in THREADS[:2]:
+            for turn in range(2):
+                result = await app.ainvoke({"messages": [HumanMessage(content=f"q{turn}")]}, _config(thread_id))
+            assert [m.content for m in result["messages"]] == ["q0", "reply 1", "q1", "reply 3"]
+    finally:
+        await saver.aclose()
+
+
+@pytest.mark.asyncio
+async def test_reshard_splits_and_rebalances(tmp_path, open_saver):
+    """Verify splitting one database and rebalancing the shards keeps every thread readable"""
+    db_path = str(tmp_path / "chat_history.sqlite")
+    single = await open_saver(db_path, readers=0)
+    await _write_threads(single, THREADS)
+    await single.aclose()
+
+    copied = await reshard([db_path], shard_paths(db_path, 3))
+    assert copied == {"checkpoints": len(THREADS), "writes": len(THREADS)}
+    # Repeating an interrupted run copies nothing twice
+    assert await reshard([db_path], shard_paths(db_path, 3)) == {"checkpoints": 0, "writes": 0}
+    await reshard(shard_paths(db_path, 3), shard_paths(db_path, 2))
+    assert set(existing_layouts(db_path)) == {1, 2, 3}
+
+    saver = await ShardedSqliteSaver.open(db_path, 2, readers=1)
+    try:
+        for thread_id in THREADS:
+            loaded = await saver.aget_tuple(_config(thread_id))
+            assert loaded.pending_writes == [("task-1", "messages", thread_id)]
+        for index, path in enumerate(saver.paths):
+            assert await _threads_in(path) == {t for t in THREADS if shard_index(t, 2) == index}
+    finally:
+        await saver.aclose()
+
+
+@pytest.mark.asyncio
+async def test_pruner_sweeps_every_shard(tmp_path):
+    """Verify retention visits all shards of a sharded store"""
+    from utils.checkpoint_retention import CheckpointPruner
+
+    saver = await ShardedSqliteSaver.open(str(tmp_path / "chat_history.sqlite"), 2, readers=1)
+    try:
+        for thread_id in THREADS[:6]:
+            config = _config(thread_id)
+            for step in range(3):
+                config = await saver.aput(config, empty_checkpoint(), {"step": step}, {})
+        result = await CheckpointPruner(saver, keep_per_thread=1, pause=0).sweep()
+        assert result["checkpoints_deleted"] == 6 * 2
+    finally:
+        await saver.aclose()
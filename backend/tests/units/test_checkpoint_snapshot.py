@@ -0,0 +1,87 @@
+import sys
+import os
+import sqlite3
+import pytest
+
+# Add backend/src to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) + "/src")
+
+from langgraph.checkpoint.base import empty_checkpoint
+
+from conftest import checkpoint_config as _config
+from utils.checkpoint_shards import ShardedSqliteSaver
+from utils.checkpoint_snapshot import CheckpointSnapshotter
+
+
+def _dirs(tmp_path):
+    share, local = tmp_path / "share", tmp_path / "local"
+    share.mkdir()
+    local.mkdir()
+    return str(share), str(local)
+
+
+@pytest.mark.asyncio
+async def test_snapshot_and_restore_round_trip(tmp_path, open_saver):
+    """Verify a snapshot of the live database is restored on a fresh local disk"""
+    share, local = _dirs(tmp_path)
+    snapshotter = CheckpointSnapshotter(share, local)
+    assert snapshotter.restore() == []
+    db_path = os.path.join(local, "chat_history.sqlite")
+    saver = await open_saver(db_path, readers=0)
+    saved = await saver.aput(_config("t1"), empty_checkpoint(), {"step": 0}, {})
+    await saver.aput_writes(saved, [("messages", "hello")], "task-1")
+    snapshotter.watch([db_path])
+    # Taken while the saver is open: the committed rows are still in its WAL
+    assert snapshotter.snapshot() == 1
+    await saver.aclose()
+
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    restored = CheckpointSnapshotter(share, local)
+    assert restored.restore() == [db_path]
+    saver = await open_saver(db_path, readers=0)
+    loaded = await saver.aget_tuple(_config("t1"))
+    assert loaded.pending_writes == [("task-1", "messages", "hello")]
+
+
+@pytest.mark.asyncio
+async def test_snapshot_skips_unchanged_databases(tmp_path):
+    """Verify only shards written since the last snapshot are copied again"""
+    share, local = _dirs(tmp_path)
+    saver = await ShardedSqliteSaver.open(os.path.join(local, "chat_history.sqlite"), 2, readers=1)
+    try:
+        snapshotter = CheckpointSnapshotter(share, local)
+        snapshotter.watch(saver.paths)
+        assert snapshotter.snapshot() == 2
+        assert snapshotter.snapshot() == 0
+        await saver.aput(_config("t1"), empty_checkpoint(), {"step": 0}, {})
+        assert snapshotter.snapshot() == 1
+        assert snapshotter.snapshot(force=True) == 2
+        assert sorted(os.listdir(share)) == sorted(os.path.basename(p) for p in saver.paths)
+    finally:
+        await saver.aclose()
+
+
+def test_restore_prefers_newer_local_copy_and_applies_share_wal(tmp_path):
+    """Verify restore keeps a newer local database and reads a database left in WAL mode on the share"""
+    share, local = _dirs(tmp_path)
+    share_db = os.path.join(share, "chat_history.sqlite")
+    writer = sqlite3.connect(share_db)
+    writer.execute("PRAGMA journal_mode=WAL")
+    writer.execute("PRAGMA wal_autocheckpoint=0")
+    writer.execute("CREATE TABLE t (v)")
+    writer.execute("INSERT INTO t VALUES (1)")
+    writer.commit()
+    assert os.path.getsize(share_db + "-wal") > 0
+
+    snapshotter = CheckpointSnapshotter(share, local)
+    local_db = os.path.join(local, "chat_history.sqlite")
+    assert snapshotter.restore() == [local_db]
+    writer.close()
+    with sqlite3.connect(local_db) as conn:
+        assert conn.execute("SELECT v FROM t").fetchall() == [(1,)]
+
+    # The local copy is now at least as new as the share's
+    os.utime(share_db, (0, 0))
+    assert snapshotter.restore() == []
@@ -0,0 +1,154 @@
+import sys
+import os
+import asyncio
+import pytest
+
+# Add backend/src to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) + "/src")
+
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+from conftest import checkpoint_config as _config
+from utils.checkpointer import pragma_script, CHECKPOINT_LOCK_WAIT_SECONDS
+
+
+async def _pragma(conn, name):
+    async with conn.execute(f"PRAGMA {name}") as cur:
+        return (await cur.fetchone())[0]
+
+
+def test_pragma_script_rejects_unknown_synchronous_mode():
+    """Verify only valid synchronous modes reach the PRAGMA statement"""
+    assert "PRAGMA synchronous=NORMAL" in pragma_script(synchronous="1; DROP TABLE checkpoints")
+    assert "PRAGMA synchronous=FULL" in pragma_script(synchronous="full")
+    assert "query_only=1" in pragma_script(read_only=True)
+
+
+@pytest.mark.asyncio
+async def test_open_configures_wal_writer_and_readers(open_saver):
+    """Verify the writer runs in WAL mode with tuned pragmas and readers are read-only"""
+    saver = await open_saver(readers=2, busy_timeout_ms=1234)
+    assert (await _pragma(saver.conn, "journal_mode")).lower() == "wal"
+    assert await _pragma(saver.conn, "synchronous") == 1  # NORMAL
+    assert await _pragma(saver.conn, "busy_timeout") == 1234
+    assert len(saver.readers) == 2
+    assert await _pragma(saver.readers[0], "query_only") == 1
+    assert saver.pool_stats() == {"readers": 2, "idle_readers": 2, "writer_locked": False}
+
+
+@pytest.mark.asyncio
+async def test_reads_do_not_wait_for_the_writer(open_saver):
+    """Verify checkpoint reads use the reader pool while a write holds the writer lock"""
+    saver = await open_saver(readers=1)
+    saved = await saver.aput(_config("t1"), empty_checkpoint(), {}, {})
+    before = CHECKPOINT_LOCK_WAIT_SECONDS.count(lock="reader")
+    async with saver.lock:
+        loaded = await asyncio.wait_for(saver.aget_tuple(_config("t1")), 2)
+        listed = [item async for item in saver.alist(_config("t1"))]
+    assert loaded.config["configurable"]["checkpoint_id"] == saved["configurable"]["checkpoint_id"]
+    assert len(listed) == 1
+    assert CHECKPOINT_LOCK_WAIT_SECONDS.count(lock="reader") == before + 2
+    assert saver.pool_stats()["idle_readers"] == 1
+
+
+@pytest.mark.asyncio
+async def test_delete_thread_goes_through_writer_lock(open_saver):
+    """Verify deletes wait for the writer and readers see the result"""
+    saver = await open_saver(readers=1)
+    await saver.aput(_config("t1"), empty_checkpoint(), {}, {})
+    before = CHECKPOINT_LOCK_WAIT_SECONDS.count(lock="writer")
+    await saver.adelete_thread("t1")
+    assert CHECKPOINT_LOCK_WAIT_SECONDS.count(lock="writer") == before + 1
+    assert await saver.aget_tuple(_config("t1")) is None
+
+
+@pytest.mark.asyncio
+async def test_without_readers_reads_use_the_writer(open_saver):
+    """Verify a pool of size zero falls back to the writer connection"""
+    saver = await open_saver(readers=0)
+    await saver.aput(_config("t1"), empty_checkpoint(), {}, {})
+    assert await saver.aget_tuple(_config("t1")) is not None
+
+
+async def _fill(saver, thread_id, count):
+    config = _config(thread_id)
+    for step in range(count):
+        checkpoint = empty_checkpoint()
+        checkpoint["channel_values"] = {"messages": ["x" * 2000]}
+        config = await saver.aput(config, checkpoint, {"step": step}, {})
+        await saver.aput_writes(config, [("messages", "y" * 500)], f"task-{step}")
+    return config
+
+
+async def _count(saver, table, thread_id):
+    async with saver.conn.execute(f"SELECT COUNT(*) FROM {table} WHERE thread_id = ?", (thread_id,)) as cur:
+        return (await cur.fetchone())[0]
+
+
+@pytest.mark.asyncio
+async def test_pruner_keeps_latest_checkpoints_per_thread(open_saver):
+    """Verify retention keeps the newest checkpoints of each thread and drops orphaned writes"""
+    from utils.checkpoint_retention import CheckpointPruner
+
+    saver = await open_saver(readers=1)
+    latest = {t: await _fill(saver, t, count) for t, count in (("a", 8), ("b", 2), ("c", 5))}
+    pruner = CheckpointPruner(saver, keep_per_thread=3, batch_threads=2, pause=0)
+
+    result = await pruner.sweep()
+
+    assert result["checkpoints_deleted"] == 5 + 0 + 2
+    assert result["writes_deleted"] == 7
+    assert [await _count(saver, "checkpoints", t) for t in "abc"] == [3, 2, 3]
+    assert [await _count(saver, "writes", t) for t in "abc"] == [3, 2, 3]
+    for thread_id, config in latest.items():
+        loaded = await saver.aget_tuple(_config(thread_id))
+        assert loaded.config["configurable"]["checkpoint_id"] == config["configurable"]["checkpoint_id"]
+        assert loaded.pending_writes
+    assert pruner.stats["sweeps"] == 1
+
+
+@pytest.mark.asyncio
+async def test_pruner_reclaims_space(tmp_path, open_saver):
+    """Verify freed pages are vacuumed away incrementally, and never with a full VACUUM in the background"""
+    import aiosqlite
+    from utils.checkpoint_retention import CheckpointPruner, enable_incremental_vacuum
+
+    path = str(tmp_path / "cp.sqlite")
+    # Created the old way: no auto_vacuum
+    async with aiosqlite.connect(path) as conn:
+        await AsyncSqliteSaver(conn).setup()
+    saver = await open_saver(readers=0)
+    for t in range(5):
+        await _fill(saver, f"t{t}", 20)
+    pruner = CheckpointPruner(saver, keep_per_thread=1, pause=0)
+    result = await pruner.sweep()
+    assert result["bytes_reclaimed"] == 0
+    assert await _pragma(saver.conn, "auto_vacuum") == 0
+    await saver.aclose()
+
+    # Offline conversion, then later sweeps return freed pages
+    assert await enable_incremental_vacuum(path) is True
+    assert await enable_incremental_vacuum(path) is False
+    saver = await open_saver(readers=0)
+    for t in range(5):
+        await _fill(saver, f"u{t}", 20)
+    pruner = CheckpointPruner(saver, keep_per_thread=1, pause=0)
+    result = await pruner.sweep()
+    assert result["bytes_reclaimed"] > 0
+    assert await _pragma(saver.conn, "auto_vacuum") == 2  # INCREMENTAL
+    assert await _pragma(saver.conn, "freelist_count") == 0
+    assert pruner.stats["bytes_reclaimed"] == result["bytes_reclaimed"]
+
+
+@pytest.mark.asyncio
+async def test_pruner_start_and_stop():
+    """Verify the background loop can be stopped"""
+    from unittest.mock import MagicMock
+    from utils.checkpoint_retention import CheckpointPruner
+
+    pruner = CheckpointPruner(MagicMock(), keep_per_thread=3, interval=3600)
+    pruner.start()
+    assert pruner._task is not None
+    await pruner.stop()
+    assert pruner._task is None
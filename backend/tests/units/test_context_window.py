@@ -0,0 +1,95 @@
+from langchain_core.messages import HumanMessage, AIMessage, ToolMessage, SystemMessage
+
+# Add src to path
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) + "/src")
+
+from utils.context_window import ContextWindow, MESSAGE_OVERHEAD_TOKENS
+
+def make_history(turns: int):
+    history = []
+    for i in range(turns):
+        history.append(HumanMessage(content=f"question {i} " + "x" * 40))
+        history.append(AIMessage(content=f"answer {i} " + "y" * 40))
+    return history
+
+def test_no_limits_keeps_everything():
+    """Verify that a window without limits passes all messages through"""
+    window = ContextWindow()
+    system = SystemMessage(content="system")
+    history = make_history(5)
+
+    messages, dropped = window.apply(system, history)
+
+    assert messages == [system] + history
+    assert dropped == 0
+
+def test_max_turns_keeps_latest_turns():
+    """Verify that only the newest turns are kept when max_turns is set"""
+    window = ContextWindow(max_turns=2)
+    system = SystemMessage(content="system")
+    history = make_history(5)
+
+    messages, dropped = window.apply(system, history)
+
+    assert messages[0] is system
+    assert messages[1:] == history[-4:]
+    assert dropped == sum(window.count_tokens(m) for m in history[:6])
+    assert window.stats["dropped_messages"] == 6
+    assert window.stats["last_dropped_tokens"] == dropped
+
+def test_max_tokens_budget():
+    """Verify that turns are dropped once the token budget is exceeded"""
+    system = SystemMessage(content="system")
+    history = make_history(10)
+    window = ContextWindow()
+    turn_tokens = window.count_tokens(history[0]) + window.count_tokens(history[1])
+    window.max_tokens = window.count_tokens(system) + 3 * turn_tokens
+
+    messages, dropped = window.apply(system, history)
+
+    assert messages[1:] == history[-6:]
+    assert dropped == 7 * turn_tokens
+
+def test_latest_turn_always_kept():
+    """Verify the current turn is kept even if it alone exceeds the budget"""
+    window = ContextWindow(max_tokens=1)
+    system = SystemMessage(content="system")
+    history = make_history(3)
+
+    messages, _ = window.apply(system, history)
+
+    assert messages == [system] + history[-2:]
+
+def test_tool_calls_stay_with_results():
+    """Verify that a tool call and its result are never split"""
+    window = ContextWindow(max_turns=1)
+    system = SystemMessage(content="system")
+    tool_turn = [
+        HumanMessage(content="send an sms"),
+        AIMessage(content="", tool_calls=[{"name": "send_twilio_sms", "args": {}, "id": "call_1"}]),
+        ToolMessage(content="sent", tool_call_id="call_1"),
+        AIMessage(content="Done"),
+    ]
+
+    messages, _ = window.apply(system, make_history(2) + tool_turn)
+
+    assert messages[1:] == tool_turn
+
+def test_token_count_cached_by_id():
+    """Verify token counts are cached per message id"""
+    window = ContextWindow()
+    message = AIMessage(content="a" * 40, id="msg-1")
+
+    assert window.count_tokens(message) == 10 + MESSAGE_OVERHEAD_TOKENS
+    message.content = "changed"
+    assert window.count_tokens(message) == 10 + MESSAGE_OVERHEAD_TOKENS
+
+def test_token_cache_bounded():
+    """Verify the token cache evicts the oldest entries"""
+    window = ContextWindow(cache_size=2)
+    for i in range(3):
+        window.count_tokens(AIMessage(content="hi", id=f"msg-{i}"))
+
+    assert list(window._token_cache) == ["msg-1", "msg-2"]
@@ -0,0 +1,28 @@
+import sys
+import os
+import json
+import pytest
+
+# Add backend/src to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) + "/src")
+
+from utils import fast_json
+
+EVENT = {"type": "tool_end", "name": "send_twilio_sms", "output": "Envoyé ✓", "nested": [1, 2.5, None, True]}
+
+
+@pytest.mark.parametrize("fast", [False, True])
+def test_round_trip_matches_json_module(fast):
+    """Verify both paths produce JSON the standard library reads back identically"""
+    text = fast_json.dumps(EVENT, fast=fast)
+    assert isinstance(text, str)
+    assert json.loads(text) == EVENT
+    assert fast_json.loads(text.encode(), fast=fast) == EVENT
+    assert fast_json.loads(json.dumps(EVENT), fast=fast) == EVENT
+
+
+@pytest.mark.parametrize("fast", [False, True])
+def test_bad_input_raises_value_error(fast):
+    """Verify malformed documents raise ValueError on both paths, as the webhook expects"""
+    with pytest.raises(ValueError):
+        fast_json.loads(b"bad data", fast=fast)
@@ -0,0 +1,94 @@
+import sys
+import os
+import json
+import time
+import pytest
+import httpx
+import requests
+from unittest.mock import patch
+
+# Add backend/src to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) + "/src")
+
+from utils import http_cassette
+from utils.http_cassette import Cassette, CassetteTransport, AsyncCassetteTransport
+
+
+def _upstream(request):
+    return httpx.Response(200, json={"echo": json.loads(request.content)["n"]})
+
+
+def test_parse_timing():
+    """Verify timing specs map to latency factors"""
+    assert http_cassette.parse_timing("original") == 1.0
+    assert http_cassette.parse_timing("none") == 0.0
+    assert http_cassette.parse_timing("0.5") == 0.5
+
+
+def test_httpx_record_then_replay(tmp_path):
+    """Verify recorded httpx responses are replayed without the upstream"""
+    path = str(tmp_path / "app.jsonl")
+    recorder = httpx.Client(transport=CassetteTransport(Cassette(path, "record"), httpx.MockTransport(_upstream)))
+    for n in (1, 2):
+        recorder.post("http://azure.example/openai/deployments/gpt/chat/completions", json={"n": n})
+
+    cassette = Cassette(path, "replay", timing=0)
+    player = httpx.Client(transport=CassetteTransport(cassette, httpx.MockTransport(lambda r: pytest.fail("network used"))))
+    url = "http://127.0.0.1:9/openai/deployments/gpt/chat/completions"
+    # Identical bodies are matched first, the rest in recording order
+    assert player.post(url, json={"n": 2}).json() == {"echo": 2}
+    assert player.post(url, json={"n": 99}).json() == {"echo": 1}
+    with pytest.raises(httpx.ConnectError):
+        player.post(url, json={"n": 3})
+    assert cassette.stats == {"recorded": 0, "replayed": 2, "misses": 1}
+
+
+@pytest.mark.asyncio
+async def test_async_replay_keeps_chunk_timing(tmp_path):
+    """Verify streamed chunks are replayed with their recorded offsets, scaled"""
+    path = tmp_path / "app.jsonl"
+    interaction = {"client": "httpx", "method": "POST", "url": "http://x/stream", "body_sha256": "", "status": 200,
+                   "headers": [["content-type", "text/event-stream"]], "ttfb": 0.1,
+                   "chunks": [[0.1, "YQ=="], [0.3, "Yg=="]]}
+    path.write_text(json.dumps(interaction) + "\n")
+    transport = AsyncCassetteTransport(Cassette(str(path), "replay", timing=0.5), httpx.AsyncHTTPTransport())
+    async with httpx.AsyncClient(transport=transport) as client:
+        start = time.perf_counter()
+        async with client.stream("POST", "http://y/stream") as response:
+            chunks = [chunk async for chunk in response.aiter_bytes()]
+        elapsed = time.perf_counter() - start
+    assert chunks == [b"a", b"b"]
+    assert 0.14 < elapsed < 1
+
+
+def test_requests_record_then_replay(tmp_path):
+    """Verify calls made with requests (Graph API, Twilio SDK) are recorded and replayed"""
+    def fake_send(session, request, **kwargs):
+        response = requests.Response()
+        response.status_code = 200
+        response.headers["Content-Type"] = "application/json"
+        response.headers["Content-Encoding"] = "gzip"
+        response._content = b'{"url": "http://media"}'
+        return response
+
+    try:
+        with patch("utils.http_cassette._original_session_send", fake_send):
+            http_cassette.install("app", mode="record", directory=str(tmp_path))
+            requests.get("https://graph.facebook.com/v18.0/media-1")
+        http_cassette.install("app", mode="replay", directory=str(tmp_path), timing="none")
+        response = requests.get("http://127.0.0.1:9/v18.0/media-1")
+        assert response.json() == {"url": "http://media"}
+        assert "Content-Encoding" not in response.headers
+        with pytest.raises(requests.ConnectionError):
+            requests.get("http://127.0.0.1:9/v18.0/media-1")
+    finally:
+        http_cassette.uninstall()
+    assert requests.Session.send is http_cassette._original_session_send
+
+
+def test_install_off_is_noop():
+    """Verify the default mode leaves outbound HTTP untouched"""
+    assert http_cassette.install("app", mode="off") is None
+    assert http_cassette.active() is None
+    with pytest.raises(ValueError):
+        http_cassette.install("app", mode="bogus")
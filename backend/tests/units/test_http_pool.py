@@ -0,0 +1,108 @@
+import sys
+import os
+import pytest
+import httpx
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+# Add backend/src to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) + "/src")
+
+from utils import http_pool
+
+
+@pytest.fixture(autouse=True)
+def fresh_pool():
+    http_pool._async_client = None
+    http_pool._sync_client = None
+    yield
+    if http_pool._sync_client is not None:
+        http_pool._sync_client.close()
+    http_pool._async_client = None
+    http_pool._sync_client = None
+
+
+def test_clients_are_shared():
+    """Verify the same client is returned on every call"""
+    assert http_pool.get_async_client() is http_pool.get_async_client()
+    assert http_pool.get_sync_client() is http_pool.get_sync_client()
+
+
+def test_client_limits_and_timeouts():
+    """Verify pool limits and explicit connect/read timeouts come from config"""
+    with patch("utils.http_pool.HTTP_POOL_MAX_CONNECTIONS", 7), \
+         patch("utils.http_pool.HTTP_CONNECT_TIMEOUT", 2.0), \
+         patch("utils.http_pool.HTTP_READ_TIMEOUT", 30.0):
+        client = http_pool.get_sync_client()
+        assert client.timeout.connect == 2.0
+        assert client.timeout.read == 30.0
+        assert client._transport.inner._pool._max_connections == 7
+
+
+def test_http2_requires_h2():
+    """Verify HTTP/2 is only enabled when the h2 package is installed"""
+    with patch("utils.http_pool.importlib.util.find_spec", return_value=None):
+        assert http_pool._http2() is False
+    with patch("utils.http_pool.importlib.util.find_spec", return_value=object()), \
+         patch("utils.http_pool.HTTP2_ENABLED", False):
+        assert http_pool._http2() is False
+
+
+def test_pooled_post_counts_requests():
+    """Verify requests made through the pool are counted and connections reused"""
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, json={"ok": True}))
+    before = http_pool.HTTP_POOL_REQUESTS.value()
+    with patch("utils.http_pool.httpx.HTTPTransport", return_value=transport):
+        response = http_pool.pooled_post("https://example.test/x", json={"a": 1})
+        http_pool.pooled_post("https://example.test/y")
+    assert response.json() == {"ok": True}
+    assert http_pool.HTTP_POOL_REQUESTS.value() == before + 2
+    assert http_pool.HTTP_POOL_IN_FLIGHT.value() == 0
+
+
+def test_failed_requests_are_counted():
+    """Verify connection errors and 5xx responses count as errors and leave nothing in flight"""
+    def handler(request):
+        if request.url.path == "/down":
+            raise httpx.ConnectError("connection refused", request=request)
+        return httpx.Response(503)
+
+    requests, errors = http_pool.HTTP_POOL_REQUESTS.value(), http_pool.HTTP_POOL_ERRORS.value()
+    with patch("utils.http_pool.httpx.HTTPTransport", return_value=httpx.MockTransport(handler)):
+        with pytest.raises(httpx.ConnectError):
+            http_pool.pooled_post("https://example.test/down")
+        assert http_pool.pooled_post("https://example.test/busy").status_code == 503
+    assert http_pool.HTTP_POOL_REQUESTS.value() == requests + 2
+    assert http_pool.HTTP_POOL_ERRORS.value() == errors + 2
+    assert http_pool.HTTP_POOL_IN_FLIGHT.value() == 0
+
+
+def test_requests_from_many_threads_are_all_counted():
+    """Verify no request is lost from the counters when worker threads share the pool"""
+    transport = httpx.MockTransport(lambda request: httpx.Response(200))
+    before = http_pool.HTTP_POOL_REQUESTS.value()
+    with patch("utils.http_pool.httpx.HTTPTransport", return_value=transport):
+        http_pool.get_sync_client()
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(lambda i: http_pool.pooled_post(f"https://example.test/{i}"), range(400)))
+    assert http_pool.HTTP_POOL_REQUESTS.value() == before + 400
+    assert http_pool.HTTP_POOL_IN_FLIGHT.value() == 0
+
+
+@pytest.mark.asyncio
+async def test_aclose_resets_clients():
+    """Verify closing the pool creates fresh clients afterwards"""
+    client = http_pool.get_async_client()
+    await http_pool.aclose()
+    assert client.is_closed
+    assert http_pool.get_async_client() is not client
+
+
+def test_pool_stats_shape():
+    """Verify pool statistics include connection counts for both clients"""
+    http_pool.get_sync_client()
+    stats = http_pool.pool_stats()
+    assert stats["sync_connections"] == {"open": 0, "idle": 0}
+    assert stats["async_connections"] == {"open": 0, "idle": 0}
+    assert "http2" in stats
+    assert 'http_pool_connections{client="sync",state="open"} 0' in http_pool.HTTP_POOL_CONNECTIONS.render()
@@ -16,10 +16,13 @@ def test_save_base64_image_success():
     base64_data = "data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mP8/5+hHgAHggJ/PchI7wAAAABJRU5ErkJggg=="
     base_url = "http://localhost:8000"
     
+    from utils.metrics import IMAGE_TRANSCODE_SECONDS
+    transcodes = IMAGE_TRANSCODE_SECONDS.count()
     url = save_base64_image(base64_data, base_url)
     
     assert "/static/generated_images/" in url
     assert url.endswith(".jpg")
+    assert IMAGE_TRANSCODE_SECONDS.count() == transcodes + 1
     
     # Check if file exists
     filename = url.split("/")[-1]
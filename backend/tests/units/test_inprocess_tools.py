@@ -0,0 +1,71 @@
+import pytest
+import asyncio
+import threading
+
+# Add src to path
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) + "/src")
+
+from utils.inprocess_tools import InProcessTools, tool_functions
+
+
+def send_note(to_number: str, message_body: str) -> str:
+    """Sends a note."""
+    return f"{to_number}: {message_body} ({threading.current_thread().name})"
+
+
+def broken_tool(prompt: str) -> str:
+    """Always fails."""
+    raise RuntimeError("boom")
+
+
+def test_inprocess_tools_match_mcp_server_tools():
+    """Verify in-process mode offers the same tools as the MCP server"""
+    assert [fn.__name__ for fn in tool_functions()] == ["send_twilio_sms", "send_whatsapp_message", "generate_image"]
+
+
+@pytest.mark.asyncio
+async def test_inprocess_tool_runs_on_worker_thread():
+    """Verify a tool call runs the function on a worker thread and returns its text"""
+    tools = InProcessTools(threads=2, functions=[send_note, broken_tool])
+    try:
+        note, broken = await tools.get_tools()
+        assert note.name == "send_note"
+        assert note.description == "Sends a note."
+        assert set(note.args) == {"to_number", "message_body"}
+
+        result = await note.ainvoke({"to_number": "+1555", "message_body": "hi"})
+        assert result.startswith("+1555: hi (tool")
+        assert await broken.ainvoke({"prompt": "x"}) == "Error: boom"
+        assert tools.stats() == {"mode": "inprocess", "threads": 2}
+        assert (tools.calls, tools.in_flight) == (2, 0)
+    finally:
+        await tools.close()
+
+
+@pytest.mark.asyncio
+async def test_inprocess_tools_bounded_by_threads():
+    """Verify no more than `threads` blocking calls run at once"""
+    running = peak = 0
+    lock = threading.Lock()
+
+    def slow_tool(prompt: str) -> str:
+        """Blocks for a while."""
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        threading.Event().wait(0.05)
+        with lock:
+            running -= 1
+        return prompt
+
+    tools = InProcessTools(threads=2, functions=[slow_tool])
+    try:
+        (tool,) = await tools.get_tools()
+        results = await asyncio.gather(*(tool.ainvoke({"prompt": str(i)}) for i in range(5)))
+        assert results == [str(i) for i in range(5)]
+        assert peak == 2
+    finally:
+        await tools.close()
@@ -0,0 +1,81 @@
+import os
+
+# Add src to path
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) + "/src")
+
+from utils.kb_index import KnowledgeBaseIndex, Section, split_sections, list_kb_files, format_section
+
+KB = """# Nviv Knowledge Base
+
+## Company Information
+- Name: Nviv
+
+## Products/Services
+
+## Frequently Asked Questions
+
+### Q: What are your pricing plans?
+A: Nviv is free to use while in beta.
+
+### Q: How do I get started?
+A: Ask me anything, including generating images.
+
+## Contact Information
+- Email: support@nviv.com
+"""
+
+def test_split_sections_by_heading():
+    """Verify each heading with content becomes a section titled with its parents"""
+    sections = split_sections(KB, source="kb.md")
+
+    assert [s.title for s in sections] == [
+        "Nviv Knowledge Base > Company Information",
+        "Nviv Knowledge Base > Frequently Asked Questions > Q: What are your pricing plans?",
+        "Nviv Knowledge Base > Frequently Asked Questions > Q: How do I get started?",
+        "Nviv Knowledge Base > Contact Information",
+    ]
+    assert sections[3] == Section("kb.md", "Nviv Knowledge Base > Contact Information", "- Email: support@nviv.com")
+
+def test_search_ranks_relevant_sections(tmp_path):
+    """Verify BM25 search returns the matching sections first and skips unrelated ones"""
+    path = tmp_path / "kb.md"
+    path.write_text(KB)
+    index = KnowledgeBaseIndex([str(path)])
+
+    results = index.search("what does it cost, any pricing plans?", k=2)
+    assert results[0].title.endswith("Q: What are your pricing plans?")
+
+    results = index.search("email address for support", k=3)
+    assert [s.title for s in results] == ["Nviv Knowledge Base > Contact Information"]
+
+    assert index.search("hello there") == []
+
+def test_directory_of_kb_files(tmp_path):
+    """Verify a directory of markdown files is indexed and non-markdown files are ignored"""
+    (tmp_path / "faq.md").write_text(KB)
+    (tmp_path / "policies").mkdir()
+    (tmp_path / "policies" / "refunds.md").write_text("# Refunds\nRefunds are issued within 14 days.\n")
+    (tmp_path / "notes.txt").write_text("# Ignored\nrefunds refunds refunds\n")
+
+    assert list_kb_files([str(tmp_path)]) == [str(tmp_path / "faq.md"), str(tmp_path / "policies" / "refunds.md")]
+
+    index = KnowledgeBaseIndex([str(tmp_path)])
+    results = index.search("how do refunds work", k=1)
+    assert results[0].source == "refunds.md"
+    assert format_section(results[0]) == "## Refunds\nRefunds are issued within 14 days."
+
+def test_index_rebuilt_when_files_change(tmp_path):
+    """Verify new or modified files are picked up"""
+    index = KnowledgeBaseIndex([str(tmp_path)], check_interval=0)
+    assert index.search("shipping") == []
+
+    (tmp_path / "shipping.md").write_text("# Shipping\nWe ship worldwide.\n")
+
+    assert index.search("shipping")[0].text == "We ship worldwide."
+
+def test_missing_path(tmp_path):
+    """Verify a missing knowledge base yields an empty index"""
+    index = KnowledgeBaseIndex([str(tmp_path / "missing")])
+    assert index.sections == []
+    assert index.search("anything") == []
@@ -11,6 +11,13 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(
 
 from utils.mcp_client import MCPClient
 
+
+def _connect(client, session, index=0):
+    """Marks a server process of the client as started on `session`"""
+    client.processes[index].session = session
+    client.processes[index].healthy = True
+    return client
+
 @pytest.mark.asyncio
 async def test_mcp_client_initialization():
     """Test that MCPClient initializes correctly and connects to the server."""
@@ -61,9 +68,8 @@ async def test_get_tools():
         mock_result = CallToolResult(content=[TextContent(type="text", text="Tool output")])
         session_instance.call_tool.return_value = mock_result
 
-        client = MCPClient("python", ["server.py"])
         # Inject session to bypass init
-        client.session = session_instance
+        client = _connect(MCPClient("python", ["server.py"]), session_instance)
     
         tools = await client.get_tools()
         
@@ -84,61 +90,56 @@ async def test_get_tools():
 async def test_mcp_client_close_error_handling():
     """Test that close() handles RuntimeError gracefully."""
     client = MCPClient("python", ["server.py"])
-    client.exit_stack = AsyncMock()
+    process = client.processes[0]
     
     # Simulate the specific RuntimeError we want to catch
     error_msg = "Attempted to exit cancel scope in a different task than it was entered in"
-    client.exit_stack.aclose.side_effect = RuntimeError(error_msg)
+    process.stop = AsyncMock(side_effect=RuntimeError(error_msg))
     
     with patch("utils.mcp_client.logging") as mock_logging:
         # Should not raise exception
         await client.close()
         
-        client.exit_stack.aclose.assert_awaited_once()
+        process.stop.assert_awaited_once()
         mock_logging.debug.assert_called_with(f"Ignored RuntimeError during MCP client close: {error_msg}")
 
 @pytest.mark.asyncio
 async def test_mcp_client_close_generic_error():
     """Test that close() handles generic Exception gracefully."""
     client = MCPClient("python", ["server.py"])
-    client.exit_stack = AsyncMock()
+    process = client.processes[0]
     
     # Simulate a generic exception
     error_msg = "Generic error"
-    client.exit_stack.aclose.side_effect = Exception(error_msg)
+    process.stop = AsyncMock(side_effect=Exception(error_msg))
     
     with patch("utils.mcp_client.logging") as mock_logging:
         # Should not raise exception
         await client.close()
         
-        client.exit_stack.aclose.assert_awaited_once()
+        process.stop.assert_awaited_once()
         mock_logging.debug.assert_called_with(f"Ignored generic Exception during MCP client close: {error_msg}")
 
 @pytest.mark.asyncio
 async def test_get_tools_auto_initialization():
     """Test that get_tools initializes the session if not already done."""
-    with patch("utils.mcp_client.stdio_client"), \
+    with patch("utils.mcp_client.stdio_client") as mock_stdio_client, \
          patch("utils.mcp_client.ClientSession") as mock_client_session:
         
+        mock_stdio_client.return_value.__aenter__.return_value = (AsyncMock(), AsyncMock())
         session_instance = AsyncMock(spec=ClientSession)
-        mock_client_session.return_value = session_instance
+        mock_client_session.return_value.__aenter__.return_value = session_instance
         session_instance.list_tools.return_value.tools = []
         
-        client = MCPClient("python", ["server.py"])
+        client = MCPClient("python", ["server.py"], health_interval=0)
         # We do NOT inject session here, so it is None
         
-        # Mock the context managers for initialization
-        client.exit_stack.enter_async_context = AsyncMock()
-        client.exit_stack.enter_async_context.side_effect = [
-            (AsyncMock(), AsyncMock()), # read, write
-            session_instance # session
-        ]
-        
         await client.get_tools()
         
         # Verify initialize was called (via checking side effects or session state)
         assert client.session is not None
         session_instance.initialize.assert_awaited_once()
+        await client.close()
 
 @pytest.mark.asyncio
 async def test_tool_execution_error():
@@ -157,11 +158,142 @@ async def test_tool_execution_error():
         mock_result = CallToolResult(content=[TextContent(type="text", text="Failure reason")], isError=True)
         session_instance.call_tool.return_value = mock_result
         
-        client = MCPClient("python", ["server.py"])
-        client.session = session_instance
+        client = _connect(MCPClient("python", ["server.py"]), session_instance)
         
         tools = await client.get_tools()
         result = await tools[0].ainvoke({})
         
         assert "Error:" in result
         assert "Failure reason" in result
+
+@pytest.mark.asyncio
+async def test_tool_call_timeout():
+    """Test that tool calls pass the read timeout and turn a timeout into an error result."""
+    from datetime import timedelta
+    from mcp.shared.exceptions import McpError
+    from mcp.types import ErrorData
+
+    session_instance = AsyncMock(spec=ClientSession)
+    session_instance.list_tools.return_value.tools = [
+        Tool(name="slow_tool", description="Slow", inputSchema={"type": "object", "properties": {}})
+    ]
+    session_instance.call_tool.side_effect = McpError(ErrorData(code=408, message="Timed out while waiting for response"))
+
+    client = _connect(MCPClient("python", ["server.py"], tool_timeout=2), session_instance)
+
+    tools = await client.get_tools()
+    result = await tools[0].ainvoke({})
+
+    session_instance.call_tool.assert_awaited_once_with("slow_tool", arguments={}, read_timeout_seconds=timedelta(seconds=2))
+    assert result.startswith("Error:")
+    assert "Timed out" in result
+
+def _blocking_session(release: asyncio.Event, name="tool"):
+    session = AsyncMock(spec=ClientSession)
+    session.list_tools.return_value.tools = [Tool(name=name, description="", inputSchema={"type": "object", "properties": {}})]
+
+    async def call_tool(tool_name, arguments):
+        await release.wait()
+        return CallToolResult(content=[TextContent(type="text", text="done")])
+
+    session.call_tool.side_effect = call_tool
+    return session
+
+@pytest.mark.asyncio
+async def test_pool_dispatches_to_least_busy_process_and_queues_when_full():
+    """Test that calls spread over the processes and wait, measured, when all are at capacity."""
+    from utils.metrics import TOOL_QUEUE_SECONDS
+    release = asyncio.Event()
+    client = MCPClient("python", ["server.py"], processes=2, max_in_flight=1)
+    sessions = [_blocking_session(release), _blocking_session(release)]
+    for index, session in enumerate(sessions):
+        _connect(client, session, index)
+    queued_before = TOOL_QUEUE_SECONDS.count(tool="pooled")
+
+    calls = [asyncio.create_task(client.call_tool("pooled", {})) for _ in range(3)]
+    await asyncio.sleep(0.05)
+    assert [p.in_flight for p in client.processes] == [1, 1]
+    assert sessions[0].call_tool.await_count == sessions[1].call_tool.await_count == 1
+    release.set()
+    assert await asyncio.gather(*calls) == ["done"] * 3
+    assert sum(p.calls for p in client.processes) == 3
+    assert [p.in_flight for p in client.processes] == [0, 0]
+    assert TOOL_QUEUE_SECONDS.count(tool="pooled") == queued_before + 3
+
+@pytest.mark.asyncio
+async def test_pool_restarts_process_whose_connection_broke():
+    """Test that a broken stdio connection fails the call and restarts only that process."""
+    import anyio
+    client = MCPClient("python", ["server.py"], processes=2)
+    broken, healthy = AsyncMock(spec=ClientSession), AsyncMock(spec=ClientSession)
+    broken.call_tool.side_effect = anyio.BrokenResourceError()
+    healthy.call_tool.return_value = CallToolResult(content=[TextContent(type="text", text="ok")])
+    _connect(_connect(client, broken, 0), healthy, 1)
+    for process in client.processes:
+        process.start, process.stop = AsyncMock(), AsyncMock()
+    client.processes[1].calls = 1
+
+    result = await client.call_tool("tool", {})
+    assert result.startswith("Error: tool server connection lost")
+    await asyncio.gather(*client._restart_tasks)
+    assert client.processes[0].restarts == 1
+    client.processes[0].stop.assert_awaited_once()
+    client.processes[0].start.assert_awaited_once()
+    client.processes[1].stop.assert_not_awaited()
+
+@pytest.mark.asyncio
+async def test_pool_restarts_process_whose_session_closed():
+    """Test that a closed-connection McpError takes the process out of rotation and restarts it."""
+    from mcp.shared.exceptions import McpError
+    from mcp.types import CONNECTION_CLOSED, ErrorData
+    client = MCPClient("python", ["server.py"], processes=2)
+    closed, healthy = AsyncMock(spec=ClientSession), AsyncMock(spec=ClientSession)
+    closed.call_tool.side_effect = McpError(ErrorData(code=CONNECTION_CLOSED, message="Connection closed"))
+    healthy.call_tool.return_value = CallToolResult(content=[TextContent(type="text", text="ok")])
+    _connect(_connect(client, closed, 0), healthy, 1)
+    restarted = asyncio.Event()
+    client.processes[0].start, client.processes[0].stop = AsyncMock(side_effect=restarted.wait), AsyncMock()
+    client.processes[1].calls = 1
+
+    result = await client.call_tool("tool", {})
+    assert result == "Error: tool server connection lost (connection closed)"
+    assert client.processes[0].healthy is False
+    # While the restart runs, calls go to the other process
+    assert await client.call_tool("tool", {}) == "ok"
+    restarted.set()
+    await asyncio.gather(*client._restart_tasks)
+    assert client.processes[0].restarts == 1
+    assert closed.call_tool.await_count == 1
+
+@pytest.mark.asyncio
+async def test_pool_skips_process_without_session():
+    """Test that a process marked healthy but without a session is never handed to a call."""
+    client = MCPClient("python", ["server.py"], processes=2)
+    session = AsyncMock(spec=ClientSession)
+    session.call_tool.return_value = CallToolResult(content=[TextContent(type="text", text="ok")])
+    _connect(client, session, 1)
+    client.processes[0].healthy = True
+
+    assert client.session is session
+    assert await client.call_tool("tool", {}) == "ok"
+    assert [p.calls for p in client.processes] == [0, 1]
+
+@pytest.mark.asyncio
+async def test_pool_health_check_restarts_unresponsive_process():
+    """Test that a process that does not answer its ping is restarted by the monitor."""
+    client = MCPClient("python", ["server.py"], processes=2, health_interval=0.01, health_timeout=0.05)
+    alive, hung = AsyncMock(spec=ClientSession), AsyncMock(spec=ClientSession)
+
+    async def never_answers():
+        await asyncio.sleep(10)
+
+    hung.send_ping.side_effect = never_answers
+    _connect(_connect(client, alive, 0), hung, 1)
+    for process in client.processes:
+        process.start, process.stop = AsyncMock(), AsyncMock()
+
+    await client.initialize()
+    await asyncio.sleep(0.2)
+    await client.close()
+    assert client.processes[1].restarts >= 1
+    assert client.processes[0].restarts == 0
@@ -129,3 +129,31 @@ def test_mcp_server_main_execution():
         # The MockFastMCP from the decorator/context manager *should* catch the instantiation inside runpy
         # because it patches the class in the module where it's defined (mcp.server.fastmcp).
         MockFastMCP.return_value.run.assert_called()
+
+@pytest.mark.asyncio
+async def test_mcp_server_tools_run_in_threads():
+    """Test that blocking tools are wrapped to run concurrently in worker threads."""
+    import asyncio
+    import time
+    import threading
+    if "utils.mcp_server" in sys.modules:
+        del sys.modules["utils.mcp_server"]
+    import utils.mcp_server as server
+
+    calls = []
+    def blocking_tool(value: str) -> str:
+        """Blocks like a requests call"""
+        calls.append(threading.current_thread() is threading.main_thread())
+        time.sleep(0.1)
+        return value.upper()
+
+    wrapped = server.run_in_thread(blocking_tool)
+    assert wrapped.__name__ == "blocking_tool"
+    assert wrapped.__doc__ == "Blocks like a requests call"
+
+    start = time.monotonic()
+    results = await asyncio.gather(*(wrapped(value=v) for v in ["a", "b", "c"]))
+
+    assert results == ["A", "B", "C"]
+    assert time.monotonic() - start < 0.25
+    assert calls == [False, False, False]
@@ -102,7 +102,7 @@ class TestCommunication:
 
 class TestMedia:
     @patch("utils.tools.media.os.getenv")
-    @patch("utils.tools.media.requests.post")
+    @patch("utils.tools.media.pooled_post")
     @patch("utils.tools.media.Image.open")
     @patch("utils.tools.media.os.makedirs")
     def test_generate_image_success(self, mock_makedirs, mock_img_open, mock_post, mock_getenv):
@@ -136,7 +136,7 @@ class TestMedia:
         mock_img.save.assert_called_once()
 
     @patch("utils.tools.media.os.getenv")
-    @patch("utils.tools.media.requests.post")
+    @patch("utils.tools.media.pooled_post")
     @patch("utils.tools.media.Image.open")
     @patch("utils.tools.media.os.makedirs")
     def test_generate_image_relative_url(self, mock_makedirs, mock_img_open, mock_post, mock_getenv):
@@ -179,7 +179,7 @@ class TestMedia:
         assert "missing" in result
 
     @patch("utils.tools.media.os.getenv")
-    @patch("utils.tools.media.requests.post")
+    @patch("utils.tools.media.pooled_post")
     def test_generate_image_api_error(self, mock_post, mock_getenv):
         """Test handling of non-200 API response."""
         mock_getenv.side_effect = lambda key, default=None: "dummy"
@@ -194,7 +194,7 @@ class TestMedia:
         assert "Bad Request" in result
 
     @patch("utils.tools.media.os.getenv")
-    @patch("utils.tools.media.requests.post")
+    @patch("utils.tools.media.pooled_post")
     def test_generate_image_url_response(self, mock_post, mock_getenv):
         """Test handling of URL-based response."""
         mock_getenv.side_effect = lambda key, default=None: "dummy"
@@ -210,7 +210,7 @@ class TestMedia:
         assert "![Generated Image](http://example.com/image.jpg)" in result
 
     @patch("utils.tools.media.os.getenv")
-    @patch("utils.tools.media.requests.post")
+    @patch("utils.tools.media.pooled_post")
     def test_generate_image_no_data(self, mock_post, mock_getenv):
         """Test handling of empty data in response."""
         mock_getenv.side_effect = lambda key, default=None: "dummy"
@@ -224,7 +224,7 @@ class TestMedia:
         assert "Error: Image content not found" in result
 
     @patch("utils.tools.media.os.getenv")
-    @patch("utils.tools.media.requests.post")
+    @patch("utils.tools.media.pooled_post")
     @patch("utils.tools.media.Image.open")
     @patch("utils.tools.media.os.makedirs")
     def test_generate_image_rgba_conversion(self, mock_makedirs, mock_img_open, mock_post, mock_getenv):
@@ -248,7 +248,7 @@ class TestMedia:
         mock_img.convert.return_value.save.assert_called_once()
 
     @patch("utils.tools.media.os.getenv")
-    @patch("utils.tools.media.requests.post")
+    @patch("utils.tools.media.pooled_post")
     def test_generate_image_exception(self, mock_post, mock_getenv):
         """Test generic exception handling."""
         mock_getenv.side_effect = lambda key, default=None: "dummy"
@@ -259,7 +259,7 @@ class TestMedia:
         assert "Net Error" in result
 
     @patch("utils.tools.media.os.getenv")
-    @patch("utils.tools.media.requests.post")
+    @patch("utils.tools.media.pooled_post")
     @patch("utils.tools.media.Image.open")
     @patch("utils.tools.media.os.makedirs")
     @patch("utils.tools.media.os.path.exists")
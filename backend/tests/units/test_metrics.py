@@ -0,0 +1,78 @@
+import pytest
+
+# Add src to path
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) + "/src")
+
+from utils.metrics import _Metric, Counter, Gauge, Histogram, Registry, track_background_task, BACKGROUND_TASK_SECONDS, BACKGROUND_TASKS_IN_FLIGHT
+
+def test_counter_render():
+    """Verify counters render one sample per label set"""
+    counter = Counter("tokens_total", "Tokens", ("kind",))
+    counter.inc(3, kind="prompt")
+    counter.inc(kind="prompt")
+    counter.inc(2, kind="completion")
+    lines = counter.render()
+    assert lines[:2] == ["# HELP tokens_total Tokens", "# TYPE tokens_total counter"]
+    assert 'tokens_total{kind="prompt"} 4' in lines
+    assert 'tokens_total{kind="completion"} 2' in lines
+
+def test_metric_base_is_abstract():
+    """Verify a metric type must say how it renders its samples"""
+    with pytest.raises(TypeError):
+        _Metric("plain", "No samples")
+
+def test_gauge_callback_and_default():
+    """Verify unlabeled gauges start at 0 and callbacks are read at render time"""
+    plain = Gauge("in_flight", "In flight")
+    assert "in_flight 0" in plain.render()
+    depth = {"value": 3}
+    dynamic = Gauge("depth", "Depth", callback=lambda: {(): depth["value"]})
+    depth["value"] = 7
+    assert "depth 7" in dynamic.render()
+
+def test_histogram_buckets_are_cumulative():
+    """Verify histogram buckets, sum and count follow the exposition format"""
+    histogram = Histogram("latency_seconds", "Latency", ("path",), buckets=(0.1, 1))
+    histogram.observe(0.05, path="/chat")
+    histogram.observe(0.5, path="/chat")
+    histogram.observe(5, path="/chat")
+    lines = histogram.render()
+    assert 'latency_seconds_bucket{path="/chat",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{path="/chat",le="1"} 2' in lines
+    assert 'latency_seconds_bucket{path="/chat",le="+Inf"} 3' in lines
+    assert 'latency_seconds_sum{path="/chat"} 5.55' in lines
+    assert 'latency_seconds_count{path="/chat"} 3' in lines
+
+def test_label_values_are_escaped():
+    """Verify quotes and newlines in label values cannot break the output"""
+    counter = Counter("c", "C", ("tool",))
+    counter.inc(tool='a"b\nc')
+    assert 'c{tool="a\\"b\\nc"} 1' in counter.render()
+
+def test_registry_keeps_first_registration():
+    """Verify registering a metric name twice returns the existing metric"""
+    registry = Registry()
+    first = registry.register(Counter("x_total", "X"))
+    assert registry.register(Counter("x_total", "X")) is first
+    first.inc()
+    assert registry.render().count("# TYPE x_total counter") == 1
+
+@pytest.mark.asyncio
+async def test_track_background_task():
+    """Verify background tasks are timed with their outcome and in-flight count restored"""
+    @track_background_task("test_task")
+    async def task(fail=False):
+        assert BACKGROUND_TASKS_IN_FLIGHT.value(task="test_task") == 1
+        if fail:
+            raise ValueError("boom")
+        return "done"
+
+    assert await task() == "done"
+    with pytest.raises(ValueError):
+        await task(fail=True)
+
+    assert BACKGROUND_TASK_SECONDS.count(task="test_task", status="ok") == 1
+    assert BACKGROUND_TASK_SECONDS.count(task="test_task", status="error") == 1
+    assert BACKGROUND_TASKS_IN_FLIGHT.value(task="test_task") == 0
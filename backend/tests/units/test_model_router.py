@@ -0,0 +1,70 @@
+import pytest
+from langchain_core.messages import HumanMessage, AIMessage, ToolMessage, SystemMessage
+
+# Add src to path
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) + "/src")
+
+from utils.model_router import ModelRouter, RouteDecision, parse_channel_policies, FAST, LARGE, ROUTED_TURNS, ROUTING_ESCALATIONS
+
+def test_parse_channel_policies():
+    """Verify channel policies are parsed and unknown policies ignored"""
+    policies = parse_channel_policies("web:auto, Twilio:FAST ,meta:large,other:bogus,broken")
+    assert policies == {"web": "auto", "twilio": "fast", "meta": "large"}
+
+def test_simple_message_goes_fast():
+    """Verify short small-talk is routed to the fast tier"""
+    router = ModelRouter({})
+    assert router.classify([HumanMessage(content="hi, thanks!")]) == RouteDecision(FAST, "simple")
+
+def test_instruction_suffix_is_ignored():
+    """Verify our channel instruction does not count towards the message length"""
+    router = ModelRouter({}, max_fast_chars=20)
+    message = HumanMessage(content="thanks\n\n[Instruction: Keep your response under 1500 characters.]")
+    assert router.classify([message]).tier == FAST
+
+@pytest.mark.parametrize("text,reason", [
+    ("Can you draw a picture of a cat?", "tool_intent"),
+    ("Send an SMS to +15550100 saying hello", "tool_intent"),
+    ("x" * 400, "long_message"),
+    ("What is your pricing? And do you offer refunds?", "complex_query"),
+])
+def test_escalating_messages_go_large(text, reason):
+    """Verify tool intent, long and multi-part messages are routed to the large tier"""
+    router = ModelRouter({})
+    assert router.classify([HumanMessage(content=text)]) == RouteDecision(LARGE, reason)
+
+def test_conversation_state_goes_large():
+    """Verify answers built on tool results and compacted threads use the large tier"""
+    router = ModelRouter({})
+    after_tool = [
+        HumanMessage(content="hi"),
+        AIMessage(content="", tool_calls=[{"name": "t", "args": {}, "id": "1"}]),
+        ToolMessage(content="done", tool_call_id="1"),
+    ]
+    assert router.classify(after_tool) == RouteDecision(LARGE, "tool_results")
+
+    compacted = [SystemMessage(content="summary", name="conversation_summary"), HumanMessage(content="hi")]
+    assert router.classify(compacted) == RouteDecision(LARGE, "compacted_thread")
+
+def test_channel_policy_pins_tier():
+    """Verify a channel pinned to a tier skips classification"""
+    router = ModelRouter({"twilio": "fast", "web": "large"})
+    long_text = [HumanMessage(content="Please draw me an image")]
+    assert router.classify(long_text, channel="twilio") == RouteDecision(FAST, "channel:fast")
+    assert router.classify([HumanMessage(content="hi")], channel="web") == RouteDecision(LARGE, "channel:large")
+    assert router.classify([HumanMessage(content="hi")], channel="meta").tier == FAST
+
+def test_record_keeps_decisions_and_latency():
+    """Verify decisions are counted and kept with their latency"""
+    router = ModelRouter({}, history_size=2)
+    before = ROUTED_TURNS.value(tier=LARGE), ROUTING_ESCALATIONS.value()
+    router.record("t1", "web", RouteDecision(FAST, "simple"), 12.34)
+    router.record("t1", "web", RouteDecision(FAST, "simple"), 50, escalated=True)
+    router.record("t2", "meta", RouteDecision(LARGE, "tool_intent"), 80)
+
+    assert router.stats == {"fast": 1, "large": 2, "escalations": 1}
+    assert (ROUTED_TURNS.value(tier=LARGE), ROUTING_ESCALATIONS.value()) == (before[0] + 2, before[1] + 1)
+    assert len(router.recent) == 2
+    assert router.recent[0] == {"thread_id": "t1", "channel": "web", "tier": "large", "reason": "escalated:tool_call", "latency_ms": 50}
@@ -50,18 +50,9 @@ def test_meta_whatsapp_webhook_post_ack(client):
 
 def test_meta_whatsapp_webhook_body_error(client):
     """Verify handling of malformed body in webhook"""
-    # Sending invalid JSON triggers generic 422 usually, but strict mode check in code:
-    # try: body = await request.json() except: return {"status": "error"}
-    # To trigger exception in request.json() with test client is hard unless we mock it or send bad content-type/data mismatch.
-    # Starlette TestClient might handle json decoding before?
-    # Let's try sending data that is valid json but triggers error inside logic?
-    # No, the try/except wraps request.json().
-    
-    # We can mock Request.json
-    with patch("fastapi.Request.json", side_effect=ValueError("Bad JSON")):
-        response = client.post("/meta/whatsapp", content="bad data")
-        assert response.status_code == 200
-        assert response.json() == {"status": "error"}
+    response = client.post("/meta/whatsapp", content="bad data")
+    assert response.status_code == 200
+    assert response.json() == {"status": "error"}
 
 @pytest.mark.asyncio
 async def test_meta_send_image():
@@ -194,3 +185,34 @@ def test_meta_send_message(client):
         with patch('requests.post') as mock_post:
             send_meta_whatsapp_message("to", "text")
             mock_post.assert_called_once()
+
+def test_meta_send_message_custom_base_url(client):
+    """Verify the Graph API base URL can point at a local stand-in"""
+    from routes.meta_routes import send_meta_whatsapp_message
+    envs = {"WHATSAPP_ACCESS_TOKEN": "token", "WHATSAPP_PHONE_NUMBER_ID": "pid"}
+    with patch.dict(os.environ, envs), patch("routes.meta_routes.GRAPH_API_BASE_URL", "http://127.0.0.1:9100/graph"):
+        with patch('requests.post') as mock_post:
+            send_meta_whatsapp_message("to", "text")
+    assert mock_post.call_args[0][0] == "http://127.0.0.1:9100/graph/pid/messages"
+
+def test_meta_process_coalesced_message(client):
+    """Verify no reply is sent for a message merged into a later turn"""
+    from routes.meta_routes import process_meta_whatsapp_background
+
+    payload = {
+        "object": "whatsapp_business_account",
+        "entry": [{"changes": [{"value": {"messages": [{"type": "text", "text": {"body": "hello"}, "from": "123"}]}}]}]
+    }
+
+    with patch('app_state.chatbot') as mock_bot:
+        mock_bot.chat = AsyncMock(return_value=None)
+
+        with patch('routes.meta_routes.send_meta_whatsapp_message') as mock_send_msg:
+            import asyncio
+            asyncio.run(process_meta_whatsapp_background(payload, "http://host"))
+
+            mock_bot.chat.assert_awaited_once_with(
+                "hello", thread_id="123", coalesce=True,
+                instruction="Keep your response under 1500 characters.", channel="meta"
+            )
+            mock_send_msg.assert_not_called()
@@ -120,6 +120,15 @@ def test_twilio_send_reply_success(client):
             call_kwargs = mock_instance.messages.create.call_args[1]
             assert call_kwargs["media_url"] == ["http://image"]
 
+def test_twilio_send_reply_custom_base_url(client):
+    """Verify the Twilio REST base URL can point at a local stand-in"""
+    envs = {"TWILIO_ACCOUNT_SID": "AC123", "TWILIO_AUTH_TOKEN": "token", "TWILIO_FROM_NUMBER": "+1000"}
+    with patch.dict(os.environ, envs), patch("routes.twilio_routes.TWILIO_API_BASE_URL", "http://127.0.0.1:9100/twilio"):
+        from routes.twilio_routes import send_twilio_reply
+        with patch('routes.twilio_routes.TwilioClient') as mock_client:
+            send_twilio_reply("to", "msg")
+    assert mock_client.return_value.api.base_url == "http://127.0.0.1:9100/twilio"
+
 
 
 def test_twilio_send_reply_exception(client):
@@ -137,3 +146,19 @@ def test_twilio_send_reply_exception(client):
                 send_twilio_reply("to", "msg")
                 mock_logger.error.assert_called()
                 assert "Twilio Down" in str(mock_logger.error.call_args)
+
+@pytest.mark.asyncio
+async def test_twilio_background_coalesced_message():
+    """Verify no reply is sent for a message merged into a later turn"""
+    from routes.twilio_routes import process_twilio_whatsapp_background
+
+    with patch('app_state.chatbot') as mock_bot:
+        mock_bot.chat = AsyncMock(return_value=None)
+        with patch('routes.twilio_routes.send_twilio_reply') as mock_send:
+            await process_twilio_whatsapp_background("hello", "whatsapp:+1", None, None, "http://host")
+
+            mock_bot.chat.assert_awaited_once_with(
+                "hello", thread_id="whatsapp:+1", coalesce=True,
+                instruction="Keep your response under 1500 characters.", channel="twilio"
+            )
+            mock_send.assert_not_called()
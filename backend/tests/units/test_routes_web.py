@@ -71,3 +71,28 @@ def test_chat_endpoint_with_reset(mock_chatbot, client):
     mock_chatbot.chat.assert_any_call("hello", thread_id="test_123")
 
 
+
+def test_chat_stream_endpoint(mock_chatbot, client):
+    """Verify the streaming endpoint emits one NDJSON event per line."""
+    import json
+
+    async def fake_stream(message, thread_id):
+        yield {"type": "token", "content": "Hel"}
+        yield {"type": "token", "content": "lo"}
+        yield {"type": "done", "message": "Hello"}
+
+    with patch.object(mock_chatbot, "chat_stream", side_effect=fake_stream) as mock_stream:
+        response = client.post("/chat/stream", json={"message": "hi", "session_id": "stream_1"})
+
+    assert response.status_code == 200
+    assert "application/x-ndjson" in response.headers["content-type"]
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert events[-1] == {"type": "done", "message": "Hello"}
+    assert "".join(e["content"] for e in events if e["type"] == "token") == "Hello"
+    mock_stream.assert_called_once_with("hi", thread_id="stream_1")
+
+def test_chat_stream_unavailable(client):
+    """Verify 503 on the streaming endpoint when chatbot is not initialized"""
+    with patch('app_state.chatbot', None):
+        response = client.post("/chat/stream", json={"message": "hello"})
+        assert response.status_code == 503
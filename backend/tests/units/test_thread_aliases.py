@@ -0,0 +1,117 @@
+import sys
+import os
+import pytest
+
+# Add backend/src to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) + "/src")
+
+import aiosqlite
+from langgraph.checkpoint.base import empty_checkpoint
+
+from conftest import checkpoint_config as _config
+from utils.checkpoint_cache import ThreadStateCache
+from utils.checkpoint_retention import ThreadPurger
+from utils.checkpoint_shards import ShardedSqliteSaver, reshard, shard_paths
+from utils.thread_aliases import ThreadAliases
+
+
+async def _write_turns(saver, thread_id, turns):
+    config = _config(thread_id)
+    for step in range(turns):
+        config = await saver.aput(config, empty_checkpoint(), {"step": step}, {})
+        await saver.aput_writes(config, [("messages", f"{thread_id} {step}")], "task-1")
+
+
+async def _rows(path, thread_id):
+    async with aiosqlite.connect(path) as conn:
+        total = 0
+        for table in ("checkpoints", "writes"):
+            async with conn.execute(f"SELECT COUNT(*) FROM {table} WHERE thread_id = ?", (thread_id,)) as cur:
+                total += (await cur.fetchone())[0]
+        return total
+
+
+@pytest.mark.asyncio
+async def test_reset_remaps_session_and_survives_restart(tmp_path, open_saver):
+    """Verify a reset points the session at a new thread, keeps the channel prefix and is persisted"""
+    db_path = str(tmp_path / "chat_history.sqlite")
+    saver = await open_saver(db_path, readers=0)
+    aliases = ThreadAliases(saver)
+    await aliases.setup()
+    assert aliases.resolve("whatsapp:+15550001") == "whatsapp:+15550001"
+    first = await aliases.reset("whatsapp:+15550001")
+    second = await aliases.reset("whatsapp:+15550001")
+    assert first.startswith("whatsapp:+15550001#") and second != first
+    assert aliases.resolve("whatsapp:+15550001") == second
+    assert await aliases.queued() == ["whatsapp:+15550001", first]
+    await saver.aclose()
+
+    saver = await open_saver(db_path, readers=0)
+    aliases = ThreadAliases(saver)
+    await aliases.setup()
+    assert aliases.resolve("whatsapp:+15550001") == second
+    assert len(aliases) == 1
+    assert await aliases.queued(min_age=3600) == []
+
+
+@pytest.mark.asyncio
+async def test_purger_deletes_old_thread_in_batches(tmp_path, open_saver):
+    """Verify the purger removes only the reset thread, a few rows per transaction, and empties the queue"""
+    db_path = str(tmp_path / "chat_history.sqlite")
+    saver = await open_saver(db_path, readers=0, cache=ThreadStateCache())
+    aliases = ThreadAliases(saver)
+    await aliases.setup()
+    await _write_turns(saver, "web_a", 7)
+    await _write_turns(saver, "web_b", 2)
+    await saver.aget_tuple(_config("web_a"))
+    await aliases.reset("web_a")
+
+    purger = ThreadPurger(saver, aliases, batch_rows=3, pause=0)
+    assert await purger.purge(min_age=3600) == {"threads_purged": 0, "rows_deleted": 0}
+    assert await purger.purge(min_age=0) == {"threads_purged": 1, "rows_deleted": 14}
+    assert await _rows(db_path, "web_a") == 0
+    assert await _rows(db_path, "web_b") == 4
+    assert await saver.aget_tuple(_config("web_a")) is None
+    assert await aliases.queued() == []
+
+
+@pytest.mark.asyncio
+async def test_purger_follows_threads_to_their_shard(tmp_path):
+    """Verify purges on a sharded store delete from the shard holding the old thread"""
+    saver = await ShardedSqliteSaver.open(str(tmp_path / "chat_history.sqlite"), 3, readers=1)
+    try:
+        aliases = ThreadAliases(saver)
+        await aliases.setup()
+        sessions = [f"twilio:+1555000{i}" for i in range(6)]
+        for session in sessions:
+            await _write_turns(saver, session, 2)
+            new_thread = await aliases.reset(session)
+            await _write_turns(saver, new_thread, 1)
+        result = await ThreadPurger(saver, aliases, pause=0).purge(min_age=0)
+        assert result == {"threads_purged": 6, "rows_deleted": 6 * 4}
+        for session in sessions:
+            assert await saver.aget_tuple(_config(session)) is None
+            assert await saver.aget_tuple(_config(aliases.resolve(session))) is not None
+    finally:
+        await saver.aclose()
+
+
+@pytest.mark.asyncio
+async def test_reshard_keeps_aliases(tmp_path, open_saver):
+    """Verify resharding carries reset sessions and queued purges over to the new layout"""
+    db_path = str(tmp_path / "chat_history.sqlite")
+    saver = await open_saver(db_path, readers=0)
+    aliases = ThreadAliases(saver)
+    await aliases.setup()
+    new_thread = await aliases.reset("web_a")
+    await saver.aclose()
+
+    await reshard([db_path], shard_paths(db_path, 2))
+    saver = await ShardedSqliteSaver.open(db_path, 2, readers=1)
+    try:
+        aliases = ThreadAliases(saver)
+        await aliases.setup()
+        assert aliases.resolve("web_a") == new_thread
+        assert await aliases.queued() == ["web_a"]
+    finally:
+        await saver.aclose()
@@ -0,0 +1,50 @@
+import time
+from langchain_core.messages import HumanMessage, AIMessage, ToolMessage
+
+# Add src to path
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) + "/src")
+
+from utils.turn_budget import TurnBudget, BUDGET_MESSAGE_NAME, parse_channel_seconds, tool_iterations
+
+def tool_round(i):
+    return [
+        AIMessage(content="", tool_calls=[{"name": "t", "args": {}, "id": f"call_{i}"}]),
+        ToolMessage(content="ok", tool_call_id=f"call_{i}"),
+    ]
+
+def test_parse_channel_seconds():
+    """Verify per-channel deadlines are parsed and malformed entries skipped"""
+    assert parse_channel_seconds("web:60, Twilio:25.5,meta:x,broken") == {"web": 60.0, "twilio": 25.5}
+
+def test_tool_iterations_counts_current_turn_only():
+    """Verify only tool rounds after the latest user message are counted"""
+    messages = [HumanMessage(content="a")] + tool_round(1) + [AIMessage(content="done"), HumanMessage(content="b")] + tool_round(2)
+    assert tool_iterations(messages) == 1
+
+def test_deadline_per_channel():
+    """Verify each channel gets its own deadline and 0 disables it"""
+    budget = TurnBudget({"twilio": 25, "web": 0}, default_seconds=60)
+    now = time.monotonic()
+    assert 24 < budget.deadline_for("twilio") - now < 26
+    assert 59 < budget.deadline_for("meta") - now < 61
+    assert budget.deadline_for("web") is None
+
+def test_tool_timeout_is_capped_by_remaining_time():
+    """Verify a tool call never waits longer than the turn has left"""
+    budget = TurnBudget({}, tool_timeout=30)
+    assert budget.tool_timeout_for({}) == 30
+    assert budget.tool_timeout_for({"deadline": time.monotonic() + 5}) <= 5
+    assert budget.tool_timeout_for({"deadline": time.monotonic() - 1}) == 0
+
+def test_exhausted_keeps_partial_answer():
+    """Verify the closing message keeps what the model already said in the turn"""
+    budget = TurnBudget({})
+    messages = [HumanMessage(content="a"), AIMessage(content="Looking that up.", tool_calls=[{"name": "t", "args": {}, "id": "1"}]), ToolMessage(content="x", tool_call_id="1")]
+    message = budget.exhausted(messages, "deadline")
+
+    assert message.name == BUDGET_MESSAGE_NAME
+    assert message.content.startswith("Looking that up.")
+    assert "try again" in message.content
+    assert budget.stats["deadline"] == 1
@@ -0,0 +1,129 @@
+import pytest
+import asyncio
+
+# Add src to path
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) + "/src")
+
+from utils.turn_queue import TurnQueue
+
+@pytest.mark.asyncio
+async def test_single_message_is_answered_without_waiting():
+    """Verify a message for an idle thread does not wait for the coalesce window"""
+    async def handler(text, thread_id, **kwargs):
+        return f"reply to {text}"
+
+    queue = TurnQueue(handler, window=10, max_wait=10)
+    assert await asyncio.wait_for(queue.submit("t1", "hi"), 1) == "reply to hi"
+    assert queue.stats == {"messages": 1, "turns": 1, "coalesced": 0}
+
+@pytest.mark.asyncio
+async def test_messages_during_a_turn_are_coalesced_into_the_next():
+    """Verify messages arriving while a turn runs are answered by a single following turn"""
+    calls = []
+    release = asyncio.Event()
+
+    async def handler(text, thread_id, **kwargs):
+        calls.append((text, thread_id, kwargs))
+        await release.wait()
+        return f"reply to {text!r}"
+
+    queue = TurnQueue(handler, window=0.05)
+    first = asyncio.create_task(queue.submit("t1", "hi", instruction="short"))
+    await asyncio.sleep(0.01)
+    later = [asyncio.create_task(queue.submit("t1", text, instruction="short")) for text in ("are you there?", "hello??")]
+    await asyncio.sleep(0.01)
+    release.set()
+
+    assert await first == "reply to 'hi'"
+    assert await asyncio.gather(*later) == [None, "reply to 'are you there?\\nhello??'"]
+    assert calls == [("hi", "t1", {"instruction": "short"}), ("are you there?\nhello??", "t1", {"instruction": "short"})]
+    assert queue.stats == {"messages": 3, "turns": 2, "coalesced": 1}
+
+@pytest.mark.asyncio
+async def test_turns_are_serialized_per_thread():
+    """Verify a thread never runs two turns at once, while other threads run in parallel"""
+    running = {}
+    overlaps = []
+
+    async def handler(text, thread_id, **kwargs):
+        if running.get(thread_id):
+            overlaps.append(thread_id)
+        running[thread_id] = True
+        await asyncio.sleep(0.05)
+        running[thread_id] = False
+        return text
+
+    queue = TurnQueue(handler, window=0)
+    first = asyncio.create_task(queue.submit("t1", "one"))
+    other = asyncio.create_task(queue.submit("t2", "other"))
+    await asyncio.sleep(0.01)
+    # Arrives while the first turn is running: queued and answered by the next turn
+    second = asyncio.create_task(queue.submit("t1", "two"))
+
+    assert await first == "one"
+    assert await second == "two"
+    assert await other == "other"
+    assert overlaps == []
+    assert queue.depth() == 0
+
+@pytest.mark.asyncio
+async def test_handler_error_propagates_to_all_callers():
+    """Verify every merged caller sees the handler exception"""
+    async def handler(text, thread_id, **kwargs):
+        raise RuntimeError("Agent down")
+
+    queue = TurnQueue(handler, window=0.01)
+    results = await asyncio.gather(
+        queue.submit("t1", "a"),
+        queue.submit("t1", "b"),
+        return_exceptions=True,
+    )
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert "t1" not in queue._workers
+
+@pytest.mark.asyncio
+async def test_max_wait_caps_coalescing():
+    """Verify a steady stream of messages does not postpone the turn forever"""
+    calls = []
+
+    async def handler(text, thread_id, **kwargs):
+        calls.append(text)
+        if len(calls) == 1:
+            # The trickle goes on while the first turn runs
+            await asyncio.sleep(0.05)
+        return text
+
+    queue = TurnQueue(handler, window=0.05, max_wait=0.1)
+
+    async def trickle():
+        for i in range(6):
+            asyncio.create_task(queue.submit("t1", str(i)))
+            await asyncio.sleep(0.03)
+
+    await trickle()
+    await asyncio.sleep(0.3)
+
+    assert calls[0] == "0"
+    assert len(calls) >= 3
+    assert "\n".join(calls).split("\n") == [str(i) for i in range(6)]
+
+@pytest.mark.asyncio
+async def test_close_cancels_waiting_callers():
+    """Verify shutting the queue down resolves every waiting caller instead of leaving it hanging"""
+    async def handler(text, thread_id, **kwargs):
+        await asyncio.sleep(10)
+
+    queue = TurnQueue(handler, window=0)
+    running = asyncio.create_task(queue.submit("t1", "one"))
+    await asyncio.sleep(0.01)
+    queued = asyncio.create_task(queue.submit("t1", "two"))
+    await asyncio.sleep(0.01)
+
+    queue.close()
+    results = await asyncio.wait_for(asyncio.gather(running, queued, return_exceptions=True), 1)
+    assert all(isinstance(r, asyncio.CancelledError) for r in results)
+    assert queue.depth() == 0
+    assert queue._workers == {}
@@ -1,5 +1,4 @@
 import { useState, useRef, useEffect } from 'react'
-import axios from 'axios'
 import ReactMarkdown from 'react-markdown'
 import './App.css'
 
@@ -36,16 +35,46 @@ function App() {
     setIsLoading(true)
 
     try {
-      const response = await axios.post('/chat', {
-        message: input,
-        session_id: sessionId // Pass session ID to backend
+      const response = await fetch('/chat/stream', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({
+          message: input,
+          session_id: sessionId // Pass session ID to backend
+        })
       })
-      const assistantMessage = { role: 'assistant', content: response.data.message }
+      if (!response.ok) {
+        throw new Error(`Request failed with status ${response.status}`)
+      }
 
-      setMessages(prev => [...prev, assistantMessage])
+      // Add an empty assistant bubble and fill it in as tokens arrive
+      setMessages(prev => [...prev, { role: 'assistant', content: '' }])
+      const updateAssistant = (content) => setMessages(prev => [...prev.slice(0, -1), { role: 'assistant', content }])
+
+      const reader = response.body.getReader()
+      const decoder = new TextDecoder()
+      let buffer = ''
+      let streamed = ''
+      while (true) {
+        const { done, value } = await reader.read()
+        if (done) break
+        buffer += decoder.decode(value, { stream: true })
+        const lines = buffer.split('\n')
+        buffer = lines.pop()
+        for (const line of lines) {
+          if (!line.trim()) continue
+          const event = JSON.parse(line)
+          if (event.type === 'token') {
+            streamed += event.content
+            updateAssistant(streamed)
+          } else if (event.type === 'done' || event.type === 'error') {
+            updateAssistant(event.message || streamed)
+          }
+        }
+      }
     } catch (error) {
       console.error('Error sending message:', error)
-      const errorMsg = error.response?.data?.detail || error.message || 'Something went wrong'
+      const errorMsg = error.message || 'Something went wrong'
       setMessages(prev => [...prev, { role: 'assistant', content: `Sorry, I encountered an error: ${errorMsg}` }])
     } finally {
       setIsLoading(false)
@@ -70,7 +99,7 @@ function App() {
               </div>
             </div>
           ))}
-          {isLoading && (
+          {isLoading && messages[messages.length - 1].role === 'user' && (
             <div className="message assistant">
               <div className="message-bubble typing">
                 <span className="dot"></span>
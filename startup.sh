@@ -19,5 +19,5 @@ fi
 
 # 3. Run the application
 echo "Starting Nviv Chatbot..."
-export PYTHONPATH=$PYTHONPATH:$(pwd)/backend/src
-python -m uvicorn backend.src.api:app --host 0.0.0.0 --port ${PORT:-8000}
+# backend/src is the import root: modules load once, by their top-level names
+python -m uvicorn api:app --app-dir backend/src --host 0.0.0.0 --port ${PORT:-8000}